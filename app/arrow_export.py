@@ -0,0 +1,267 @@
+"""
+Typed columnar exports of report data: Arrow IPC stream or Parquet.
+
+Rows go from cursor batches straight into Arrow record batches with a
+schema fixed when the query opens. The schema comes from the cursor
+description: datetimes become timestamp[us], dates date32 and Decimals
+decimal128 when the driver reports precision and scale. The report tables
+keep durations and clock times as "HH:MM:SS" text; the columns listed in
+DURATION_COLUMNS / TIME_COLUMNS are converted to duration[ms] / time64[us].
+Values that do not parse become nulls.
+
+Needs pyarrow; without it the export routes answer 501.
+"""
+
+import io
+import os
+import re
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from .streaming import ReportExport
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows per fetchmany round trip and per Arrow record batch
+ARROW_EXPORT_BATCH_SIZE = int(os.getenv("ARROW_EXPORT_BATCH_SIZE", "10000"))
+
+# Rows buffered before a Parquet row group is written
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "100000"))
+
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+
+# Buffer compression of Arrow IPC streams ("zstd", "lz4" or "none")
+ARROW_IPC_COMPRESSION = os.getenv("ARROW_IPC_COMPRESSION", "zstd")
+
+# "HH:MM:SS" text columns holding elapsed time, by report
+DURATION_COLUMNS = {
+    "login": ("duration",),
+    "break": ("TimeValue", "LoggedInTime"),
+    "status": (
+        "AvailableTime", "HandlingTime", "WrapUpTime", "WorkingOfflineTime",
+        "OfferingTime", "OnBreakTime", "BusyTime", "LoggedInTime",
+    ),
+    "refused": ("AverageHandlingTime", "AverageWrapUpTime", "AverageBusyTime"),
+    "transaction": (
+        "HandlingDuration", "WrapUpDuration", "ProcessingDuration",
+        "TimetoAbandon", "IVRTreatmentDuration", "HoldDuration",
+    ),
+}
+
+# "HH:MM[:SS]" text columns holding a time of day, by report
+TIME_COLUMNS = {
+    "modmed": ("AppointmentTime",),
+    "nextech": ("StartTime",),
+}
+
+_CLOCK_RE = re.compile(r"^\s*(?:(\d+) days?, )?(\d+):(\d{1,2})(?::(\d{1,2}(?:\.\d+)?))?\s*$")
+
+
+def _clock_parts(value):
+    match = _CLOCK_RE.match(value)
+    if match is None:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return int(days or 0), int(hours), int(minutes), float(seconds or 0)
+
+
+def to_duration(value):
+    if value is None or isinstance(value, timedelta):
+        return value
+    if isinstance(value, time):
+        return timedelta(hours=value.hour, minutes=value.minute, seconds=value.second, microseconds=value.microsecond)
+    parts = _clock_parts(str(value))
+    if parts is None:
+        return None
+    days, hours, minutes, seconds = parts
+    return timedelta(days=days, hours=hours, minutes=minutes, seconds=seconds)
+
+
+def to_time(value):
+    if value is None or isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return value.time()
+    parts = _clock_parts(str(value))
+    if parts is None or parts[0] or parts[1] > 23:
+        return None
+    _, hours, minutes, seconds = parts
+    whole = int(seconds)
+    return time(hours, minutes, whole, round((seconds - whole) * 1_000_000))
+
+
+def _arrow_type(description):
+    """Arrow type for one cursor.description entry."""
+
+    type_code, precision, scale = description[1], description[4], description[5]
+
+    if type_code is bool:
+        return pa.bool_()
+    if type_code is int:
+        return pa.int64()
+    if type_code is float:
+        return pa.float64()
+    if type_code is Decimal:
+        if precision and scale is not None and precision <= 38:
+            return pa.decimal128(precision, scale)
+        return pa.float64()
+    if type_code is datetime:
+        return pa.timestamp("us")
+    if type_code is date:
+        return pa.date32()
+    if type_code is time:
+        return pa.time64("us")
+    if type_code is timedelta:
+        return pa.duration("ms")
+    if type_code in (bytes, bytearray):
+        return pa.binary()
+    return pa.string()
+
+
+def report_schema(report, description):
+
+    durations = set(DURATION_COLUMNS.get(report, ()))
+    times = set(TIME_COLUMNS.get(report, ()))
+    fields = []
+
+    for column in description:
+        name = column[0]
+        if name in durations:
+            arrow_type = pa.duration("ms")
+        elif name in times:
+            arrow_type = pa.time64("us")
+        else:
+            arrow_type = _arrow_type(column)
+        fields.append(pa.field(name, arrow_type))
+
+    return pa.schema(fields)
+
+
+def _converter(arrow_type):
+    if pa.types.is_duration(arrow_type):
+        return to_duration
+    if pa.types.is_time(arrow_type):
+        return to_time
+    if pa.types.is_floating(arrow_type):
+        return lambda value: None if value is None else float(value)
+    if pa.types.is_string(arrow_type):
+        return lambda value: None if value is None else str(value)
+    return None
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ArrowExport(ReportExport):
+    """
+    Report rows as an Arrow IPC stream of typed record batches, one per
+    fetchmany batch; see arrow_export module docs. Other file formats built
+    on the same record batches override new_writer() and write().
+    """
+
+    media_type = "application/vnd.apache.arrow.stream"
+    extension = "arrows"
+
+    def __init__(self, report, batch_size=ARROW_EXPORT_BATCH_SIZE):
+        super().__init__(report, batch_size)
+        self.schema = None
+        self._converters = None
+        self._sink = _Sink()
+        self._writer = None
+
+    def open_export(self, start_date, end_date):
+        super().open_export(start_date, end_date)
+        self.schema = report_schema(self.report, self._cursor.description)
+        self._converters = [_converter(field.type) for field in self.schema]
+
+    def record_batch(self, rows):
+
+        arrays = []
+        for values, field, convert in zip(zip(*rows), self.schema, self._converters):
+            if convert is not None:
+                values = [convert(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def header(self):
+        self._writer = self.new_writer(self._sink)
+        return self._sink.drain()
+
+    def encode(self, rows):
+        self.write(self.record_batch(rows))
+        return self._sink.drain()
+
+    def trailer(self):
+        self.finish()
+        self._writer.close()
+        return self._sink.drain()
+
+    def new_writer(self, sink):
+        compression = ARROW_IPC_COMPRESSION
+        if compression == "none" or not pa.Codec.is_available(compression):
+            compression = None
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        return pa.ipc.new_stream(sink, self.schema, options=options)
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+
+    def finish(self):
+        pass
+
+
+class ParquetExport(ArrowExport):
+    """
+    Parquet needs sizeable row groups to compress and scan well, so batches
+    are buffered up to PARQUET_ROW_GROUP_SIZE rows before each write.
+    """
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, report, batch_size=ARROW_EXPORT_BATCH_SIZE):
+        super().__init__(report, batch_size)
+        self._pending = []
+        self._pending_rows = 0
+
+    def new_writer(self, sink):
+        return pq.ParquetWriter(sink, self.schema, compression=PARQUET_COMPRESSION)
+
+    def write(self, batch):
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= PARQUET_ROW_GROUP_SIZE:
+            self.finish()
+
+    def finish(self):
+        if self._pending:
+            self._writer.write_table(pa.Table.from_batches(self._pending, schema=self.schema))
+            self._pending = []
+            self._pending_rows = 0
+
+
+EXPORT_FORMATS = {
+    "arrow": ArrowExport,
+    "parquet": ParquetExport,
+}
@@ -1,8 +1,11 @@
-from .db import create_connection
+from .db import AUTH, pooled_connection
+from .fetch import fetch_rows
+from .retry import retry_read
 
+@retry_read
 def login_user(username, password):
 
-    with create_connection() as conn:
+    with pooled_connection(AUTH) as conn:
 
         cursor = conn.cursor()
 
@@ -13,6 +16,8 @@ def login_user(username, password):
 
         user = cursor.fetchone()
 
+        cursor.close()
+
         if not user:
             return None
 
@@ -20,4 +25,37 @@ def login_user(username, password):
             "user_id": user.user_id,
             "username": user.username,
             "role": user.role_name
-        }
\ No newline at end of file
+        }
+
+def revoke_token(token_id, user_id, expires_at, revoked_by):
+    """
+    Record a revocation. token_id None revokes every token of user_id issued
+    before now; expires_at is when the entry stops mattering.
+    """
+
+    with pooled_connection(AUTH) as conn:
+
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "EXEC sp_RevokeToken ?, ?, ?, ?",
+                (token_id, user_id, expires_at, revoked_by)
+            )
+            conn.commit()
+        finally:
+            cursor.close()
+
+@retry_read
+def get_revoked_tokens(since):
+    """Unexpired revocations recorded after `since` (None for all of them)."""
+
+    with pooled_connection(AUTH) as conn:
+
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("EXEC sp_GetRevokedTokens ?", (since,))
+            return fetch_rows(cursor)
+        finally:
+            cursor.close()
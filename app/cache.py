@@ -0,0 +1,595 @@
+"""
+Shared cache for report, master-data and auth lookups.
+
+CACHE_BACKEND=memory  per-process LRU with TTLs and a byte budget (default)
+CACHE_BACKEND=redis   any Redis-protocol server at CACHE_URL, shared by all
+                      uvicorn workers and hosts (python -m app.cache_server
+                      runs a local stand-in)
+
+Values are pickled, so both backends see the same bytes and cached objects
+can't be mutated by callers. Keys live in namespaces ("reports", "master",
+"auth", ...) under CACHE_PREFIX and a namespace can be cleared as a whole.
+
+get_or_set() protects against stampedes: concurrent misses for one key in
+a process wait for a single loader, and with Redis a short-lived lock key
+makes other workers wait for that loader too instead of hitting the DB.
+"""
+
+import os
+import pickle
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "das")
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "60"))
+
+# Byte budget of the in-process backend (Redis enforces its own maxmemory)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Larger values are never cached, whatever the backend
+CACHE_MAX_ITEM_BYTES = int(os.getenv("CACHE_MAX_ITEM_BYTES", str(4 * 1024 * 1024)))
+
+# Stampede lock lifetime and how long other callers wait on it (seconds)
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+
+# Socket timeout for the Redis backend; on errors the cache acts as a miss
+CACHE_SOCKET_TIMEOUT = float(os.getenv("CACHE_SOCKET_TIMEOUT", "0.5"))
+
+_MISSING = object()
+
+
+class CacheError(Exception):
+    pass
+
+
+class Cache:
+    """
+    Backend-independent part: namespacing, serialization, single-flight
+    loading and counters. Backends implement _get / _set / _add / _delete /
+    _clear_prefix and may override _lock / _unlock for cross-process locks.
+    """
+
+    # True when every worker and host sees the same entries
+    shared = False
+
+    def __init__(self, prefix=CACHE_PREFIX, default_ttl=CACHE_DEFAULT_TTL, max_item_bytes=CACHE_MAX_ITEM_BYTES):
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.max_item_bytes = max_item_bytes
+
+        self._flight_lock = threading.Lock()
+        self._flights = {}
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "too_large": 0,
+            "evictions": 0,
+            "loads": 0,
+            "load_waits": 0,
+            "errors": 0,
+        }
+
+    # ---------------------------------------------------------------
+    # public API
+    # ---------------------------------------------------------------
+
+    def key(self, namespace, key):
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace, key, default=None):
+
+        raw = self._safe(self._get, self.key(namespace, key))
+
+        if raw is None:
+            self._count("misses")
+            return default
+
+        self._count("hits")
+        return pickle.loads(raw)
+
+    def set(self, namespace, key, value, ttl=None):
+
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        if len(raw) > self.max_item_bytes:
+            self._count("too_large")
+            return False
+
+        ttl = self.default_ttl if ttl is None else ttl
+        self._safe(self._set, self.key(namespace, key), raw, ttl)
+        self._count("sets")
+        return True
+
+    def add(self, namespace, key, value, ttl=None):
+        """
+        Store value only if key is absent, atomically. Returns True when it
+        was stored. Unlike the other calls a cache failure is not hidden:
+        callers use the answer for decisions that must not be guessed.
+        """
+
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        ttl = self.default_ttl if ttl is None else ttl
+
+        added = self._add(self.key(namespace, key), raw, ttl)
+        if added:
+            self._count("sets")
+        return added
+
+    def delete(self, namespace, key):
+        self._safe(self._delete, self.key(namespace, key))
+
+    def clear(self, namespace):
+        self._safe(self._clear_prefix, f"{self.prefix}:{namespace}:")
+
+    def get_or_set(self, namespace, key, loader, ttl=None):
+        """
+        Cached value for key, or loader() stored for ttl seconds. Only one
+        caller per key loads at a time; the others wait and reuse its result.
+        """
+
+        value = self.get(namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        full_key = self.key(namespace, key)
+
+        with self._flight_lock:
+            flight = self._flights.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[full_key] = _Flight()
+
+        if not leader:
+            self._count("load_waits")
+            return flight.wait(loader)
+
+        try:
+            value = self._load(namespace, key, full_key, loader, ttl)
+            flight.resolve(value)
+            return value
+        except BaseException as e:
+            flight.fail(e)
+            raise
+        finally:
+            with self._flight_lock:
+                self._flights.pop(full_key, None)
+
+    def namespace(self, name):
+        return Namespace(self, name)
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["backend"] = type(self).__name__
+        return stats
+
+    # ---------------------------------------------------------------
+    # internals
+    # ---------------------------------------------------------------
+
+    def _load(self, namespace, key, full_key, loader, ttl):
+
+        # If the cache itself is unreachable, just load
+        token = self._safe(self._lock, full_key, fallback=True)
+
+        if not token:
+            # Another process is loading: wait for its value, and load
+            # ourselves if the lock frees up without one appearing
+            self._count("load_waits")
+            deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                raw = self._safe(self._get, full_key)
+                if raw is not None:
+                    self._count("hits")
+                    return pickle.loads(raw)
+                token = self._safe(self._lock, full_key, fallback=True)
+                if token:
+                    break
+
+        try:
+            self._count("loads")
+            value = loader()
+            self.set(namespace, key, value, ttl)
+            return value
+        finally:
+            if token:
+                self._safe(self._unlock, full_key)
+
+    def _safe(self, operation, *args, fallback=None):
+        """Run a backend call; a failing cache is treated as a miss."""
+        try:
+            return operation(*args)
+        except (OSError, CacheError):
+            self._count("errors")
+            return fallback
+
+    def _count(self, event, count=1):
+        with self._stats_lock:
+            self._stats[event] += count
+
+    def _lock(self, key):
+        # In-process single-flight is enough for a per-process cache
+        return True
+
+    def _unlock(self, key):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Flight:
+    """Result of one in-progress load, shared with concurrent callers."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._value = None
+        self._error = None
+
+    def resolve(self, value):
+        self._value = value
+        self._done.set()
+
+    def fail(self, error):
+        self._error = error
+        self._done.set()
+
+    def wait(self, loader):
+        if not self._done.wait(CACHE_LOCK_TIMEOUT) or self._error is not None:
+            # Leader failed or is stuck: load independently
+            return loader()
+        return self._value
+
+
+class Namespace:
+    """Cache view bound to one namespace."""
+
+    def __init__(self, cache, name):
+        self.cache = cache
+        self.name = name
+
+    def get(self, key, default=None):
+        return self.cache.get(self.name, key, default)
+
+    def set(self, key, value, ttl=None):
+        return self.cache.set(self.name, key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        return self.cache.add(self.name, key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(self.name, key)
+
+    def get_or_set(self, key, loader, ttl=None):
+        return self.cache.get_or_set(self.name, key, loader, ttl)
+
+    def clear(self):
+        self.cache.clear(self.name)
+
+
+# -------------------------------------------------------------------
+# In-process backend
+# -------------------------------------------------------------------
+
+class MemoryCache(Cache):
+    """LRU with per-entry TTLs, bounded by the total size of stored values."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, **kwargs):
+        super().__init__(**kwargs)
+        self.max_bytes = max_bytes
+        self._lock_entries = threading.Lock()
+        # key -> (raw bytes, expires_at), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def _get(self, key):
+
+        with self._lock_entries:
+            return self._live(key)
+
+    def _set(self, key, raw, ttl):
+
+        with self._lock_entries:
+            evicted = self._store(key, raw, ttl)
+
+        if evicted:
+            self._count("evictions", evicted)
+
+    def _add(self, key, raw, ttl):
+
+        with self._lock_entries:
+            if self._live(key) is not None:
+                return False
+            evicted = self._store(key, raw, ttl)
+
+        if evicted:
+            self._count("evictions", evicted)
+        return True
+
+    def _live(self, key):
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        raw, expires_at = entry
+        if expires_at and expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return raw
+
+    def _store(self, key, raw, ttl):
+
+        expires_at = time.monotonic() + ttl if ttl else 0
+        evicted = 0
+
+        self._pop(key)
+        self._entries[key] = (raw, expires_at)
+        self._bytes += len(raw)
+
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._pop(oldest)
+            evicted += 1
+
+        return evicted
+
+    def _delete(self, key):
+        with self._lock_entries:
+            self._pop(key)
+
+    def _clear_prefix(self, prefix):
+        with self._lock_entries:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._pop(key)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock_entries:
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+
+# -------------------------------------------------------------------
+# Redis-protocol backend
+# -------------------------------------------------------------------
+
+def _encode_command(args):
+
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class _RespConnection:
+
+    def __init__(self, host, port, db=0, password=None, timeout=CACHE_SOCKET_TIMEOUT):
+        self._sock = socket.create_connection((host, port), timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if password:
+            self.command("AUTH", password)
+        if db:
+            self.command("SELECT", db)
+
+    def command(self, *args):
+        self._sock.sendall(_encode_command(args))
+        return self._read()
+
+    def _read(self):
+
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("cache server closed the connection")
+
+        kind, body = line[:1], line[1:-2]
+
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise CacheError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            return self._reader.read(size + 2)[:-2]
+        if kind == b"*":
+            size = int(body)
+            if size < 0:
+                return None
+            return [self._read() for _ in range(size)]
+
+        raise CacheError(f"unexpected reply {line!r}")
+
+    def close(self):
+        try:
+            self._reader.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+# Deletes the lock only if we still own it
+_UNLOCK_SCRIPT = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+
+class RedisCache(Cache):
+    """
+    Minimal RESP client (GET / SET PX NX / DEL / SCAN) with a small pool of
+    sockets, so no client library is required.
+    """
+
+    def __init__(self, url=CACHE_URL, pool_size=8, **kwargs):
+        super().__init__(**kwargs)
+
+        parts = urlsplit(url)
+        self._host = parts.hostname or "localhost"
+        self._port = parts.port or 6379
+        self._db = int(parts.path.lstrip("/") or 0)
+        self._password = unquote(parts.password) if parts.password else None
+
+        self._pool_size = pool_size
+        self._idle = []
+        self._idle_lock = threading.Lock()
+        self._tokens = {}
+
+    def _command(self, *args):
+
+        with self._idle_lock:
+            conn = self._idle.pop() if self._idle else None
+
+        if conn is None:
+            conn = _RespConnection(self._host, self._port, self._db, self._password)
+
+        try:
+            reply = conn.command(*args)
+        except OSError:
+            conn.close()
+            raise
+        except CacheError:
+            self._put_back(conn)
+            raise
+
+        self._put_back(conn)
+        return reply
+
+    def _put_back(self, conn):
+        with self._idle_lock:
+            if len(self._idle) < self._pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    shared = True
+
+    def _get(self, key):
+        return self._command("GET", key)
+
+    def _set(self, key, raw, ttl):
+        if ttl:
+            self._command("SET", key, raw, "PX", int(ttl * 1000))
+        else:
+            self._command("SET", key, raw)
+
+    def _add(self, key, raw, ttl):
+        if ttl:
+            return self._command("SET", key, raw, "NX", "PX", int(ttl * 1000)) is not None
+        return self._command("SET", key, raw, "NX") is not None
+
+    def _delete(self, key):
+        self._command("DEL", key)
+
+    def _clear_prefix(self, prefix):
+
+        cursor = "0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", prefix + "*", "COUNT", 500)
+            cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+            if keys:
+                self._command("DEL", *keys)
+            if cursor == "0":
+                return
+
+    def _lock(self, key):
+
+        token = uuid.uuid4().hex
+        acquired = self._command(
+            "SET", key + ":lock", token, "NX", "PX", int(CACHE_LOCK_TIMEOUT * 1000)
+        )
+        if acquired is None:
+            return None
+
+        with self._idle_lock:
+            self._tokens[key] = token
+        return token
+
+    def _unlock(self, key):
+
+        with self._idle_lock:
+            token = self._tokens.pop(key, None)
+
+        if token is not None:
+            try:
+                self._command("EVAL", _UNLOCK_SCRIPT, 1, key + ":lock", token)
+            except CacheError:
+                # Server without scripting: plain delete, the lock is short-lived anyway
+                self._command("DEL", key + ":lock")
+
+    def close(self):
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+# -------------------------------------------------------------------
+# Process-wide instance
+# -------------------------------------------------------------------
+
+BACKENDS = {
+    "memory": MemoryCache,
+    "redis": RedisCache,
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_BACKEND not in BACKENDS:
+                    raise RuntimeError(
+                        f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}, expected one of {sorted(BACKENDS)}"
+                    )
+                _cache = BACKENDS[CACHE_BACKEND]()
+
+    return _cache
+
+
+def get_cache_stats():
+    return get_cache().stats()
+
+
+def close_cache():
+
+    global _cache
+
+    with _cache_lock:
+        cache, _cache = _cache, None
+
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,160 @@
+"""
+Tiny Redis-protocol server for local development and load tests, so the
+shared cache (CACHE_BACKEND=redis) can be exercised without installing
+Redis. It implements only what app/cache.py uses: PING, AUTH, SELECT, GET,
+SET [EX|PX] [NX], DEL, EXISTS, SCAN ... MATCH, FLUSHDB and QUIT. Not for
+production.
+
+    python -m app.cache_server --port 6379
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import time
+
+
+class _Store:
+
+    def __init__(self):
+        # key -> (value, expires_at or 0)
+        self.data = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, ttl_ms=None):
+        expires_at = time.monotonic() + ttl_ms / 1000 if ttl_ms else 0
+        self.data[key] = (value, expires_at)
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(items):
+    return b"*%d\r\n" % len(items) + b"".join(
+        _array(item) if isinstance(item, list) else _bulk(item) for item in items
+    )
+
+
+def _int(value):
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+def _error(message):
+    return b"-ERR %s\r\n" % message.encode()
+
+
+def handle(store, args):
+
+    name = args[0].upper().decode()
+    args = args[1:]
+
+    if name == "PING":
+        return b"+PONG\r\n"
+
+    if name in ("AUTH", "SELECT"):
+        return OK
+
+    if name == "GET":
+        return _bulk(store.get(args[0]))
+
+    if name == "SET":
+        key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+        ttl_ms = None
+        if b"EX" in options:
+            ttl_ms = int(args[2 + options.index(b"EX") + 1]) * 1000
+        if b"PX" in options:
+            ttl_ms = int(args[2 + options.index(b"PX") + 1])
+        if b"NX" in options and store.get(key) is not None:
+            return b"$-1\r\n"
+        store.set(key, value, ttl_ms)
+        return OK
+
+    if name == "DEL":
+        return _int(sum(store.data.pop(key, None) is not None for key in args))
+
+    if name == "EXISTS":
+        return _int(sum(store.get(key) is not None for key in args))
+
+    if name == "SCAN":
+        pattern = "*"
+        options = [a.upper() for a in args]
+        if b"MATCH" in options:
+            pattern = args[options.index(b"MATCH") + 1].decode()
+        keys = [k for k in list(store.data) if store.get(k) is not None and fnmatch.fnmatchcase(k.decode(), pattern)]
+        return _array([b"0", keys])
+
+    if name == "FLUSHDB":
+        store.data.clear()
+        return OK
+
+    return _error(f"unknown command '{name}'")
+
+
+async def _read_command(reader):
+
+    line = await reader.readline()
+    if not line:
+        return None
+
+    if not line.startswith(b"*"):
+        # Inline command, e.g. "PING" typed into telnet
+        return line.split()
+
+    args = []
+    for _ in range(int(line[1:-2])):
+        size = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+async def serve(host="127.0.0.1", port=6379):
+
+    store = _Store()
+
+    async def client(reader, writer):
+        try:
+            while True:
+                args = await _read_command(reader)
+                if not args:
+                    break
+                if args[0].upper() == b"QUIT":
+                    writer.write(OK)
+                    break
+                try:
+                    writer.write(handle(store, args))
+                except (IndexError, ValueError):
+                    writer.write(_error("syntax error"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(client, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Redis-protocol cache stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    options = parser.parse_args()
+
+    print(f"Cache stand-in listening on {options.host}:{options.port}")
+    asyncio.run(serve(options.host, options.port))
@@ -0,0 +1,217 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) as ASGI middleware.
+
+The encoding is picked from Accept-Encoding, preferring zstd, then br, then
+gzip. brotli and zstd are used only when their packages (brotli or
+brotlicffi, zstandard) are installed. Bodies under COMPRESSION_MIN_SIZE are
+sent as is. Streamed responses are compressed chunk by chunk. Compression
+of large bodies runs on a worker thread so it never blocks the event loop.
+"""
+
+import json
+import os
+import zlib
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Bodies smaller than this (bytes) are not worth compressing
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Bodies / stream chunks at least this large are compressed off the event loop
+COMPRESSION_THREAD_MIN_SIZE = int(os.getenv("COMPRESSION_THREAD_MIN_SIZE", str(64 * 1024)))
+
+# Default level per encoding; brotli and zstd levels here favour speed
+COMPRESSION_LEVELS = {
+    "gzip": 6,
+    "br": 4,
+    "zstd": 3,
+}
+COMPRESSION_LEVELS.update(json.loads(os.getenv("COMPRESSION_LEVELS", "{}")))
+
+# Per-route overrides. The large, repetitive report pages compress well
+# and are worth a little more CPU. Override or extend with
+# COMPRESSION_ROUTE_LEVELS='{"/get-break-data": {"gzip": 7}}'
+ROUTE_COMPRESSION_LEVELS = {
+    "/get-transaction-data": {"gzip": 6, "br": 5, "zstd": 6},
+    "/get-time-on-status": {"gzip": 6, "br": 5, "zstd": 6},
+}
+ROUTE_COMPRESSION_LEVELS.update(json.loads(os.getenv("COMPRESSION_ROUTE_LEVELS", "{}")))
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def available_encodings():
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+_ENCODINGS = available_encodings()
+
+
+def choose_encoding(accept_encoding):
+    """Best supported encoding the client accepts (q > 0), or None."""
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+
+    for encoding in _ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+
+    return None
+
+
+def compression_level(path, encoding):
+    return ROUTE_COMPRESSION_LEVELS.get(path, {}).get(encoding, COMPRESSION_LEVELS[encoding])
+
+
+class _Compressor:
+    """Incremental compressor with the same interface for every encoding."""
+
+    def __init__(self, encoding, level):
+        if encoding == "gzip":
+            self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress, self._flush = self._obj.compress, self._obj.flush
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=level)
+            self._compress = self._obj.process
+            self._flush = self._obj.finish
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress, self._flush = self._obj.compress, self._obj.flush
+
+    def compress(self, data, final=False):
+        out = self._compress(data)
+        return out + self._flush() if final else out
+
+
+async def _run(func, data):
+    if len(data) >= COMPRESSION_THREAD_MIN_SIZE:
+        return await anyio.to_thread.run_sync(func, data)
+    return func(data)
+
+
+class CompressionMiddleware:
+
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(
+            self.app, encoding, compression_level(scope["path"], encoding), self.minimum_size
+        )
+        await responder(scope, receive, send)
+
+
+class _CompressingResponder:
+
+    def __init__(self, app, encoding, level, minimum_size):
+        self.app = app
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message):
+
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not (
+                    content_type.startswith(_COMPRESSIBLE_TYPES)
+                    or content_type.split(";")[0].endswith("+json")
+                )
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                await self.send(start)
+                await self.send(message)
+                self.passthrough = True
+                return
+
+            self.compressor = _Compressor(self.encoding, self.level)
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+
+            if more_body:
+                del headers["Content-Length"]
+                body = await _run(self.compressor.compress, body)
+            else:
+                body = await _run(lambda data: self.compressor.compress(data, final=True), body)
+                headers["Content-Length"] = str(len(body))
+
+            await self.send(start)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = await _run(lambda data: self.compressor.compress(data, final=not more_body), body)
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
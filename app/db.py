@@ -1,15 +1,638 @@
-import pyodbc
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from .cache import get_cache
+from .instrumentation import InstrumentedConnection
+from .retry import record as record_retry_event
 
 load_dotenv()
 
-def create_connection():
-    return pyodbc.connect(
-        "DRIVER={ODBC Driver 17 for SQL Server};"
-        "SERVER=localhost;"
-        "DATABASE=das_db;"
-        "UID=admin;"
-        "PWD=admin@123;"
+# "mssql" (pyodbc, the default) or "sqlite", the stand-in from sqlite_backend.py
+# for offline load testing. With sqlite, DB_CONNECTION_STRING may be a file path.
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql").lower()
+
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "10"))
+
+DB_CONNECTION_STRING = os.getenv(
+    "DB_CONNECTION_STRING",
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=localhost;"
+    "DATABASE=das_db;"
+    "UID=admin;"
+    "PWD=admin@123;"
+)
+
+# Optional read-only target (e.g. an AG secondary with ApplicationIntent=ReadOnly).
+# Report reads are routed here when set; empty means everything uses the primary.
+DB_REPLICA_CONNECTION_STRING = os.getenv("DB_REPLICA_CONNECTION_STRING", "")
+
+# After a write to the report tables, reads stay on the primary for this many
+# seconds so users don't see their own upload missing from a lagging replica.
+# The marker lives in the shared cache, so with CACHE_BACKEND=redis a write
+# through one worker keeps every worker's reads on the primary.
+REPLICA_STALENESS_SECONDS = float(os.getenv("REPLICA_STALENESS_SECONDS", "30"))
+
+# How long to stop trying the replica after it failed to hand out a connection.
+REPLICA_RETRY_AFTER_SECONDS = float(os.getenv("REPLICA_RETRY_AFTER_SECONDS", "30"))
+
+PRIMARY = "primary"
+REPLICA = "replica"
+
+# Traffic classes. Each one gets its own connection pools and worker threads
+# (see executor.py) so a burst in one class can't starve the others.
+AUTH = "auth"
+MASTER = "master"
+REPORT = "report"
+UPLOAD = "upload"
+# File downloads (/export/...) hold a connection until the last byte is
+# sent, so they get a small class of their own instead of REPORT's
+EXPORT = "export"
+
+TRAFFIC_CLASSES = (AUTH, MASTER, REPORT, UPLOAD, EXPORT)
+
+# (min_size, max_size) per class, overridable with DB_POOL_<CLASS>_MIN_SIZE /
+# DB_POOL_<CLASS>_MAX_SIZE, e.g. DB_POOL_REPORT_MAX_SIZE=12. DB_POOL_MIN_SIZE /
+# DB_POOL_MAX_SIZE, when set, replace these defaults for every class that has
+# no setting of its own (each class still gets a pool of that size).
+POOL_LIMITS = {
+    AUTH: (1, 4),
+    MASTER: (1, 4),
+    REPORT: (1, 8),
+    UPLOAD: (0, 3),
+    EXPORT: (0, 2),
+}
+
+
+def _connect_mssql(connection_string):
+    import pyodbc
+    return pyodbc.connect(connection_string)
+
+
+def _connect_sqlite(connection_string):
+    from .sqlite_backend import connect
+    # The ODBC default string means nothing here; use DB_SQLITE_PATH instead
+    return connect(None if "DRIVER=" in connection_string else connection_string)
+
+
+BACKENDS = {
+    "mssql": _connect_mssql,
+    "sqlite": _connect_sqlite,
+}
+
+if DB_BACKEND not in BACKENDS:
+    raise RuntimeError(f"Unknown DB_BACKEND {DB_BACKEND!r}, expected one of {sorted(BACKENDS)}")
+
+
+def create_connection(connection_string=DB_CONNECTION_STRING):
+    return BACKENDS[DB_BACKEND](connection_string)
+
+
+def create_replica_connection():
+    return create_connection(DB_REPLICA_CONNECTION_STRING)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of DB connections for one worker process.
+
+    - keeps at least min_size connections open, never more than max_size
+    - idle connections above min_size are closed after idle_timeout seconds
+    - connections idle longer than ping_interval are validated with SELECT 1
+      before being handed out (pre-ping)
+    """
+
+    def __init__(
+        self,
+        factory=create_connection,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        pre_ping=DB_POOL_PRE_PING,
+        ping_interval=DB_POOL_PING_INTERVAL,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.factory = factory
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        # (connection, last_used) pairs, most recently used on the right
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "acquired": 0,
+            "released": 0,
+            "ping_failures": 0,
+            "broken": 0,
+            "reaped": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+        }
+
+    # ---------------------------------------------------------------
+    # checkout / checkin
+    # ---------------------------------------------------------------
+
+    def acquire(self, timeout=None):
+
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        started = time.monotonic()
+
+        while True:
+
+            conn, last_used, must_open = self._checkout(deadline)
+
+            if must_open:
+                try:
+                    conn = self.factory()
+                except Exception:
+                    self._forget()
+                    raise
+
+                with self._lock:
+                    self._stats["created"] += 1
+                    self._stats["acquired"] += 1
+                    self._stats["wait_time_total"] += time.monotonic() - started
+
+                return conn
+
+            if self._needs_ping(last_used) and not self._ping(conn):
+                with self._lock:
+                    self._stats["ping_failures"] += 1
+                self._discard(conn)
+                continue
+
+            with self._lock:
+                self._stats["acquired"] += 1
+                self._stats["wait_time_total"] += time.monotonic() - started
+
+            return conn
+
+    def release(self, conn, discard=False):
+
+        if getattr(conn, "broken", False):
+            # A statement on it failed with a disconnect error
+            with self._lock:
+                self._stats["broken"] += 1
+            discard = True
+
+        if not discard:
+            try:
+                # Never hand the next request an open transaction
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            self._stats["released"] += 1
+
+            if self._closed:
+                self._size -= 1
+                self._stats["closed"] += 1
+                self._close_quietly(conn)
+                return
+
+            self._idle.append((conn, time.monotonic()))
+            self._available.notify()
+
+        self.reap_idle()
+
+    @contextmanager
+    def connection(self, timeout=None):
+
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ---------------------------------------------------------------
+    # maintenance
+    # ---------------------------------------------------------------
+
+    def fill(self):
+        """Open connections until min_size is reached (used at startup)."""
+
+        opened = []
+        try:
+            while True:
+                with self._lock:
+                    if self._size >= self.min_size:
+                        break
+                opened.append(self.acquire())
+        finally:
+            for conn in opened:
+                self.release(conn)
+
+        return len(opened)
+
+    def reap_idle(self):
+        """Close idle connections above min_size that exceeded idle_timeout."""
+
+        expired = []
+        now = time.monotonic()
+
+        with self._lock:
+            while (
+                self._idle
+                and self._size > self.min_size
+                and now - self._idle[0][1] > self.idle_timeout
+            ):
+                conn, _ = self._idle.popleft()
+                self._size -= 1
+                self._stats["reaped"] += 1
+                self._stats["closed"] += 1
+                expired.append(conn)
+
+        for conn in expired:
+            self._close_quietly(conn)
+
+        return len(expired)
+
+    def close(self):
+
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._stats["closed"] += len(idle)
+            self._available.notify_all()
+
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+
+        with self._lock:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                **self._stats,
+            }
+
+    # ---------------------------------------------------------------
+    # internals
+    # ---------------------------------------------------------------
+
+    def _checkout(self, deadline):
+        """
+        Returns (conn, last_used, must_open). When must_open is True a slot
+        has been reserved and the caller has to open the connection itself,
+        outside the lock.
+        """
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    return conn, last_used, False
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None, True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after waiting for a free DB connection "
+                        f"(pool max_size={self.max_size})"
+                    )
+
+                self._waiting += 1
+                try:
+                    self._available.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _needs_ping(self, last_used):
+        return self.pre_ping and time.monotonic() - last_used > self.ping_interval
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._lock:
+            self._stats["closed"] += 1
+        self._forget()
+
+    def _forget(self):
+        with self._lock:
+            self._size -= 1
+            self._available.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+def _instrumented(factory):
+    def connect():
+        return InstrumentedConnection(factory())
+    return connect
+
+
+_POOL_FACTORIES = {
+    PRIMARY: _instrumented(create_connection),
+    REPLICA: _instrumented(create_replica_connection),
+}
+
+
+def replica_configured():
+    return bool(DB_REPLICA_CONNECTION_STRING)
+
+
+def pool_limits(traffic_class):
+
+    min_default, max_default = POOL_LIMITS[traffic_class]
+    prefix = f"DB_POOL_{traffic_class.upper()}_"
+
+    return (
+        int(os.getenv(prefix + "MIN_SIZE", os.getenv("DB_POOL_MIN_SIZE", min_default))),
+        int(os.getenv(prefix + "MAX_SIZE", os.getenv("DB_POOL_MAX_SIZE", max_default))),
     )
 
+
+def get_pool(traffic_class=MASTER, target=PRIMARY):
+
+    key = (traffic_class, target)
+    pool = _pools.get(key)
+
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                min_size, max_size = pool_limits(traffic_class)
+                pool = ConnectionPool(
+                    factory=_POOL_FACTORIES[target],
+                    min_size=min_size,
+                    max_size=max_size,
+                )
+                _pools[key] = pool
+
+    return pool
+
+
+def close_pool():
+
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+# -------------------------------------------------------------------
+# Read routing
+# -------------------------------------------------------------------
+
+_routing_lock = threading.Lock()
+_last_primary_write = 0.0
+_replica_down_until = 0.0
+_routing_stats = {
+    "replica_reads": 0,
+    "primary_reads": 0,
+    "stale_redirects": 0,
+    "replica_failures": 0,
+}
+
+
+def mark_primary_write():
+    """Record a write to the report tables so reads avoid the replica for a while."""
+
+    global _last_primary_write
+
+    with _routing_lock:
+        _last_primary_write = time.monotonic()
+
+    # The entry expires with the staleness window; its presence is the marker
+    get_cache().set("routing", "primary_write", True, ttl=REPLICA_STALENESS_SECONDS)
+
+
+def _recent_primary_write(now):
+    # Local marker first, it saves a cache round trip right after our own writes
+    with _routing_lock:
+        if now - _last_primary_write < REPLICA_STALENESS_SECONDS:
+            return True
+    return get_cache().get("routing", "primary_write", False)
+
+
+def _read_target():
+
+    if not replica_configured():
+        return PRIMARY
+
+    now = time.monotonic()
+
+    with _routing_lock:
+        if now < _replica_down_until:
+            return PRIMARY
+
+    if _recent_primary_write(now):
+        with _routing_lock:
+            _routing_stats["stale_redirects"] += 1
+        return PRIMARY
+
+    return REPLICA
+
+
+def acquire_read_connection(traffic_class=REPORT):
+    """
+    Returns (pool, conn) for read-only report traffic: the replica when it is
+    configured, healthy and not stale, otherwise the primary.
+    """
+
+    global _replica_down_until
+
+    if _read_target() == REPLICA:
+        pool = get_pool(traffic_class, REPLICA)
+        try:
+            conn = pool.acquire()
+        except Exception:
+            with _routing_lock:
+                _routing_stats["replica_failures"] += 1
+                _replica_down_until = time.monotonic() + REPLICA_RETRY_AFTER_SECONDS
+        else:
+            with _routing_lock:
+                _routing_stats["replica_reads"] += 1
+            return pool, conn
+
+    pool = get_pool(traffic_class, PRIMARY)
+    conn = pool.acquire()
+
+    with _routing_lock:
+        _routing_stats["primary_reads"] += 1
+
+    return pool, conn
+
+
+def get_pool_stats():
+
+    with _routing_lock:
+        routing = dict(_routing_stats)
+
+    routing["replica_configured"] = replica_configured()
+
+    return {
+        "pools": {
+            f"{traffic_class}:{target}": pool.stats()
+            for (traffic_class, target), pool in list(_pools.items())
+        },
+        "read_routing": routing,
+    }
+
+
+class LazyConnection:
+    """
+    Stands in for a pooled connection and only checks one out on first real
+    use (cursor, commit, ...). Requests that fail authorization, or never
+    touch the DB, therefore never take a connection. Once acquired the same
+    connection is reused for the rest of the request; release() returns it.
+    """
+
+    def __init__(self, acquire):
+        # acquire() -> (pool, conn)
+        self._acquire = acquire
+        self._lock = threading.Lock()
+        self._pool = None
+        self._conn = None
+        self._cancelled = False
+
+    @property
+    def acquired(self):
+        return self._conn is not None
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    @property
+    def procedure(self):
+        """Stored procedure started last on the connection, None before any."""
+        conn = self._conn
+        return getattr(conn, "procedure", None) if conn is not None else None
+
+    def connection(self):
+
+        if self._conn is None:
+            pool, conn = self._acquire()
+
+            with self._lock:
+                self._pool, self._conn = pool, conn
+                cancelled = self._cancelled
+
+            if cancelled:
+                conn.cancel()
+
+        return self._conn
+
+    def cursor(self):
+        return self.connection().cursor()
+
+    def cancel(self):
+
+        with self._lock:
+            self._cancelled = True
+            conn = self._conn
+
+        if conn is not None:
+            conn.cancel()
+
+    def reconnect(self):
+        """Drop the current (broken) connection; the next use checks out a fresh one."""
+
+        with self._lock:
+            pool, conn = self._pool, self._conn
+            self._pool = self._conn = None
+
+        if conn is not None:
+            pool.release(conn, discard=True)
+            record_retry_event("reconnects")
+
+    def release(self):
+
+        with self._lock:
+            pool, conn = self._pool, self._conn
+            self._pool = self._conn = None
+            self._cancelled = False
+
+        if conn is not None:
+            pool.release(conn)
+
+    def __getattr__(self, name):
+        return getattr(self.connection(), name)
+
+
+def lazy_connection(traffic_class=MASTER):
+
+    def acquire():
+        pool = get_pool(traffic_class)
+        return pool, pool.acquire()
+
+    return LazyConnection(acquire)
+
+
+def lazy_read_connection(traffic_class=REPORT):
+    return LazyConnection(lambda: acquire_read_connection(traffic_class))
+
+
+@contextmanager
+def pooled_connection(traffic_class=MASTER, timeout=None):
+    with get_pool(traffic_class).connection(timeout) as conn:
+        yield conn
@@ -1,8 +1,42 @@
-from .db import create_connection
+from .db import MASTER, UPLOAD, lazy_connection, lazy_read_connection, mark_primary_write
+
+# Connections are checked out lazily on first use, so requests rejected by
+# require_role(...) never reach the DB even though `conn` is declared first.
 
 def get_db():
-    conn = create_connection()
+    """Connection for master-data CRUD (teams, practices, users, ...)."""
+    conn = lazy_connection(MASTER)
+    try:
+        yield conn
+    finally:
+        conn.release()
+
+def get_read_db():
+    """Connection for read-only report queries (replica when available)."""
+    conn = lazy_read_connection()
+    try:
+        yield conn
+    finally:
+        conn.release()
+
+def get_write_db():
+    """Primary connection for single-row edits and deletes on report tables."""
+    conn = lazy_connection(MASTER)
+    try:
+        yield conn
+    finally:
+        wrote = conn.acquired
+        conn.release()
+        if wrote:
+            mark_primary_write()
+
+def get_upload_db():
+    """Primary connection for bulk Excel ingestion, isolated from other traffic."""
+    conn = lazy_connection(UPLOAD)
     try:
         yield conn
     finally:
-        conn.close()
\ No newline at end of file
+        wrote = conn.acquired
+        conn.release()
+        if wrote:
+            mark_primary_write()
@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .db import AUTH, EXPORT, MASTER, REPORT, TRAFFIC_CLASSES, UPLOAD
+from .timeouts import QueryTimeoutError
+
+# Worker threads per traffic class, overridable with DB_WORKERS_<CLASS>.
+# Keep each at or below the matching DB pool max_size, otherwise the extra
+# threads only queue inside the pool.
+WORKER_LIMITS = {
+    AUTH: 4,
+    MASTER: 4,
+    REPORT: 8,
+    UPLOAD: 2,
+    EXPORT: 2,
+}
+
+
+class Bulkhead:
+    """Bounded thread pool for one traffic class, with saturation counters."""
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"db-{name}"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._peak_queued = 0
+
+    def submit(self, func):
+
+        with self._lock:
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        def task():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                result = func()
+            except BaseException:
+                with self._lock:
+                    self._failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+            return result
+
+        return self._executor.submit(task)
+
+    def stats(self):
+
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self._running,
+                "queued": self._queued,
+                "peak_queued": self._peak_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "saturated": self._running >= self.max_workers,
+            }
+
+    @property
+    def queued(self):
+        return self._queued
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_bulkheads = {
+    name: Bulkhead(name, int(os.getenv(f"DB_WORKERS_{name.upper()}", WORKER_LIMITS[name])))
+    for name in TRAFFIC_CLASSES
+}
+
+
+async def run_db(traffic_class, func, *args, **kwargs):
+    """
+    Run blocking pyodbc / pandas work on the worker pool of the given traffic
+    class so async routes never block the event loop.
+    """
+
+    future = asyncio.wrap_future(
+        _bulkheads[traffic_class].submit(functools.partial(func, *args, **kwargs))
+    )
+
+    try:
+        return await asyncio.shield(future)
+
+    except asyncio.CancelledError:
+        # A worker thread can't be interrupted. Wait for it before the
+        # request unwinds so the dependency doesn't hand its connection to
+        # another request while the thread is still using it.
+        await asyncio.wait([future])
+        raise
+
+
+class _QueuedCall:
+    """
+    A call that can be called off while it still waits for a worker thread.
+    Once called off it never starts, so it can't pick up the connection of
+    a request that has already given up on it.
+    """
+
+    def __init__(self, func, procedure, timeout):
+        self.func = func
+        self.procedure = procedure
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._started = False
+        self._called_off = False
+
+    def __call__(self):
+        with self._lock:
+            if self._called_off:
+                raise QueryTimeoutError(self.procedure, self.timeout)
+            self._started = True
+        return self.func()
+
+    def call_off(self):
+        """Returns True when the call had already started on a worker thread."""
+        with self._lock:
+            self._called_off = True
+            return self._started
+
+
+def _procedure_name(conn, procedure, func):
+    # The statement last started on the connection, when there was one
+    return getattr(conn, "procedure", None) or procedure or getattr(func, "__name__", "query")
+
+
+async def run_db_with_timeout(traffic_class, timeout, conn, func, *args, procedure=None, **kwargs):
+    """
+    Like run_db, but gives up after `timeout` seconds (queueing included):
+    the statement running on `conn` is cancelled on the server, the worker
+    thread is allowed to unwind, and QueryTimeoutError is raised naming the
+    stored procedure (`procedure` when no statement had started yet). Work
+    still queued for a worker thread is called off and never runs.
+    """
+
+    if not timeout:
+        return await run_db(traffic_class, func, *args, **kwargs)
+
+    call = _QueuedCall(functools.partial(func, *args, **kwargs), procedure, timeout)
+    future = asyncio.wrap_future(_bulkheads[traffic_class].submit(call))
+    # A called-off call still fails once it reaches a worker; nobody awaits it then
+    future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    try:
+        done, _ = await asyncio.wait([future], timeout=timeout)
+
+    except asyncio.CancelledError:
+        if call.call_off():
+            conn.cancel()
+            await asyncio.wait([future])
+        raise
+
+    if future in done:
+        return future.result()
+
+    if call.call_off():
+        conn.cancel()
+        await asyncio.wait([future])
+
+    raise QueryTimeoutError(_procedure_name(conn, procedure, func), timeout)
+
+
+def queue_depth(traffic_class):
+    return _bulkheads[traffic_class].queued
+
+
+def get_executor_stats():
+    return {name: bulkhead.stats() for name, bulkhead in _bulkheads.items()}
+
+
+def shutdown_executor():
+    for bulkhead in _bulkheads.values():
+        bulkhead.shutdown()
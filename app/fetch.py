@@ -0,0 +1,91 @@
+import os
+
+# Rows pulled per round trip when reading result sets
+DB_FETCH_BATCH_SIZE = int(os.getenv("DB_FETCH_BATCH_SIZE", "1000"))
+
+# Result shapes
+DICT = "dict"           # [{"col": value, ...}, ...]   (the historical API shape)
+TUPLE = "tuple"         # {"columns": [...], "rows": [[...], ...]}
+COLUMNAR = "columnar"   # {"col": [values...], ...}
+
+SHAPES = (DICT, TUPLE, COLUMNAR)
+
+
+def column_names(cursor):
+    return [col[0] for col in cursor.description]
+
+
+def iter_batches(cursor, batch_size=DB_FETCH_BATCH_SIZE):
+    """Yield lists of rows using fetchmany until the result set is exhausted."""
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_rows(cursor, batch_size=DB_FETCH_BATCH_SIZE):
+    """
+    Lazily yield rows from the current result set. Nothing is materialized
+    beyond one fetchmany batch, so the cursor must stay open while iterating.
+    """
+
+    for batch in iter_batches(cursor, batch_size):
+        yield from batch
+
+
+def fetch_rows(cursor, shape=DICT, batch_size=DB_FETCH_BATCH_SIZE):
+    """Read the current result set of `cursor` in the requested shape."""
+
+    columns = column_names(cursor)
+
+    if shape == DICT:
+        return [dict(zip(columns, row)) for row in iter_rows(cursor, batch_size)]
+
+    if shape == TUPLE:
+        return {
+            "columns": columns,
+            "rows": [tuple(row) for row in iter_rows(cursor, batch_size)],
+        }
+
+    if shape == COLUMNAR:
+        values = [[] for _ in columns]
+        appends = [column.append for column in values]
+        for row in iter_rows(cursor, batch_size):
+            for append, value in zip(appends, row):
+                append(value)
+        return dict(zip(columns, values))
+
+    raise ValueError(f"Unknown result shape: {shape}")
+
+
+def fetch_paged(cursor, shape=DICT, batch_size=DB_FETCH_BATCH_SIZE):
+    """
+    For procedures that return the total row count as their first result set
+    and the rows as the second. Returns (rows, total_rows).
+    """
+
+    total_rows = cursor.fetchone()[0]
+    cursor.nextset()
+
+    return fetch_rows(cursor, shape, batch_size), total_rows
+
+
+def fetch_one(cursor):
+    """First row of the current result set as a dict, or None."""
+
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return dict(zip(column_names(cursor), row))
+
+
+def row_count(result):
+    """Number of rows in a result produced by fetch_rows, whatever its shape."""
+
+    if isinstance(result, list):
+        return len(result)
+    if "rows" in result and "columns" in result:
+        return len(result["rows"])
+    return len(next(iter(result.values()), []))
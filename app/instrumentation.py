@@ -0,0 +1,456 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .retry import is_disconnect
+from .timeouts import QueryTimeoutError, is_timeout_error, procedure_timeout
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +inf
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Idle prepared cursors kept per connection, keyed by SQL text; 0 disables
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "32"))
+
+_EXEC_RE = re.compile(r"^\s*EXEC(?:UTE)?\s+([\w.\[\]]+)", re.IGNORECASE)
+_VERB_RE = re.compile(r"^\s*(\w+)")
+
+
+def procedure_name(sql):
+    """
+    "EXEC sp_GetTransactionData ?, ?, ?, ?" -> "sp_GetTransactionData".
+    Ad-hoc statements are grouped by verb, e.g. "<DELETE>".
+    """
+
+    match = _EXEC_RE.match(sql)
+    if match:
+        return match.group(1).replace("[", "").replace("]", "")
+
+    match = _VERB_RE.match(sql)
+    return f"<{match.group(1).upper()}>" if match else "<unknown>"
+
+
+class ProcedureStats:
+
+    __slots__ = (
+        "calls", "errors", "total_ms", "max_ms",
+        "rows_fetched", "rows_affected", "buckets"
+    )
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows_fetched = 0
+        self.rows_affected = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms, error):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def as_dict(self):
+
+        histogram = {f"le_{bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+        histogram["le_inf"] = self.buckets[-1]
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "total_ms": round(self.total_ms, 3),
+            "p50_ms": self._percentile(0.50),
+            "p95_ms": self._percentile(0.95),
+            "p99_ms": self._percentile(0.99),
+            "rows_fetched": self.rows_fetched,
+            "rows_affected": self.rows_affected,
+            "latency_histogram": histogram,
+        }
+
+    def _percentile(self, q):
+        """Upper bound of the bucket holding the q-th call (None past the last bound)."""
+
+        if not self.calls:
+            return 0.0
+
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= target:
+                return float(bound)
+        return None
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _entry(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = ProcedureStats()
+    return stats
+
+
+def record_call(name, elapsed_ms, error=False):
+    with _stats_lock:
+        _entry(name).observe(elapsed_ms, error)
+
+
+def record_rows_fetched(name, count):
+    if count:
+        with _stats_lock:
+            _entry(name).rows_fetched += count
+
+
+def record_rows_affected(name, count):
+    if count and count > 0:
+        with _stats_lock:
+            _entry(name).rows_affected += count
+
+
+def get_procedure_stats():
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in sorted(_stats.items())}
+
+
+def reset_procedure_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+_statement_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def _record_statement(event, count=1):
+    with _stats_lock:
+        _statement_stats[event] += count
+
+
+def get_statement_cache_stats():
+    with _stats_lock:
+        stats = dict(_statement_stats)
+
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["max_size_per_connection"] = DB_STATEMENT_CACHE_SIZE
+
+    return stats
+
+
+class InstrumentedCursor:
+    """
+    Thin wrapper over a pyodbc cursor that times execute / executemany and
+    counts rows per stored procedure. Everything else (description, rowcount,
+    nextset, commit, fast_executemany, ...) is passed through untouched.
+
+    The underlying cursor is opened on first execute, once the procedure and
+    therefore its query timeout are known (pyodbc applies the connection's
+    timeout when a cursor is created). Parameterized statements borrow a
+    prepared cursor from the connection's statement cache and give it back
+    on close(), so repeated calls skip the cursor allocation and SQLPrepare.
+    """
+
+    def __init__(self, connection):
+        object.__setattr__(self, "_connection", connection)
+        object.__setattr__(self, "_cursor", None)
+        object.__setattr__(self, "_key", None)
+        object.__setattr__(self, "_timeout", None)
+        object.__setattr__(self, "_attrs", {})
+        object.__setattr__(self, "_procedure", "<unknown>")
+        object.__setattr__(self, "_timeout_override", None)
+
+    def set_timeout(self, seconds):
+        """Use this query timeout for the following statements instead of the procedure's."""
+        object.__setattr__(self, "_timeout_override", seconds)
+
+    def _statement_key(self, sql, params, timeout):
+
+        # Only parameterized statements are prepared by pyodbc
+        if not params or not DB_STATEMENT_CACHE_SIZE:
+            return None
+
+        try:
+            attrs = tuple(sorted(self._attrs.items()))
+            hash(attrs)
+        except TypeError:
+            return None
+
+        return sql, timeout, attrs
+
+    def _bind(self, name, sql=None, params=()):
+
+        timeout = self._timeout_override if self._timeout_override is not None else procedure_timeout(name)
+        key = self._statement_key(sql, params, timeout)
+
+        if self._cursor is not None:
+            if key is not None and key == self._key:
+                return self._cursor
+            if key is None and self._key is None and timeout == self._timeout:
+                return self._cursor
+            self._release_cursor()
+
+        cursor = self._connection.open_cursor(timeout, key)
+        for attr, value in self._attrs.items():
+            setattr(cursor, attr, value)
+
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_key", key)
+        object.__setattr__(self, "_timeout", timeout)
+
+        return cursor
+
+    def _release_cursor(self, reusable=True):
+
+        cursor, key = self._cursor, self._key
+        object.__setattr__(self, "_cursor", None)
+        object.__setattr__(self, "_key", None)
+
+        if reusable and key is not None:
+            self._connection.recycle_cursor(key, cursor)
+        else:
+            cursor.close()
+
+    def _run(self, method, sql, params):
+
+        name = procedure_name(sql)
+        object.__setattr__(self, "_procedure", name)
+
+        cursor = self._bind(name, sql, params)
+
+        start = time.perf_counter()
+        try:
+            self._connection.begin_statement(cursor, name, self._timeout)
+            try:
+                getattr(cursor, method)(sql, *params)
+            finally:
+                self._connection.end_statement(cursor)
+
+        except Exception as e:
+            record_call(name, (time.perf_counter() - start) * 1000, error=True)
+            # A failed or cancelled statement handle is not worth keeping
+            if self._cursor is not None:
+                self._release_cursor(reusable=False)
+            if isinstance(e, QueryTimeoutError):
+                raise
+            if is_timeout_error(e):
+                raise QueryTimeoutError(name, self._timeout) from e
+            if is_disconnect(e):
+                self._connection.mark_broken()
+            raise
+
+        record_call(name, (time.perf_counter() - start) * 1000)
+
+        return name, cursor
+
+    def execute(self, sql, *params):
+
+        name, cursor = self._run("execute", sql, params)
+
+        if cursor.description is None:
+            record_rows_affected(name, cursor.rowcount)
+
+        return self
+
+    def executemany(self, sql, seq_of_params):
+
+        name, _ = self._run("executemany", sql, (seq_of_params,))
+
+        # rowcount is unreliable after executemany; count parameter sets instead
+        try:
+            record_rows_affected(name, len(seq_of_params))
+        except TypeError:
+            pass
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            record_rows_fetched(self._procedure, 1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size)
+        record_rows_fetched(self._procedure, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        record_rows_fetched(self._procedure, len(rows))
+        return rows
+
+    def close(self):
+        if self._cursor is not None:
+            self._release_cursor()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getattr__(self, name):
+        if self._cursor is None:
+            if name in self._attrs:
+                return self._attrs[name]
+            if name == "description":
+                return None
+            if name == "rowcount":
+                return -1
+            return getattr(self._bind(self._procedure), name)
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        self._attrs[name] = value
+        if self._cursor is not None:
+            setattr(self._cursor, name, value)
+
+
+class InstrumentedConnection:
+    """
+    Connection wrapper whose cursors are InstrumentedCursor instances. It also
+    tracks the statement in flight so another thread can cancel it, and
+    remembers disconnect errors (`broken`) so the pool discards it on release.
+    """
+
+    def __init__(self, conn):
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "broken", False)
+        object.__setattr__(self, "_lock", threading.Lock())
+        object.__setattr__(self, "_active", None)
+        object.__setattr__(self, "_cancelled", False)
+        # Procedure of the statement started last, for timeout reports
+        object.__setattr__(self, "procedure", None)
+        # statement key -> idle prepared cursor, least recently used first
+        object.__setattr__(self, "_statements", OrderedDict())
+
+    def cursor(self):
+        return InstrumentedCursor(self)
+
+    def open_cursor(self, timeout, key=None):
+        """
+        A cursor for one statement: an idle cached one for `key` if there is
+        one (it is removed from the cache while in use), else a new cursor.
+        """
+
+        if key is not None:
+            with self._lock:
+                cursor = self._statements.pop(key, None)
+            if cursor is not None:
+                _record_statement("hits")
+                return cursor
+            _record_statement("misses")
+
+        self._conn.timeout = timeout
+        return self._conn.cursor()
+
+    def recycle_cursor(self, key, cursor):
+        """Put a cursor back into the statement cache, keeping its prepared handle."""
+
+        try:
+            # Discard pending results (nextset keeps the prepared statement),
+            # otherwise the connection stays busy for the next statement
+            while cursor.nextset():
+                pass
+        except Exception:
+            cursor.close()
+            return
+
+        stale = []
+        with self._lock:
+            if self.broken:
+                stale.append(cursor)
+            else:
+                previous = self._statements.pop(key, None)
+                if previous is not None:
+                    stale.append(previous)
+                self._statements[key] = cursor
+                while len(self._statements) > DB_STATEMENT_CACHE_SIZE:
+                    stale.append(self._statements.popitem(last=False)[1])
+                    _record_statement("evictions")
+
+        for old in stale:
+            self._close_quietly(old)
+
+    def clear_statement_cache(self):
+
+        with self._lock:
+            cursors = list(self._statements.values())
+            self._statements.clear()
+
+        if cursors:
+            _record_statement("invalidations", len(cursors))
+
+        for cursor in cursors:
+            self._close_quietly(cursor)
+
+    @staticmethod
+    def _close_quietly(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def begin_statement(self, cursor, name, timeout):
+        with self._lock:
+            if self._cancelled:
+                raise QueryTimeoutError(name, timeout)
+            object.__setattr__(self, "_active", cursor)
+            object.__setattr__(self, "procedure", name)
+
+    def end_statement(self, cursor):
+        with self._lock:
+            object.__setattr__(self, "_active", None)
+
+    def cancel(self):
+        """
+        Cancel the running statement (safe to call from another thread) and
+        refuse further statements until the connection is rolled back.
+        """
+
+        with self._lock:
+            object.__setattr__(self, "_cancelled", True)
+            cursor = self._active
+
+        if cursor is not None:
+            try:
+                cursor.cancel()
+            except Exception:
+                pass
+
+    def mark_broken(self):
+        object.__setattr__(self, "broken", True)
+        self.clear_statement_cache()
+
+    def close(self):
+        self.clear_statement_cache()
+        self._conn.close()
+
+    def rollback(self):
+        # Called by the pool on release: the connection is clean again
+        with self._lock:
+            object.__setattr__(self, "_cancelled", False)
+            object.__setattr__(self, "procedure", None)
+        self._conn.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
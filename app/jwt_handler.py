@@ -1,40 +1,292 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from typing import List, Union
 from jose import jwt
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer
 
+from .cache import CacheError, get_cache
+from .revocation import is_revoked, revoke
+
 SECRET_KEY = "supersecret"
 ALGORITHM = "HS256"
+TOKEN_LIFETIME = timedelta(hours=8)
 security = HTTPBearer()
 
+# Refresh tokens are signed with their own key so they can never pass as
+# access tokens. Each refresh rotates the token; a session can be extended
+# by refreshing until REFRESH_MAX_SESSION_HOURS after the password login.
+REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY", SECRET_KEY + ":refresh")
+REFRESH_TOKEN_LIFETIME = timedelta(hours=float(os.getenv("REFRESH_TOKEN_HOURS", "12")))
+REFRESH_MAX_SESSION = timedelta(hours=float(os.getenv("REFRESH_MAX_SESSION_HOURS", "168")))
+
+# Seconds a rotated refresh token may still be used (parallel tabs racing);
+# reuse after that is treated as theft and ends the whole session family.
+REFRESH_REUSE_GRACE = float(os.getenv("REFRESH_REUSE_GRACE", "10"))
+
+# Rotation state (used token ids, ended session families) must be seen by
+# every worker and survive restarts, so refresh tokens are only issued with
+# the shared cache: CACHE_BACKEND=redis with persistence on and an eviction
+# policy that keeps these keys. With a per-process cache the app refuses to
+# start while REFRESH_TOKENS is on.
+REFRESH_TOKENS = os.getenv("REFRESH_TOKENS", "false").lower() in ("1", "true", "yes")
+
+# A user-wide revocation has to outlive every token issued before it,
+# refresh tokens included
+USER_REVOCATION_LIFETIME = max(TOKEN_LIFETIME, REFRESH_MAX_SESSION)
+
+# Verified payloads kept per worker, keyed by SHA-256 of the token; 0 disables
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified token payloads. Entries expire at the token's own
+    exp, so a hit is exactly as valid as a fresh jwt.decode would be.
+    """
+
+    def __init__(self, max_size=TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # digest -> (payload, exp), least recently used first
+        self._entries = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "verifications": 0,
+            "invalid": 0,
+            "verify_ms_total": 0.0,
+            "verify_ms_max": 0.0,
+        }
+
+    def get(self, digest):
+
+        with self._lock:
+            entry = self._entries.get(digest)
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[digest]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(digest)
+            self._stats["hits"] += 1
+            return payload
+
+    def put(self, digest, payload):
+
+        exp = payload.get("exp")
+        if not self.max_size or not isinstance(exp, (int, float)):
+            return
+
+        with self._lock:
+            self._entries[digest] = (payload, exp)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def record_verification(self, elapsed_ms, valid):
+        with self._lock:
+            self._stats["verifications"] += 1
+            if not valid:
+                self._stats["invalid"] += 1
+            self._stats["verify_ms_total"] += elapsed_ms
+            self._stats["verify_ms_max"] = max(self._stats["verify_ms_max"], elapsed_ms)
+
+    def stats(self):
+
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["verify_ms_avg"] = (
+            round(stats["verify_ms_total"] / stats["verifications"], 4) if stats["verifications"] else 0.0
+        )
+        stats["verify_ms_total"] = round(stats["verify_ms_total"], 3)
+        stats["verify_ms_max"] = round(stats["verify_ms_max"], 4)
+        stats["max_size"] = self.max_size
+
+        return stats
+
+
+_token_cache = TokenCache()
+
+
+def get_token_cache_stats():
+    return _token_cache.stats()
+
 def create_token(user):
 
     payload = {
         "user_id": user["user_id"],
         "username": user["username"],
         "role": user["role"],
-        "exp": datetime.utcnow() + timedelta(hours=8)
+        "jti": uuid.uuid4().hex,
+        # Sub-second iat, so a login right after a user-wide revocation is
+        # not mistaken for a token issued before it (see revocation.is_revoked)
+        "iat": time.time(),
+        "exp": datetime.utcnow() + TOKEN_LIFETIME
     }
 
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
     return token
 
-def get_current_user(token = Depends(security)):
+def create_refresh_token(user, family=None, auth_time=None):
+
+    issued = time.time()
+    auth_time = auth_time or int(issued)
+
+    payload = {
+        "typ": "refresh",
+        "user_id": user["user_id"],
+        "username": user["username"],
+        "role": user["role"],
+        "jti": uuid.uuid4().hex,
+        # fid ties every rotation of one login together; auth_time is the login itself
+        "fid": family or uuid.uuid4().hex,
+        "auth_time": auth_time,
+        "iat": issued,
+        "exp": min(
+            datetime.utcfromtimestamp(issued) + REFRESH_TOKEN_LIFETIME,
+            datetime.utcfromtimestamp(auth_time) + REFRESH_MAX_SESSION
+        )
+    }
+
+    return jwt.encode(payload, REFRESH_SECRET_KEY, algorithm=ALGORITHM)
+
+def rotate_refresh_token(refresh_token):
+    """
+    Exchange a valid refresh token for a new access token and a new refresh
+    token, without a DB round trip. Rotation state (used token ids, killed
+    session families) lives in the shared cache.
+    """
+
+    if not REFRESH_TOKENS:
+        raise HTTPException(status_code=404, detail="Refresh tokens are disabled")
+
+    try:
+        payload = jwt.decode(refresh_token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    if payload.get("typ") != "refresh":
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # Covers logout of the refresh token and admin "revoke user"
+    if is_revoked(payload, refresh_token):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    sessions = get_cache().namespace("refresh")
+
+    if sessions.get(f"family:{payload['fid']}"):
+        raise HTTPException(status_code=401, detail="Session ended")
+
+    now = time.time()
+    ttl = max(1, payload["exp"] - now)
+
+    try:
+        # Set-if-absent, so of two concurrent uses exactly one is the first
+        first_use = sessions.add(f"used:{payload['jti']}", now, ttl=ttl)
+    except (OSError, CacheError):
+        raise HTTPException(status_code=503, detail="Session store unavailable, please retry")
+
+    if not first_use:
+        used_at = sessions.get(f"used:{payload['jti']}")
+        if used_at is None or now - used_at > REFRESH_REUSE_GRACE:
+            # A rotated token came back: someone else holds a copy of it
+            sessions.set(f"family:{payload['fid']}", True, ttl=REFRESH_MAX_SESSION.total_seconds())
+            raise HTTPException(status_code=401, detail="Session ended")
+
+    user = {
+        "user_id": payload["user_id"],
+        "username": payload["username"],
+        "role": payload["role"],
+    }
+
+    return (
+        user,
+        create_token(user),
+        create_refresh_token(user, family=payload["fid"], auth_time=payload["auth_time"]),
+    )
+
+def check_refresh_store():
+    """Refuse to run refresh tokens on a cache that each worker keeps to itself."""
+
+    if REFRESH_TOKENS and not get_cache().shared:
+        raise RuntimeError(
+            "REFRESH_TOKENS needs a shared cache for rotation state "
+            "(CACHE_BACKEND=redis); set REFRESH_TOKENS=false to run without refresh tokens"
+        )
+
+def end_refresh_session(refresh_token, revoked_by):
+    """Logout: revoke the refresh token and stop its session family rotating."""
 
     try:
+        payload = jwt.decode(refresh_token, REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+    except Exception:
+        # Expired or foreign refresh tokens can't be used anyway
+        return
+
+    revoke(payload, refresh_token, revoked_by)
+    get_cache().namespace("refresh").set(
+        f"family:{payload['fid']}", True, ttl=REFRESH_MAX_SESSION.total_seconds()
+    )
 
+def verify_token(credentials):
+    """Payload of a valid token, from the cache when it was verified before."""
+
+    digest = hashlib.sha256(credentials.encode()).digest()
+
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+
+    start = time.perf_counter()
+    try:
         payload = jwt.decode(
-            token.credentials,
-            "supersecret",
-            algorithms=["HS256"]
+            credentials,
+            SECRET_KEY,
+            algorithms=[ALGORITHM]
         )
+    except Exception:
+        _token_cache.record_verification((time.perf_counter() - start) * 1000, valid=False)
+        raise
 
-        return payload
+    _token_cache.record_verification((time.perf_counter() - start) * 1000, valid=True)
+    _token_cache.put(digest, payload)
+
+    return dict(payload)
+
+def get_current_user(token = Depends(security)):
+
+    try:
+
+        payload = verify_token(token.credentials)
 
     except:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    if is_revoked(payload, token.credentials):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    return payload
     
 def require_role(roles: Union[str, List[str]]):
 
@@ -1,14 +1,27 @@
 from dotenv import load_dotenv
-from typing import List
-from fastapi import FastAPI, Form, HTTPException, UploadFile, File, Depends,APIRouter
-from app.response import api_response,api_get_response
-from app.schemas import  AgentLoginResponse, AgentTimeOnStatusResponse, AgentTimeOnStatusResponse, BreakDataResponse, DeleteReportRequest, FSSCResponse, GroupCreate, GroupUpdate, NextechCreate, NextechUpdate, PracticeCreate, PracticeGroupCreate, PracticeGroupUpdate, PracticeGroupUpdate, PracticeUpdate, ReportRequest, TeamCreate, TeamUpdate,  UpdateAgentTimeOnStatusRequest, UpdateBreakDataSchema, UpdateLoginRequest, UpdateUser, UserCreate, VonageCreate, VonageUpdate
-from .services import  db_create_group, db_create_practice, db_create_practice_group, db_get_NextTechID_data, db_get_group_data, db_get_practice_data, db_get_practice_group_data, db_get_user_data, db_update_group, db_update_practice, db_update_practice_group, insert_nextech, insert_user, update_nextech_service, update_user_service, update_vonage_service,insert_vonage,db_get_VonageID_data, db_update_team,db_delete_team, db_get_all_teams,db_get_team_by_id, get_agent_login_by_date, get_break_data_by_date_range, get_fssc_data_by_date_range, get_modmed_data, get_nextech_data, get_refused_data,  get_time_on_status_by_date_range, get_transaction_data, insert_team, process_delete_reports, process_excel_logindata, process_excel_daily_breakdata, process_excel_refused, process_excel_time_on_status, process_excel_transaction_data,process_excel_form_submission_data,process_excel_modmed_data,process_excel_nextch_data, process_update_break_data, process_update_login_data, process_update_time_on_status
+from typing import List, Optional
+from fastapi import FastAPI, Form, HTTPException, UploadFile, File, Depends,APIRouter, Request
+from app.response import FastJSONResponse, api_response,api_get_response, report_format
+from app.schemas import  AgentLoginResponse, AgentTimeOnStatusResponse, AgentTimeOnStatusResponse, BreakDataResponse, DeleteReportRequest, ExportRequest, FSSCResponse, GroupCreate, GroupUpdate, NextechCreate, NextechUpdate, PracticeCreate, PracticeGroupCreate, PracticeGroupUpdate, PracticeGroupUpdate, PracticeUpdate, RefreshTokenRequest, ReportRequest, RevokeTokenRequest, TeamCreate, TeamUpdate,  UpdateAgentTimeOnStatusRequest, UpdateBreakDataSchema, UpdateLoginRequest, UpdateUser, UserCreate, VonageCreate, VonageUpdate
+from .services import  REPORT_PROCEDURES, UnknownReportFieldsError, db_create_group, db_create_practice, db_create_practice_group, db_get_NextTechID_data, db_get_group_data, db_get_practice_data, db_get_practice_group_data, db_get_user_data, db_update_group, db_update_practice, db_update_practice_group, insert_nextech, insert_user, update_nextech_service, update_user_service, update_vonage_service,insert_vonage,db_get_VonageID_data, db_update_team,db_delete_team, db_get_all_teams,db_get_team_by_id, get_agent_login_by_date, get_break_data_by_date_range, get_fssc_data_by_date_range, get_modmed_data, get_nextech_data, get_refused_data,  get_time_on_status_by_date_range, get_transaction_data, insert_team, process_delete_reports, process_excel_logindata, process_excel_daily_breakdata, process_excel_refused, process_excel_time_on_status, process_excel_transaction_data,process_excel_form_submission_data,process_excel_modmed_data,process_excel_nextch_data, process_update_break_data, process_update_login_data, process_update_time_on_status
 from fastapi.middleware.cors import CORSMiddleware
-from .jwt_handler import create_token, require_role
-from fastapi.encoders import jsonable_encoder
-
-from .dependencies import get_db
+from .jwt_handler import ALGORITHM, REFRESH_TOKENS, SECRET_KEY, USER_REVOCATION_LIFETIME, check_refresh_store, create_refresh_token, create_token, end_refresh_session, get_current_user, get_token_cache_stats, require_role, rotate_refresh_token, security
+from .revocation import get_revocation_stats, revoke, revoke_user, start_revocation_refresh, stop_revocation_refresh
+from jose import jwt
+
+from .dependencies import get_db, get_read_db, get_upload_db, get_write_db
+from .cache import close_cache, get_cache_stats
+from .compression import CompressionMiddleware
+from .db import AUTH, MASTER, REPORT, UPLOAD, PoolTimeoutError, close_pool, get_pool_stats
+from .executor import get_executor_stats, queue_depth, run_db, run_db_with_timeout, shutdown_executor
+from .instrumentation import get_procedure_stats, get_statement_cache_stats
+from .retry import DB_RETRY_AFTER, TransientDatabaseError, get_retry_stats
+from .arrow_export import EXPORT_FORMATS, pa
+from .streaming import export_report, export_report_csv, should_stream, stream_report
+from .throttle import check_login, client_ip, get_throttle_stats
+from .versions import etag_matches, get_version_stats, master_etag, not_modified, with_etag
+from .timeouts import QueryTimeoutError, route_timeout
+from .warmup import DB_WARMUP, get_warmup_report, warm_up
 from .auth_service import login_user
 from datetime import date
 import shutil
@@ -26,7 +39,8 @@ app = FastAPI(
     description="DAS API description",
     version="3.1.0",
     docs_url="/swagger",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -37,21 +51,150 @@ app.add_middleware(
     allow_headers=["*"],   # allow all headers
 )
 
+# gzip / br / zstd, negotiated per request (see app/compression.py)
+app.add_middleware(CompressionMiddleware)
+
+@app.exception_handler(QueryTimeoutError)
+async def query_timeout_handler(request, exc: QueryTimeoutError):
+    return api_response(
+        status="failed",
+        message="Query timed out",
+        data={"procedure": exc.procedure, "timeout_seconds": exc.timeout},
+        status_code=504
+    )
+
+@app.exception_handler(UnknownReportFieldsError)
+async def unknown_report_fields_handler(request, exc: UnknownReportFieldsError):
+    return api_response(
+        status="failed",
+        message=str(exc),
+        data={"unknown_fields": exc.unknown, "allowed_fields": exc.available},
+        status_code=422
+    )
+
+@app.exception_handler(TransientDatabaseError)
+async def transient_db_error_handler(request, exc: TransientDatabaseError):
+    response = api_response(
+        status="failed",
+        message="Database temporarily unavailable, please retry",
+        data={"operation": exc.operation, "attempts": exc.attempts},
+        status_code=503
+    )
+    response.headers["Retry-After"] = str(DB_RETRY_AFTER)
+    return response
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request, exc: PoolTimeoutError):
+    response = api_response(
+        status="failed",
+        message="All database connections are busy, please retry",
+        data={"detail": str(exc)},
+        status_code=503
+    )
+    response.headers["Retry-After"] = str(DB_RETRY_AFTER)
+    return response
+
+@app.on_event("startup")
+async def warm_up_db():
+    check_refresh_store()
+    # uvicorn only starts accepting connections once startup handlers finish
+    if DB_WARMUP:
+        await run_db(REPORT, warm_up)
+    start_revocation_refresh()
+
+@app.on_event("shutdown")
+def shutdown_db_pool():
+    stop_revocation_refresh()
+    shutdown_executor()
+    close_pool()
+    close_cache()
+
 @router.post("/login")
-def login(data: dict):
+async def login(data: dict, request: Request):
 
-    user = login_user(data["username"], data["password"])
+    retry_after = check_login(data.get("username"), client_ip(request), queue_depth(AUTH))
+
+    if retry_after:
+        response = api_response(
+            status="failed",
+            message="Too many login attempts, please try again later",
+            data={"retry_after_seconds": round(retry_after)},
+            status_code=429
+        )
+        response.headers["Retry-After"] = str(max(1, round(retry_after)))
+        return response
+
+    user = await run_db(AUTH, login_user, data["username"], data["password"])
 
     if not user:
         return {"error": "Invalid credentials"}
 
     token = create_token(user)
 
+    response = {
+        "access_token": token,
+        "role": user["role"]
+    }
+
+    if REFRESH_TOKENS:
+        response["refresh_token"] = create_refresh_token(user)
+
+    return response
+
+@router.post("/refresh")
+def refresh_session(data: RefreshTokenRequest):
+
+    user, token, refresh_token = rotate_refresh_token(data.refresh_token)
+
     return {
         "access_token": token,
+        "refresh_token": refresh_token,
         "role": user["role"]
     }
 
+@router.post("/logout")
+def logout(
+    data: Optional[RefreshTokenRequest] = None,
+    token = Depends(security),
+    user = Depends(get_current_user)
+):
+
+    revoke(user, token.credentials, revoked_by=user["user_id"])
+
+    if data is not None:
+        end_refresh_session(data.refresh_token, revoked_by=user["user_id"])
+
+    return api_response(
+        status="success",
+        message="Logged out successfully",
+        status_code=200
+    )
+
+@router.post("/revoke")
+def revoke_tokens(
+    data: RevokeTokenRequest,
+    user = Depends(require_role(["Admin"]))
+):
+
+    if data.token:
+        try:
+            # Expired tokens are harmless already, but revoking them is not an error
+            payload = jwt.decode(data.token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+        except Exception:
+            return api_response(status="failed", message="Invalid token", status_code=400)
+
+        revoke(payload, data.token, revoked_by=user["user_id"])
+
+    else:
+        revoke_user(data.user_id, revoked_by=user["user_id"], token_lifetime=USER_REVOCATION_LIFETIME)
+
+    return api_response(
+        status="success",
+        message="Token revoked successfully",
+        data={"user_id": data.user_id} if not data.token else None,
+        status_code=200
+    )
+
 @app.post("/nexttechid-create",tags=["NextTechID"])
 async def create_nextechid(
     nextech: NextechCreate,
@@ -62,7 +205,7 @@ async def create_nextechid(
     Create new NextTech ID using sp_NextTechID_Insert
     """
     try:
-        inserted = insert_nextech(nextech, conn,user["user_id"])
+        inserted = await run_db(MASTER, insert_nextech, nextech, conn,user["user_id"])
 
         if inserted:
             return api_get_response(
@@ -88,19 +231,24 @@ async def create_nextechid(
     tags=["NextTechID"]
 )
 async def get_NextTechID_data_api(
+    request: Request,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = db_get_NextTechID_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "nextech")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result, total_rows = await run_db(MASTER, db_get_NextTechID_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="NextTechID data fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.put(
     "/nextechid-update",
@@ -116,7 +264,7 @@ async def update_nextechid(
     """
 
     try:
-        updated = update_nextech_service(nextech, conn,user["user_id"])
+        updated = await run_db(MASTER, update_nextech_service, nextech, conn,user["user_id"])
 
         if updated:
             return api_get_response(
@@ -140,20 +288,24 @@ async def update_nextechid(
     
 
 @app.post("/Practice-get",tags=["Practice Management"])
-async def get_practice_data_api(conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
+async def get_practice_data_api(request: Request, conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
 
-    result, total_rows = db_get_practice_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "practice")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result, total_rows = await run_db(MASTER, db_get_practice_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="Practice data fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.post("/practice-create",tags=["Practice Management"])
-def create_practice(
+async def create_practice(
     practice: PracticeCreate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -162,7 +314,7 @@ def create_practice(
     create practice group using sp_practice_create
     """
     try:
-        updated = db_create_practice(practice, conn)
+        updated = await run_db(MASTER, db_create_practice, practice, conn)
         
         if updated:
             return api_get_response(
@@ -185,7 +337,7 @@ def create_practice(
 
 
 @app.put("/practice-update",tags=["Practice Management"])
-def update_practice(
+async def update_practice(
     practice: PracticeUpdate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -194,7 +346,7 @@ def update_practice(
     Update practice group using sp_practice_update
     """
     try:
-        updated = db_update_practice(practice, conn)
+        updated = await run_db(MASTER, db_update_practice, practice, conn)
         
         if updated:
             return api_get_response(
@@ -216,20 +368,24 @@ def update_practice(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/group-get",tags=["Group Management"])
-async def get_group_data_api(conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
+async def get_group_data_api(request: Request, conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
 
-    result = db_get_group_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "group")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result = await run_db(MASTER, db_get_group_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="Group data fetched successfully",
         total_rows=1,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.post("/group-create",tags=["Group Management"])
-def create_group(
+async def create_group(
     group: GroupCreate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -238,7 +394,7 @@ def create_group(
     create group using sp_team_update
     """
     try:
-        updated = db_create_group(group, conn)
+        updated = await run_db(MASTER, db_create_group, group, conn)
         
         if updated:
             return api_get_response(
@@ -261,7 +417,7 @@ def create_group(
 
 
 @app.put("/group-update",tags=["Group Management"])
-def update_group(
+async def update_group(
     group: GroupUpdate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -270,7 +426,7 @@ def update_group(
     Update group using sp_team_update
     """
     try:
-        updated = db_update_group(group, conn)
+        updated = await run_db(MASTER, db_update_group, group, conn)
         
         if updated:
             return api_get_response(
@@ -294,20 +450,24 @@ def update_group(
 
 
 @app.post("/Practice-get-groups",tags=["Practice Group Management"])
-async def get_practice_groups_data_api(conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
+async def get_practice_groups_data_api(request: Request, conn = Depends(get_db),user = Depends(require_role(["Admin","TeamLeader"]))):
 
-    result, total_rows = db_get_practice_group_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "practice_group")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result, total_rows = await run_db(MASTER, db_get_practice_group_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="Practice data fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.post("/practice-create-group",tags=["Practice Group Management"])
-def create_practice_group(
+async def create_practice_group(
     practice: PracticeGroupCreate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -316,7 +476,7 @@ def create_practice_group(
     create practice group using sp_practice_create
     """
     try:
-        updated = db_create_practice_group(practice, conn,user["user_id"])
+        updated = await run_db(MASTER, db_create_practice_group, practice, conn,user["user_id"])
         
         if updated:
             return api_get_response(
@@ -339,7 +499,7 @@ def create_practice_group(
 
 
 @app.put("/practice-group-update",tags=["Practice Group Management"])
-def update_practice_group_update(
+async def update_practice_group_update(
     practice: PracticeGroupUpdate,
     conn = Depends(get_db),
 
@@ -349,7 +509,7 @@ def update_practice_group_update(
     Update practice group using sp_practice_group_update
     """
     try:
-        updated = db_update_practice_group(practice, conn)
+        updated = await run_db(MASTER, db_update_practice_group, practice, conn)
         
         if updated:
             return api_get_response(
@@ -382,7 +542,7 @@ async def create_users(
     Create new user using sp_CreateUser
     """
     try:
-        inserted = insert_user(userdetails,user["user_id"], conn)
+        inserted = await run_db(MASTER, insert_user, userdetails,user["user_id"], conn)
 
         if inserted:
             return api_get_response(
@@ -406,19 +566,24 @@ async def create_users(
     
 @app.post("/get-user-data",tags=["user management"])
 async def get_user_data_api(
+    request: Request,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = db_get_user_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "user")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result, total_rows = await run_db(MASTER, db_get_user_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="User data fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.put("/user-update",tags=["user management"])
 async def update_user(
@@ -431,7 +596,7 @@ async def update_user(
     """
 
     try:
-        updated = update_user_service(user_data,user["user_id"], conn)
+        updated = await run_db(MASTER, update_user_service, user_data,user["user_id"], conn)
 
         if updated:
             return api_get_response(
@@ -466,7 +631,7 @@ async def create_vonage(
     Create new Vonage ID using sp_VonageID_Insert
     """
     try:
-        inserted = insert_vonage(vonage, conn)
+        inserted = await run_db(MASTER, insert_vonage, vonage, conn)
 
         if inserted:
             return api_get_response(
@@ -492,19 +657,24 @@ async def create_vonage(
     tags=["VonageID"]
 )
 async def get_VonageID_data_api(
+    request: Request,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = db_get_VonageID_data(conn)
+    etag = await run_db(MASTER, master_etag, conn, "vonage")
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    return api_get_response(
+    result, total_rows = await run_db(MASTER, db_get_VonageID_data, conn)
+
+    return with_etag(api_get_response(
         status="success",
         message="VonageID data fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
+        data=result,
         status_code=200
-    )
+    ), etag)
 
 @app.put(
     "/vonage-update",
@@ -520,7 +690,7 @@ async def update_vonage(
     """
 
     try:
-        updated = update_vonage_service(vonage, conn)
+        updated = await run_db(MASTER, update_vonage_service, vonage, conn)
 
         if updated:
             return api_get_response(
@@ -547,6 +717,7 @@ async def update_vonage(
     tags=["Team Management"]
 )
 async def get_all_teams(
+    request: Request,
     conn=Depends(get_db),
     user=Depends(require_role(["Admin", "TeamLeader"]))
 ):
@@ -554,15 +725,19 @@ async def get_all_teams(
     Get all teams using sp_team_get_all
     """
     try:
-        result, total_rows = db_get_all_teams(conn)
+        etag = await run_db(MASTER, master_etag, conn, "team")
+        if etag_matches(request, etag):
+            return not_modified(etag)
 
-        return api_get_response(
+        result, total_rows = await run_db(MASTER, db_get_all_teams, conn)
+
+        return with_etag(api_get_response(
             status="success",
             message="Teams fetched successfully",
             data=result,
             total_rows=total_rows,
             status_code=200
-        )
+        ), etag)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -580,7 +755,7 @@ async def get_team_by_id(
     Get team by ID using sp_team_get_by_id
     """
     try:
-        result = db_get_team_by_id(team_id, conn)
+        result = await run_db(MASTER, db_get_team_by_id, team_id, conn)
 
         if result:
             return api_get_response(
@@ -615,7 +790,7 @@ async def create_team(
     Create new team using sp_team_insert
     """
     try:
-        inserted = insert_team(team, conn)
+        inserted = await run_db(MASTER, insert_team, team, conn)
         
         if inserted:
             # Return success without ID since we didn't retrieve it
@@ -641,7 +816,7 @@ async def create_team(
     "/teams/{team_id}",
     tags=["Team Management"]
 )
-def update_team(
+async def update_team(
     team: TeamUpdate,
     conn = Depends(get_db),
     user = Depends(require_role(["Admin"]))
@@ -650,7 +825,7 @@ def update_team(
     Update team using sp_team_update
     """
     try:
-        updated = db_update_team(team, conn)
+        updated = await run_db(MASTER, db_update_team, team, conn)
         
         if updated:
             return api_get_response(
@@ -684,7 +859,7 @@ async def delete_team(
     Delete team by ID
     """
     try:
-        deleted = db_delete_team(team_id, conn)
+        deleted = await run_db(MASTER, db_delete_team, team_id, conn)
         
         if deleted:
             return api_get_response(
@@ -712,18 +887,24 @@ async def delete_team(
 )
 async def get_transaction_data_api(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_transaction_data(data, conn)
+    if should_stream(data):
+        return await stream_report("transaction", data, "Transaction report fetched successfully", route_timeout("/get-transaction-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-transaction-data"), conn, get_transaction_data, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["transaction"])
 
     return api_get_response(
         status="success",
         message="Transaction report fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
-        status_code=200
+        data=fmt.encode(result),
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -732,19 +913,25 @@ async def get_transaction_data_api(
 )
 async def get_refused_data_api(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_refused_data(data, conn)
+    if should_stream(data):
+        return await stream_report("refused", data, "Refused report fetched successfully", route_timeout("/get-refused-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-refused-data"), conn, get_refused_data, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["refused"])
 
     return api_get_response(
          
         status="success",
         message="Refused report fetched successfully",
         total_rows=total_rows,
-        data=jsonable_encoder(result),
-        status_code=200
+        data=fmt.encode(result),
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -753,18 +940,24 @@ async def get_refused_data_api(
 )
 async def get_nextech_data_api(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_nextech_data(data, conn)
+    if should_stream(data):
+        return await stream_report("nextech", data, "Nextech data fetched successfully", route_timeout("/get-nextech-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-nextech-data"), conn, get_nextech_data, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["nextech"])
 
     return api_get_response(
         status="success",
         message="Nextech data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -774,18 +967,24 @@ async def get_nextech_data_api(
 )
 async def get_agent_login(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_agent_login_by_date(data, conn)
+    if should_stream(data):
+        return await stream_report("login", data, "Agent login data fetched successfully", route_timeout("/get-agent-login"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-agent-login"), conn, get_agent_login_by_date, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["login"])
 
     return api_get_response(
         status="success",
         message="Agent login data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 
@@ -795,18 +994,24 @@ async def get_agent_login(
 )
 async def get_modmed_data_api(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_modmed_data(data, conn)
+    if should_stream(data):
+        return await stream_report("modmed", data, "Modmed data fetched successfully", route_timeout("/get-modmed-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-modmed-data"), conn, get_modmed_data, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["modmed"])
 
     return api_get_response(
         status="success",
         message="Modmed data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -816,18 +1021,24 @@ async def get_modmed_data_api(
 )
 async def get_break_data(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_break_data_by_date_range(data, conn)
+    if should_stream(data):
+        return await stream_report("break", data, "Break data fetched successfully", route_timeout("/get-break-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-break-data"), conn, get_break_data_by_date_range, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["break"])
 
     return api_get_response(
         status="success",
         message="Break data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -837,18 +1048,24 @@ async def get_break_data(
 )
 async def get_time_on_status(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_time_on_status_by_date_range(data, conn)
+    if should_stream(data):
+        return await stream_report("status", data, "Agent Time On Status data fetched successfully", route_timeout("/get-time-on-status"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-time-on-status"), conn, get_time_on_status_by_date_range, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["status"])
 
     return api_get_response(
         status="success",
         message="Agent Time On Status data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
 @app.post(
@@ -858,24 +1075,84 @@ async def get_time_on_status(
 )
 async def get_fssc_data(
     data: ReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_read_db),
+    fmt = Depends(report_format),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
-    result, total_rows = get_fssc_data_by_date_range(data, conn)
+    if should_stream(data):
+        return await stream_report("submission", data, "submission data fetched successfully", route_timeout("/get-submission-data"), fmt)
+
+    result, total_rows = await run_db_with_timeout(REPORT, route_timeout("/get-submission-data"), conn, get_fssc_data_by_date_range, data, conn, fmt.shape, procedure=REPORT_PROCEDURES["submission"])
 
     return api_get_response(
         status="success",
         message="submission data fetched successfully",
-        data=jsonable_encoder(result),
+        data=fmt.encode(result),
         total_rows=total_rows,
-        status_code=200
+        status_code=200,
+        media_type=fmt.media_type,
+        headers=fmt.headers
     )
 
+@app.post(
+    "/export/{report}/csv",
+    tags=["DAS Export Module"]
+)
+async def export_report_csv_api(
+    report: str,
+    data: ExportRequest,
+    user = Depends(require_role(["Admin","TeamLeader"]))
+):
+    """
+    Download every row of a report (login, break, status, refused,
+    submission, transaction, modmed, nextech) in a date range as CSV
+    """
+
+    if report not in REPORT_PROCEDURES:
+        return api_response(
+            status="failed",
+            message=f"Unknown report {report!r}, expected one of {sorted(REPORT_PROCEDURES)}",
+            status_code=404
+        )
+
+    return await export_report_csv(report, data, route_timeout("/export/{report}/csv"))
+
+@app.post(
+    "/export/{report}/{fmt}",
+    tags=["DAS Export Module"]
+)
+async def export_report_columnar_api(
+    report: str,
+    fmt: str,
+    data: ExportRequest,
+    user = Depends(require_role(["Admin","TeamLeader"]))
+):
+    """
+    Download every row of a report in a date range as typed columnar data:
+    fmt "arrow" (Arrow IPC stream) or "parquet"
+    """
+
+    if report not in REPORT_PROCEDURES or fmt not in EXPORT_FORMATS:
+        return api_response(
+            status="failed",
+            message=f"Unknown export {report!r}/{fmt!r}, expected a report in {sorted(REPORT_PROCEDURES)} and a format in {['csv'] + sorted(EXPORT_FORMATS)}",
+            status_code=404
+        )
+
+    if pa is None:
+        return api_response(
+            status="failed",
+            message="Arrow and Parquet exports need pyarrow installed on the server",
+            status_code=501
+        )
+
+    return await export_report(EXPORT_FORMATS[fmt](report), data, route_timeout("/export/{report}/{fmt}"))
+
 @app.post("/upload-excel-loginData/", tags=["DAS Upload Module"])
 async def upload_login_data(
     file: UploadFile = File(...),
-    conn = Depends(get_db),
+    conn = Depends(get_upload_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
@@ -884,12 +1161,12 @@ async def upload_login_data(
     try:
         # Save uploaded file
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
 
         user_id = user["user_id"]
 
         # Process file
-        result = process_excel_logindata(temp_path, conn, user_id)
+        result = await run_db(UPLOAD, process_excel_logindata, temp_path, conn, user_id)
 
         if result.get("error"):
             return api_response(
@@ -923,7 +1200,7 @@ async def upload_login_data(
 @app.post("/upload-excel-daily-breakData/", tags=["DAS Upload Module"])
 async def upload_excel_daily_breakdata(
     file: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
     temp_path = f"temp_{file.filename}"
@@ -931,10 +1208,10 @@ async def upload_excel_daily_breakdata(
     try:
 
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
 
         user_id = user["user_id"]
-        result = process_excel_daily_breakdata(temp_path, conn, user_id )
+        result = await run_db(UPLOAD, process_excel_daily_breakdata, temp_path, conn, user_id)
 
         if result.get("error"):
                 return api_response(
@@ -969,15 +1246,15 @@ async def upload_excel_daily_breakdata(
 @app.post("/upload-excel-timeonstatus/", tags=["DAS Upload Module"])
 async def upload_excel_time_on_status(
     file: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
     temp_path = f"temp_{file.filename}"
     try:
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
         user_id = user["user_id"]
-        result = process_excel_time_on_status(temp_path, conn, user_id)
+        result = await run_db(UPLOAD, process_excel_time_on_status, temp_path, conn, user_id)
 
         if result.get("error"):
                     return api_response(
@@ -1012,17 +1289,17 @@ async def upload_excel_time_on_status(
 @app.post("/upload-excel-transaction_data/", tags=["DAS Upload Module"])
 async def upload_transaction_data(  # Changed endpoint name
     file: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     temp_path = f"temp_{file.filename}"
     
     try:
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
         
         user_id = user["user_id"]
         # Call your existing processing function
-        result = process_excel_transaction_data(temp_path, conn, user_id)  # This now calls the sync function
+        result = await run_db(UPLOAD, process_excel_transaction_data, temp_path, conn, user_id)  # This now calls the sync function
         
         if result.get("error"):
                     return api_response(
@@ -1058,13 +1335,13 @@ async def upload_transaction_data(  # Changed endpoint name
 async def upload_form_submission_data(  # Changed endpoint name
     file: UploadFile = File(...),
     shiftdate: date = Form(...),# Need to work single date convert into date range in service layer
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     temp_path = f"temp_{file.filename}"
     
     try:
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
         
         user_id = user["user_id"]
 
@@ -1073,7 +1350,7 @@ async def upload_form_submission_data(  # Changed endpoint name
             reports=["submission"]
         )
 
-        delete_result = process_delete_reports(data, conn)
+        delete_result = await run_db(UPLOAD, process_delete_reports, data, conn)
 
         if delete_result.get("error"):
             return api_response(
@@ -1084,7 +1361,7 @@ async def upload_form_submission_data(  # Changed endpoint name
                 )
 
         # Call your existing processing function
-        result = process_excel_form_submission_data(temp_path, conn, user_id)  # This now calls the sync function
+        result = await run_db(UPLOAD, process_excel_form_submission_data, temp_path, conn, user_id)  # This now calls the sync function
         
         if delete_result.get("error"):
             return api_response(
@@ -1120,22 +1397,22 @@ async def upload_form_submission_data(  # Changed endpoint name
 async def upload_modmed_data(
     file1: UploadFile = File(...),
     file2: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     try:
         # Save first file
         temp_path1 = f"temp_{file1.filename}"
         with open(temp_path1, "wb") as buffer:
-            shutil.copyfileobj(file1.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file1.file, buffer)
         
         # Save second file
         temp_path2 = f"temp_{file2.filename}"
         with open(temp_path2, "wb") as buffer:
-            shutil.copyfileobj(file2.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file2.file, buffer)
         
         user_id = user["user_id"]
         # Process both files together
-        result = process_excel_modmed_data(temp_path1, temp_path2, conn, user_id)
+        result = await run_db(UPLOAD, process_excel_modmed_data, temp_path1, temp_path2, conn, user_id)
         
         if result.get("error"):
             return api_response(
@@ -1174,16 +1451,16 @@ async def upload_modmed_data(
 @app.post("/upload-excel-nextech/", tags=["DAS Upload Module"])
 async def upload_nextech_data(
     file: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     temp_path = f"temp_{file.filename}"
     try:
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
         
         user_id = user["user_id"]
         # Call your existing processing function
-        result = process_excel_nextch_data(temp_path, conn, user_id)  # This now calls the sync function
+        result = await run_db(UPLOAD, process_excel_nextch_data, temp_path, conn, user_id)  # This now calls the sync function
         
         if result.get("error"):
             return api_response(
@@ -1218,17 +1495,17 @@ async def upload_nextech_data(
 @app.post("/upload-excel-refused/", tags=["DAS Upload Module"])
 async def upload_refused_data(
     file: UploadFile = File(...),
-    conn = Depends(get_db), user = Depends(require_role(["Admin","TeamLeader"]))
+    conn = Depends(get_upload_db), user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     try:
         temp_path = f"temp_{file.filename}"
         
         with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await run_db(UPLOAD, shutil.copyfileobj, file.file, buffer)
         
         user_id = user["user_id"]
         # Call your existing processing function
-        result = process_excel_refused(temp_path, conn, user_id)  # This now calls the sync function
+        result = await run_db(UPLOAD, process_excel_refused, temp_path, conn, user_id)  # This now calls the sync function
 
         if result.get("error"):
             return api_response(
@@ -1260,14 +1537,14 @@ async def upload_refused_data(
             os.remove(temp_path)
 
 @app.put("/update-login-time", tags=["DAS Update Module"],)
-def update_login_time(
+async def update_login_time(
     data: UpdateLoginRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_write_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     try:
         user_id = user["user_id"]
-        result = process_update_login_data(data, conn, user_id)
+        result = await run_db(MASTER, process_update_login_data, data, conn, user_id)
 
         if result.get("error"):
                 return api_response(
@@ -1296,12 +1573,12 @@ def update_login_time(
 @app.put("/update-break-data", tags=["DAS Update Module"])
 async def update_break_data(
     data: UpdateBreakDataSchema,
-    conn = Depends(get_db),
+    conn = Depends(get_write_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
 
     try:
-        result = process_update_break_data(data, conn, user["user_id"])
+        result = await run_db(MASTER, process_update_break_data, data, conn, user["user_id"])
 
         if result.get("error"):
                 return api_response(
@@ -1330,11 +1607,11 @@ async def update_break_data(
 @app.put("/update-time-on-status", tags=["DAS Update Module"])
 async def update_time_on_status(
     data: UpdateAgentTimeOnStatusRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_write_db),
     user = Depends(require_role(["Admin","TeamLeader"]))
 ):
     try:
-        result = process_update_time_on_status(data, conn, user["user_id"])
+        result = await run_db(MASTER, process_update_time_on_status, data, conn, user["user_id"])
 
         if result.get("error"):
                     return api_response(
@@ -1362,11 +1639,11 @@ async def update_time_on_status(
 @app.delete("/delete-reports", tags=["DAS Delete Module"])
 async def delete_reports(
     data: DeleteReportRequest,
-    conn = Depends(get_db),
+    conn = Depends(get_write_db),
     user = Depends(require_role(["Admin"]))
 ):
     try:
-        result =  process_delete_reports(data, conn)
+        result = await run_db(MASTER, process_delete_reports, data, conn)
 
         if result.get("error"):
                     return api_response(
@@ -1391,6 +1668,51 @@ async def delete_reports(
             status_code=500
         )
 
+@app.get("/db-pool-stats", tags=["Monitoring"])
+async def db_pool_stats(
+    user = Depends(require_role(["Admin"]))
+):
+    return api_response(
+        status="success",
+        message="DB pool statistics fetched successfully",
+        data={
+            **get_pool_stats(),
+            "executors": get_executor_stats(),
+            "retries": get_retry_stats(),
+            "login_throttle": get_throttle_stats(),
+            "statement_cache": get_statement_cache_stats(),
+            "warmup": get_warmup_report()
+        },
+        status_code=200
+    )
+
+@app.get("/db-procedure-stats", tags=["Monitoring"])
+async def db_procedure_stats(
+    user = Depends(require_role(["Admin"]))
+):
+    return api_response(
+        status="success",
+        message="Stored procedure statistics fetched successfully",
+        data=get_procedure_stats(),
+        status_code=200
+    )
+
+@app.get("/cache-stats", tags=["Monitoring"])
+async def cache_stats(
+    user = Depends(require_role(["Admin"]))
+):
+    return api_response(
+        status="success",
+        message="Cache statistics fetched successfully",
+        data={
+            **get_cache_stats(),
+            "token_cache": get_token_cache_stats(),
+            "revocation": get_revocation_stats(),
+            "master_versions": get_version_stats()
+        },
+        status_code=200
+    )
+
 # ✅ include router AFTER routes
 app.include_router(
     router,
@@ -1,25 +1,217 @@
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+from fastapi import Request
 from fastapi.encoders import jsonable_encoder
 from starlette.responses import JSONResponse
 
+from .fetch import DICT, TUPLE
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+    import json
+
+
+def _default(obj):
+    """
+    Types the encoder has no native support for, converted the way
+    jsonable_encoder would so the output stays byte-for-byte the same.
+    """
+
+    if isinstance(obj, Decimal):
+        # jsonable_encoder: whole numbers become int, others float
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+
+    if hasattr(obj, "isoformat"):
+        # datetime / date / time (and subclasses such as pandas.Timestamp)
+        return obj.isoformat()
+
+    return jsonable_encoder(obj)
+
+
+if orjson is not None:
+
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content):
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+
+else:
+
+    def dumps(content):
+        return json.dumps(
+            content,
+            default=_default,
+            ensure_ascii=False,
+            allow_nan=False,
+            indent=None,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse that serializes rows in a single pass: datetimes, dates,
+    times and Decimals are encoded by the native encoder instead of a
+    jsonable_encoder walk first. Uses orjson when it is installed.
+
+    The body is byte-for-byte the one JSONResponse(jsonable_encoder(...))
+    produces, except with orjson (tests/test_response.py pins both):
+
+    - floats at or above 1e16 or below 1e-4 keep their value but are
+      written in orjson's shortest form, e.g. 1e16 instead of 1e+16 and
+      0.00001 instead of 1e-05. Decimals that become such floats are
+      written the same way.
+    - NaN and +/-Infinity are written as null; JSONResponse refuses them
+      with a ValueError, which used to turn the whole response into a 500.
+
+    Without orjson the body is identical in every case.
+    """
+
+    def render(self, content):
+        return dumps(content)
+
+
+# Opt-in compact report shape: data is {"columns": [...], "rows": [[...], ...]}.
+# Add "; dictionary=true" to also dictionary-encode low-cardinality strings.
+COMPACT_MEDIA_TYPE = "application/vnd.das.compact+json"
+
+# A string column is dictionary-encoded when its distinct values are at most
+# this share of the rows (decided on the first batch of a streamed report)
+REPORT_DICTIONARY_MAX_RATIO = float(os.getenv("REPORT_DICTIONARY_MAX_RATIO", "0.5"))
+
+
+class DictionaryEncoder:
+    """
+    Replaces the values of low-cardinality string columns (Agent, Status,
+    Location, ...) with indexes into one list of distinct values per
+    column. Nulls stay null. Columns are picked on the first batch and the
+    dictionaries grow as later batches bring new values.
+    """
+
+    def __init__(self, columns, max_ratio=REPORT_DICTIONARY_MAX_RATIO):
+        self.columns = columns
+        self.max_ratio = max_ratio
+        self._indexes = None
+
+    def _choose(self, rows):
+
+        indexes = {}
+        limit = len(rows) * self.max_ratio
+
+        for position in range(len(self.columns)):
+            values = [row[position] for row in rows if row[position] is not None]
+            if values and all(isinstance(value, str) for value in values) and len(set(values)) <= limit:
+                indexes[position] = {}
+
+        return indexes
+
+    def encode(self, rows):
+
+        if self._indexes is None:
+            self._indexes = self._choose(rows)
+
+        if not self._indexes:
+            return [list(row) for row in rows]
+
+        indexes = list(self._indexes.items())
+        encoded = []
+
+        for row in rows:
+            row = list(row)
+            for position, index in indexes:
+                value = row[position]
+                if value is not None:
+                    row[position] = index.setdefault(value, len(index))
+            encoded.append(row)
+
+        return encoded
+
+    def dictionaries(self):
+        return {self.columns[position]: list(index) for position, index in (self._indexes or {}).items()}
+
+
+class ReportFormat:
+    """Report response shape negotiated from the Accept header; see report_format()."""
+
+    def __init__(self, compact=False, dictionary=False):
+        self.compact = compact
+        self.dictionary = compact and dictionary
+        self.shape = TUPLE if compact else DICT
+        self.media_type = COMPACT_MEDIA_TYPE if compact else "application/json"
+        self.headers = {"Vary": "Accept"}
+
+    def encoder(self, columns):
+        return DictionaryEncoder(columns) if self.dictionary else None
+
+    def encode(self, result):
+        """Rows fetched in self.shape, as the response's "data"."""
+
+        if not self.compact:
+            return result
+
+        encoder = self.encoder(result["columns"])
+        if encoder is None:
+            return result
+
+        return {
+            "columns": result["columns"],
+            "rows": encoder.encode(result["rows"]),
+            "dictionaries": encoder.dictionaries(),
+        }
+
+
+def report_format(request: Request):
+    """
+    Dependency for report routes. "Accept: application/vnd.das.compact+json"
+    selects the compact shape; anything else keeps the array of objects.
+    """
+
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != COMPACT_MEDIA_TYPE:
+            continue
+
+        options = {name.strip().lower(): value.strip() for name, _, value in (p.partition("=") for p in params)}
+        try:
+            if float(options.get("q", "1")) <= 0:
+                continue
+        except ValueError:
+            continue
+
+        dictionary = options.get("dictionary", "").lower() in ("1", "true", "yes")
+        return ReportFormat(compact=True, dictionary=dictionary)
+
+    return ReportFormat()
+
+
 def api_response(status, message=None, data=None, status_code=200):
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
         content={
             "status": status,
             "message": message,
-            "data": jsonable_encoder(data)
+            "data": data
         }
     )
 
-def api_get_response(status, message=None, total_rows=None, data=None, status_code=200):
+def api_get_response(status, message=None, total_rows=None, data=None, status_code=200, media_type=None, headers=None):
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
+        media_type=media_type,
+        headers=headers,
         content={
             "status": status,
             "message": message,
             "total_rows": total_rows,
-            "data": jsonable_encoder(data)
+            "data": data
         }
-    )
\ No newline at end of file
+    )
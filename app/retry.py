@@ -0,0 +1,141 @@
+import functools
+import inspect
+import os
+import random
+import re
+import threading
+import time
+
+from .timeouts import is_timeout_error
+
+# Attempts (first try included) for idempotent reads hitting a transient error
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "3"))
+
+# Full-jitter backoff: sleep uniform(0, min(max, base * 2 ** (attempt - 1)))
+DB_RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.1"))
+DB_RETRY_MAX_DELAY = float(os.getenv("DB_RETRY_MAX_DELAY", "2"))
+
+# Seconds clients are told to wait (Retry-After) once retries are exhausted
+DB_RETRY_AFTER = int(os.getenv("DB_RETRY_AFTER", "5"))
+
+# SQLSTATEs meaning the connection itself is gone (link failure, failover,
+# server closed an idle connection). The connection must be thrown away.
+DISCONNECT_SQLSTATES = ("08S01", "08001", "08003", "08004", "08007", "01002")
+
+# SQLSTATEs worth retrying on a still usable connection (40001 deadlock victim)
+TRANSIENT_SQLSTATES = ("40001",)
+
+# SQL Server / Azure SQL native errors that clear up on their own: deadlock,
+# database unavailable during failover or reconfiguration, resource limits.
+TRANSIENT_NATIVE_ERRORS = {1205, 4060, 4221, 10928, 10929, 40197, 40501, 40613, 49918, 49919, 49920}
+
+_NATIVE_ERROR_RE = re.compile(r"\((\d{3,5})\)")
+
+
+class TransientDatabaseError(Exception):
+    """A read kept failing with transient errors until its retries ran out."""
+
+    def __init__(self, operation, attempts):
+        self.operation = operation
+        self.attempts = attempts
+        super().__init__(f"{operation} failed after {attempts} attempts with transient DB errors")
+
+
+def sqlstate(exc):
+    args = getattr(exc, "args", ())
+    return args[0] if args and isinstance(args[0], str) else None
+
+
+def is_disconnect(exc):
+    return sqlstate(exc) in DISCONNECT_SQLSTATES
+
+
+def is_transient(exc):
+    """True for errors a retry can fix. Timeouts and cancels are never retried."""
+
+    if is_timeout_error(exc):
+        return False
+
+    state = sqlstate(exc)
+    if state in DISCONNECT_SQLSTATES or state in TRANSIENT_SQLSTATES:
+        return True
+
+    message = str(exc.args[1]) if len(getattr(exc, "args", ())) > 1 else str(exc)
+    return any(int(code) in TRANSIENT_NATIVE_ERRORS for code in _NATIVE_ERROR_RE.findall(message))
+
+
+def backoff_delay(attempt):
+    return random.uniform(0, min(DB_RETRY_MAX_DELAY, DB_RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+
+_stats_lock = threading.Lock()
+_stats = {
+    "transient_errors": 0,
+    "disconnects": 0,
+    "reconnects": 0,
+    "retries": 0,
+    "recovered": 0,
+    "exhausted": 0,
+}
+
+
+def record(event, count=1):
+    with _stats_lock:
+        _stats[event] += count
+
+
+def get_retry_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def retry_read(func):
+    """
+    Retry an idempotent read on transient errors with jittered backoff.
+
+    The wrapped function takes its connection as `conn`. After a disconnect
+    the broken connection is dropped and the next attempt checks out a fresh
+    one (conn.reconnect()). Functions without `conn` open their own pooled
+    connection, which the pool discards when it is broken. Cancelled
+    requests (route timeouts) are not retried.
+    """
+
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+
+        conn = signature.bind_partial(*args, **kwargs).arguments.get("conn")
+        attempt = 1
+
+        while True:
+            try:
+                result = func(*args, **kwargs)
+
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+
+                disconnect = is_disconnect(e)
+                record("transient_errors")
+                if disconnect:
+                    record("disconnects")
+
+                if attempt >= DB_RETRY_ATTEMPTS or getattr(conn, "cancelled", False):
+                    record("exhausted")
+                    raise TransientDatabaseError(func.__name__, attempt) from e
+
+                if disconnect and conn is not None and hasattr(conn, "reconnect"):
+                    conn.reconnect()
+
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                record("retries")
+                continue
+
+            if attempt > 1:
+                record("recovered")
+
+            return result
+
+    return wrapper
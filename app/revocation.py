@@ -0,0 +1,248 @@
+"""
+Per-worker view of revoked tokens.
+
+Revocations are written to the DB (sp_RevokeToken) and every worker keeps
+an in-memory copy that a background thread refreshes every
+REVOCATION_REFRESH_SECONDS:
+
+- revoked token ids sit in a Bloom filter backed by an exact set, so the
+  common case, an unrevoked token, costs a few hash probes and no DB call;
+- user-wide revocations ("log this user out everywhere") are a dict of
+  user_id -> cutoff, and tokens issued at or before the cutoff are refused.
+  Tokens carry a sub-second iat, so a login in the same second as the
+  revocation still gets through; tokens with a whole-second iat issued in
+  that second are refused.
+
+A revocation made in this worker applies here at once; other workers pick
+it up on their next refresh.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .auth_service import get_revoked_tokens, revoke_token
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", "30"))
+
+# Rebuild from scratch this often, dropping expired entries from the filter
+REVOCATION_FULL_REFRESH_SECONDS = float(os.getenv("REVOCATION_FULL_REFRESH_SECONDS", "3600"))
+
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", "0.01"))
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class BloomFilter:
+
+    def __init__(self, capacity=REVOCATION_BLOOM_CAPACITY, error_rate=REVOCATION_BLOOM_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing (Kirsch-Mitzenmacher): one digest, k probe positions
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class _RevocationState:
+
+    def __init__(self, capacity):
+        self.bloom = BloomFilter(capacity)
+        self.token_ids = set()
+        self.user_cutoffs = {}
+
+    def add(self, token_id, user_id, revoked_at):
+        if token_id:
+            if token_id not in self.token_ids:
+                self.token_ids.add(token_id)
+                self.bloom.add(token_id)
+        elif user_id is not None:
+            cutoff = _timestamp(revoked_at)
+            self.user_cutoffs[user_id] = max(cutoff, self.user_cutoffs.get(user_id, 0))
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str):
+        return _timestamp(datetime.fromisoformat(value))
+    return float(value)
+
+
+_lock = threading.Lock()
+_state = _RevocationState(REVOCATION_BLOOM_CAPACITY)
+_last_seen = None
+_last_full_refresh = 0.0
+_stats = {
+    "checks": 0,
+    "bloom_positives": 0,
+    "false_positives": 0,
+    "revoked_hits": 0,
+    "refreshes": 0,
+    "full_refreshes": 0,
+    "refresh_failures": 0,
+    "last_refresh_age_seconds": None,
+}
+_last_refresh = None
+
+
+def token_id(payload, credentials):
+    """jti when the token has one, else the SHA-256 of the token itself."""
+    return payload.get("jti") or hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def is_revoked(payload, credentials):
+
+    state = _state
+    _stats["checks"] += 1
+
+    cutoff = state.user_cutoffs.get(payload.get("user_id"))
+    if cutoff is not None and payload.get("iat", 0) <= cutoff:
+        _stats["revoked_hits"] += 1
+        return True
+
+    if not state.bloom.count:
+        return False
+
+    tid = token_id(payload, credentials)
+    if tid not in state.bloom:
+        return False
+
+    _stats["bloom_positives"] += 1
+    if tid in state.token_ids:
+        _stats["revoked_hits"] += 1
+        return True
+
+    _stats["false_positives"] += 1
+    return False
+
+
+def revoke(payload, credentials, revoked_by):
+    """Revoke one token (logout)."""
+
+    tid = token_id(payload, credentials)
+    expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc).replace(tzinfo=None)
+
+    revoke_token(tid, payload.get("user_id"), expires_at, revoked_by)
+
+    with _lock:
+        _state.add(tid, payload.get("user_id"), time.time())
+
+
+def revoke_user(user_id, revoked_by, token_lifetime):
+    """Revoke every token of a user issued up to now."""
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    revoke_token(None, user_id, now + token_lifetime, revoked_by)
+
+    with _lock:
+        _state.add(None, user_id, time.time())
+
+
+def refresh(full=False):
+    """Pull revocations from the DB: new ones only, or everything when full."""
+
+    global _state, _last_seen, _last_full_refresh, _last_refresh
+
+    full = full or time.monotonic() - _last_full_refresh >= REVOCATION_FULL_REFRESH_SECONDS
+
+    try:
+        rows = get_revoked_tokens(None if full else _last_seen)
+    except Exception as e:
+        _stats["refresh_failures"] += 1
+        logger.warning("Token revocation refresh failed: %s", e)
+        return False
+
+    with _lock:
+        if full:
+            state = _RevocationState(max(REVOCATION_BLOOM_CAPACITY, 2 * len(rows)))
+        else:
+            state = _state
+
+        for row in rows:
+            state.add(row["token_id"], row["user_id"], row["revoked_at"])
+            if _last_seen is None or row["revoked_at"] > _last_seen:
+                _last_seen = row["revoked_at"]
+
+        if full:
+            _state = state
+            _last_full_refresh = time.monotonic()
+            _stats["full_refreshes"] += 1
+
+        _stats["refreshes"] += 1
+        _last_refresh = time.monotonic()
+
+    return True
+
+
+class _Refresher(threading.Thread):
+
+    def __init__(self):
+        super().__init__(name="token-revocation", daemon=True)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        refresh(full=True)
+        while not self._stop_event.wait(REVOCATION_REFRESH_SECONDS):
+            refresh()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+_refresher = None
+
+
+def start_revocation_refresh():
+
+    global _refresher
+
+    if _refresher is None:
+        _refresher = _Refresher()
+        _refresher.start()
+
+
+def stop_revocation_refresh():
+
+    global _refresher
+
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
+
+
+def get_revocation_stats():
+
+    state = _state
+    stats = dict(_stats)
+    stats["revoked_tokens"] = len(state.token_ids)
+    stats["revoked_users"] = len(state.user_cutoffs)
+    stats["bloom_bits"] = state.bloom.size
+    stats["bloom_hashes"] = state.bloom.hashes
+    if _last_refresh is not None:
+        stats["last_refresh_age_seconds"] = round(time.monotonic() - _last_refresh, 1)
+
+    return stats
@@ -1,5 +1,5 @@
 from typing import Optional,List
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
 from datetime import date, datetime, time
 
 
@@ -102,6 +102,19 @@ class ReportRequest(BaseModel):
     end_date: date
     page: int = 1
     page_size: int = 100
+    # Only these columns (checked against the report's columns); all when omitted
+    fields: Optional[List[str]] = None
+
+    @field_validator("fields")
+    def unique_fields(cls, value):
+        if not value:
+            return None
+        # Keep the caller's order, drop repeats
+        return list(dict.fromkeys(name.strip() for name in value))
+
+class ExportRequest(BaseModel):
+    start_date: date
+    end_date: date
 
 class TransactionResponse(BaseModel):
 
@@ -591,4 +604,16 @@ class NextechSchema(BaseModel):
 
 class LoginRequest(BaseModel):
     username: str
-    password: str
\ No newline at end of file
+    password: str
+class RevokeTokenRequest(BaseModel):
+    user_id: Optional[int] = None
+    token: Optional[str] = None
+
+    @model_validator(mode="after")
+    def token_or_user(self):
+        if self.token is None and self.user_id is None:
+            raise ValueError("Provide token or user_id")
+        return self
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
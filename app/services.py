@@ -6,7 +6,11 @@ import os
 from pathlib import Path
 from typing import List, Optional, Tuple, Any
 import json
-from .schemas import AgentSchema, BreakDataSchema, FSSCDataSchema, GroupCreate, GroupUpdate, ModmedSchema, NextechSchema, PracticeCreate, PracticeGroupCreate, PracticeGroupUpdate, PracticeUpdate, TeamCreate, TeamUpdate, TimeOnStatusSchema, UpdateAgentTimeOnStatusRequest, UpdateBreakDataSchema, transaction_schema,RefusedSchema,UpdateLoginRequest
+from .fetch import DICT, fetch_one, fetch_paged, fetch_rows, row_count
+from .retry import retry_read
+from .timeouts import EXPORT_QUERY_TIMEOUT
+from .versions import bump_version
+from .schemas import AgentLoginResponse, AgentSchema, AgentTimeOnStatusResponse, BreakDataResponse, BreakDataSchema, FSSCResponse, ModmedResponse, NextechResponse, RefusedResponse, TransactionResponse, FSSCDataSchema, GroupCreate, GroupUpdate, ModmedSchema, NextechSchema, PracticeCreate, PracticeGroupCreate, PracticeGroupUpdate, PracticeUpdate, TeamCreate, TeamUpdate, TimeOnStatusSchema, UpdateAgentTimeOnStatusRequest, UpdateBreakDataSchema, transaction_schema,RefusedSchema,UpdateLoginRequest
 
 
 CHUNK_SIZE = 5000
@@ -22,6 +26,50 @@ REPORT_TABLE_MAP = {
     "nextech": ("Nextech", "InputDate")
 }
 
+# Paged report readers behind the "DAS Get Module" endpoints, by report name
+REPORT_PROCEDURES = {
+    "login": "sp_GetAgentLoginByDaterange",
+    "break": "sp_GetAgentBreakDataByDateRange",
+    "status": "sp_GetAgentTimeOnStatusByDateRange",
+    "refused": "sp_GetRefusedData",
+    "submission": "sp_GetFSSCDataByDateRange",
+    "transaction": "sp_GetTransactionData",
+    "modmed": "sp_GetModmedByDateRange",
+    "nextech": "sp_GetNextechByDateRange"
+}
+
+# Page size asked of a report procedure for an export: the whole date range
+# in one page, so the procedure skips nothing
+EXPORT_MAX_ROWS = int(os.getenv("EXPORT_MAX_ROWS", "1000000000"))
+
+# Columns each report procedure returns, by report name. ReportRequest.fields
+# must be a subset; they are checked here before any DB call and then passed
+# to the procedure's @fields parameter (see sql/report_fields.sql)
+REPORT_FIELDS = {
+    report: tuple(model.model_fields)
+    for report, model in {
+        "login": AgentLoginResponse,
+        "break": BreakDataResponse,
+        "status": AgentTimeOnStatusResponse,
+        "refused": RefusedResponse,
+        "submission": FSSCResponse,
+        "transaction": TransactionResponse,
+        "modmed": ModmedResponse,
+        "nextech": NextechResponse,
+    }.items()
+}
+
+
+class UnknownReportFieldsError(ValueError):
+    """ReportRequest.fields named columns the report does not have."""
+
+    def __init__(self, report, unknown, available):
+        self.report = report
+        self.unknown = unknown
+        self.available = available
+        super().__init__(f"Unknown fields for {report} report: {', '.join(unknown)}")
+
+
 def update_nextech_service(nextech_data, conn,updatedBy) -> bool:
     """
     Execute sp_Nextech_Update stored procedure
@@ -50,6 +98,7 @@ def update_nextech_service(nextech_data, conn,updatedBy) -> bool:
         )
 
         conn.commit()
+        bump_version(cursor, "nextech")
 
         return True
 
@@ -86,8 +135,10 @@ def insert_nextech(nextech_data, conn, created_by) -> bool:
         )
 
         cursor.commit()
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "nextech")
 
-        return cursor.rowcount > 0
+        return changed
 
     except Exception as e:
         conn.rollback()
@@ -96,7 +147,8 @@ def insert_nextech(nextech_data, conn, created_by) -> bool:
     finally:
         cursor.close()
 
-def db_get_NextTechID_data(conn):
+@retry_read
+def db_get_NextTechID_data(conn, shape=DICT):
 
     cursor = conn.cursor()
 
@@ -104,38 +156,23 @@ def db_get_NextTechID_data(conn):
         "EXEC usp_next_tech_id"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
-def db_get_practice_data(conn):
+@retry_read
+def db_get_practice_data(conn, shape=DICT):
     cursor = conn.cursor()
 
     cursor.execute(
         "EXEC usp_get_practice"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
 def db_create_practice(practice_data: PracticeCreate, conn) -> bool:
     """
@@ -149,7 +186,9 @@ def db_create_practice(practice_data: PracticeCreate, conn) -> bool:
             practice_data.PracticeName.strip(),practice_data.Practice.strip(),
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "practice")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -168,25 +207,27 @@ def db_update_practice(practice_data: PracticeUpdate, conn) -> bool:
             practice_data.id, practice_data.PracticeName.strip(), practice_data.Practice.strip()
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "practice")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
     finally:
         cursor.close()
 
-def db_get_group_data(conn) -> Optional[dict]:
+@retry_read
+def db_get_group_data(conn, shape=DICT) -> Optional[dict]:
     cursor = conn.cursor()
 
     try:
         cursor.execute("EXEC usp_get_group")
-        rows = cursor.fetchall()
+        rows = fetch_rows(cursor, shape)
 
-        if not rows:
+        if not row_count(rows):
             return None
 
-        columns = [column[0] for column in cursor.description]
-        return [dict(zip(columns, row)) for row in rows]
+        return rows
 
     finally:
         cursor.close()
@@ -203,7 +244,9 @@ def db_create_group(group_data: GroupCreate, conn) -> bool:
             group_data.name.strip()
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "group")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -222,7 +265,9 @@ def db_update_group(group_data: GroupUpdate, conn) -> bool:
             group_data.id, group_data.name.strip()
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "group")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -230,25 +275,18 @@ def db_update_group(group_data: GroupUpdate, conn) -> bool:
         cursor.close()
 
 
-def db_get_practice_group_data(conn):
+@retry_read
+def db_get_practice_group_data(conn, shape=DICT):
     cursor = conn.cursor()
 
     cursor.execute(
         "EXEC usp_get_practice_group"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
 def db_create_practice_group(practice_data: PracticeGroupCreate, conn, created_by) -> bool:
     """
@@ -262,7 +300,9 @@ def db_create_practice_group(practice_data: PracticeGroupCreate, conn, created_b
             practice_data.QueueName.strip(),practice_data.Practice.strip(),practice_data.Groups.strip(),created_by
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "practice_group")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -281,7 +321,9 @@ def db_update_practice_group(practice_data: PracticeGroupUpdate, conn) -> bool:
             practice_data.IntPracticeID, practice_data.QueueName.strip(), practice_data.Practice.strip(), practice_data.Groups.strip()
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "practice_group")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -318,6 +360,7 @@ def update_user_service(user_data,created_by, conn) -> bool:
         )
 
         conn.commit()
+        bump_version(cursor, "user")
 
         return True
 
@@ -328,7 +371,8 @@ def update_user_service(user_data,created_by, conn) -> bool:
     finally:
         cursor.close()
 
-def db_get_user_data(conn):
+@retry_read
+def db_get_user_data(conn, shape=DICT):
 
     cursor = conn.cursor()
 
@@ -336,18 +380,10 @@ def db_get_user_data(conn):
         "EXEC sp_GetAllUsers"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
 def insert_user(user_details,user_id, conn) -> bool:
     """
@@ -378,8 +414,10 @@ def insert_user(user_details,user_id, conn) -> bool:
         )
 
         cursor.commit()
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "user")
 
-        return cursor.rowcount > 0
+        return changed
 
     except Exception as e:
         conn.rollback()
@@ -419,6 +457,7 @@ def update_vonage_service(vonage_data, conn) -> bool:
         )
 
         conn.commit()
+        bump_version(cursor, "vonage")
 
         return True
 
@@ -457,8 +496,10 @@ def insert_vonage(vonage_data, conn) -> bool:
         )
 
         cursor.commit()
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "vonage")
 
-        return cursor.rowcount > 0
+        return changed
 
     except Exception as e:
         conn.rollback()
@@ -467,7 +508,8 @@ def insert_vonage(vonage_data, conn) -> bool:
     finally:
         cursor.close()
 
-def db_get_VonageID_data(conn):
+@retry_read
+def db_get_VonageID_data(conn, shape=DICT):
 
     cursor = conn.cursor()
 
@@ -475,52 +517,32 @@ def db_get_VonageID_data(conn):
         "EXEC sp_VonageID_GetAll"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
 
-def db_get_all_teams(conn):
+@retry_read
+def db_get_all_teams(conn, shape=DICT):
     cursor = conn.cursor()
 
     cursor.execute(
         "EXEC sp_team_get_all"
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
+@retry_read
 def db_get_team_by_id(team_id: int, conn) -> Optional[dict]:
     cursor = conn.cursor()
 
     try:
         cursor.execute("EXEC sp_team_get_by_id @id = ?", (team_id,))
-        row = cursor.fetchone()
-
-        if not row:
-            return None
-
-        columns = [column[0] for column in cursor.description]
-        return dict(zip(columns, row))
+        return fetch_one(cursor)
 
     finally:
         cursor.close()
@@ -536,9 +558,11 @@ def insert_team(team_data: TeamCreate, conn) -> int:
         # Just execute the stored procedure - don't expect any return
         cursor.execute("EXEC sp_team_insert @name = ?", team_data.name)
         cursor.commit()
-        
         # Check if any row was affected
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "team")
+        
+        return changed
         
     except Exception as e:
         conn.rollback()
@@ -559,7 +583,9 @@ def db_update_team(team_data: TeamUpdate, conn) -> bool:
             team_data.id, team_data.name
         )
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "team")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -575,7 +601,9 @@ def db_delete_team(team_id: int, conn) -> bool:
     try:
         cursor.execute("DELETE FROM Team WHERE id = ?", team_id)
         cursor.commit()
-        return cursor.rowcount > 0
+        changed = cursor.rowcount > 0
+        bump_version(cursor, "team")
+        return changed
     except Exception as e:
         conn.rollback()
         raise e
@@ -583,205 +611,138 @@ def db_delete_team(team_id: int, conn) -> bool:
         cursor.close()
 
 
-def get_transaction_data(data, conn):
-
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "EXEC sp_GetTransactionData ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
-
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
-
-def get_refused_data(data, conn):
-
-    cursor = conn.cursor()
-
-    cursor.execute(
-        "EXEC sp_GetRefusedData ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
-
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+def check_report_fields(report, fields):
+    """Raise UnknownReportFieldsError unless every name in fields is a column of `report`."""
 
-    cursor.close()
-
-    return rows,total_rows
-
-def get_nextech_data(data, conn):
-
-    cursor = conn.cursor()
+    if not fields:
+        return
 
-    cursor.execute(
-        "EXEC sp_GetNextechByDateRange ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
-
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
+    unknown = [name for name in fields if name not in REPORT_FIELDS[report]]
+    if unknown:
+        raise UnknownReportFieldsError(report, unknown, list(REPORT_FIELDS[report]))
 
-    return rows,total_rows
-
-def get_modmed_data(data, conn):
+@retry_read
+def get_report_data(report, data, conn, shape=DICT):
+    """
+    Execute the paged report procedure for `report` (see REPORT_PROCEDURES),
+    selecting only data.fields when given
+    Returns: (rows, total_rows)
+    """
 
+    check_report_fields(report, data.fields)
     cursor = conn.cursor()
 
-    cursor.execute(
-        "EXEC sp_GetModmedByDateRange ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
-
-     # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
+    try:
+        execute_report(cursor, report, data)
+        return fetch_paged(cursor, shape)
+    finally:
+        cursor.close()
 
-def get_agent_login_by_date(data, conn):
+def execute_report(cursor, report, data):
+    """
+    Run the report's paged procedure on cursor. data.fields (already checked
+    with check_report_fields) go to the procedure's @fields parameter as a
+    JSON array, so the other columns are never read or sent.
+    """
 
-    cursor = conn.cursor()
+    if not data.fields:
+        cursor.execute(
+            f"EXEC {REPORT_PROCEDURES[report]} ?, ?, ?, ?",
+            data.start_date,
+            data.end_date,
+            data.page,
+            data.page_size
+        )
+        return
 
     cursor.execute(
-        "EXEC sp_GetAgentLoginByDaterange ?,?, ?, ?",
+        f"EXEC {REPORT_PROCEDURES[report]} ?, ?, ?, ?, ?",
         data.start_date,
         data.end_date,
         data.page,
-        data.page_size
+        data.page_size,
+        json.dumps(data.fields)
     )
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
-
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    cursor.close()
-
-    return rows,total_rows
-
-def get_break_data_by_date_range(data, conn):
+@retry_read
+def open_report_cursor(report, data, conn):
+    """
+    Execute the paged report procedure and leave the cursor on the rows
+    result set, for callers that read it incrementally.
+    Returns: (cursor, total_rows); the caller closes the cursor
+    """
 
+    check_report_fields(report, data.fields)
     cursor = conn.cursor()
 
-    cursor.execute(
-        "EXEC sp_GetAgentBreakDataByDateRange ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
+    try:
+        execute_report(cursor, report, data)
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
+        total_rows = cursor.fetchone()[0]
+        cursor.nextset()
 
-    # Move to next result set
-    cursor.nextset()
+    except Exception:
+        cursor.close()
+        raise
 
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return cursor, total_rows
 
-    cursor.close()
 
-    return rows,total_rows
-
-def get_time_on_status_by_date_range(data, conn):
+@retry_read
+def open_export_cursor(report, start_date, end_date, conn):
+    """
+    Every row of `report` in the date range, from the report's own paged
+    procedure asked for a single page of EXPORT_MAX_ROWS rows. Columns,
+    joins, filters and order are therefore exactly those of the paged
+    report.
+    Returns: the cursor on the rows; the caller reads and closes it
+    """
 
     cursor = conn.cursor()
 
-    cursor.execute(
-        "EXEC sp_GetAgentTimeOnStatusByDateRange ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
-
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
-
-    # Move to next result set
-    cursor.nextset()
+    try:
+        cursor.set_timeout(EXPORT_QUERY_TIMEOUT)
+        cursor.execute(
+            f"EXEC {REPORT_PROCEDURES[report]} ?, ?, ?, ?",
+            start_date,
+            end_date,
+            1,
+            EXPORT_MAX_ROWS
+        )
 
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        # Skip the total row count that precedes the rows
+        cursor.fetchone()
+        cursor.nextset()
 
-    cursor.close()
+    except Exception:
+        cursor.close()
+        raise
 
-    return rows,total_rows
+    return cursor
 
-def get_fssc_data_by_date_range(data, conn):
+def get_transaction_data(data, conn, shape=DICT):
+    return get_report_data("transaction", data, conn, shape)
 
-    cursor = conn.cursor()
+def get_refused_data(data, conn, shape=DICT):
+    return get_report_data("refused", data, conn, shape)
 
-    cursor.execute(
-        "EXEC sp_GetFSSCDataByDateRange ?, ?, ?, ?",
-        data.start_date,
-        data.end_date,
-        data.page,
-        data.page_size
-    )
+def get_nextech_data(data, conn, shape=DICT):
+    return get_report_data("nextech", data, conn, shape)
 
-    # First result set (total rows)
-    total_rows = cursor.fetchone()[0]
+def get_modmed_data(data, conn, shape=DICT):
+    return get_report_data("modmed", data, conn, shape)
 
-    # Move to next result set
-    cursor.nextset()
+def get_agent_login_by_date(data, conn, shape=DICT):
+    return get_report_data("login", data, conn, shape)
 
-    columns = [col[0] for col in cursor.description]
-    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+def get_break_data_by_date_range(data, conn, shape=DICT):
+    return get_report_data("break", data, conn, shape)
 
-    cursor.close()
+def get_time_on_status_by_date_range(data, conn, shape=DICT):
+    return get_report_data("status", data, conn, shape)
 
-    return rows,total_rows
+def get_fssc_data_by_date_range(data, conn, shape=DICT):
+    return get_report_data("submission", data, conn, shape)
 
 def process_delete_reports(data, conn):
 
@@ -0,0 +1,963 @@
+"""
+SQLite stand-in for the SQL Server database, for offline load and latency
+testing (DB_BACKEND=sqlite).
+
+It exposes the small part of the pyodbc API the services use (cursor,
+execute / executemany, fetch*, nextset, description, rowcount, commit,
+rollback, cancel, timeout, fast_executemany) and emulates the stored
+procedures they call with Python handlers over plain tables. Result sets
+mirror the real procedures: paged readers return the total count first and
+the page second. agent_name is taken from the uploading user, which is close
+enough for benchmarking but not the production mapping.
+
+Round-trip latency can be injected with SQLITE_LATENCY_MS (per execute /
+executemany), SQLITE_FETCH_LATENCY_MS (per fetch call) and
+SQLITE_PREPARE_LATENCY_MS (per prepare: like pyodbc, a cursor prepares a
+parameterized statement again only when its SQL text changes). Prepares are
+counted in SQLiteConnection.prepares.
+
+Seed synthetic report rows with:
+    python -m app.sqlite_backend --rows 50000 --days 30
+"""
+
+import collections
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+
+SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "das_loadtest.sqlite3")
+SQLITE_LATENCY_MS = float(os.getenv("SQLITE_LATENCY_MS", "0"))
+SQLITE_FETCH_LATENCY_MS = float(os.getenv("SQLITE_FETCH_LATENCY_MS", "0"))
+SQLITE_PREPARE_LATENCY_MS = float(os.getenv("SQLITE_PREPARE_LATENCY_MS", "0"))
+
+
+class Error(Exception):
+    """Backend error; args are (sqlstate, message) like pyodbc errors."""
+
+
+class OperationalError(Error):
+    pass
+
+
+class ProgrammingError(Error):
+    pass
+
+
+# -------------------------------------------------------------------
+# Schema
+# -------------------------------------------------------------------
+
+# Report tables: name -> (date column, [(column, declared type), ...]).
+# Column order is the order of the matching sp_Insert* parameters; every table
+# also gets an Id primary key, a created timestamp, user_id and, where the
+# report is editable, notes / updatedby / updated_at.
+REPORT_TABLES = {
+    "agent_login": ("shiftdate", [
+        ("shiftdate", "DATE"), ("agent", "TEXT"), ("agent_id", "TEXT"),
+        ("login_time", "DATETIME"), ("logout_time", "DATETIME"), ("duration", "TEXT"),
+    ]),
+    "Agent_Break_Data": ("StartTime", [
+        ("StartTime", "DATETIME"), ("EndTime", "DATETIME"), ("Agent", "TEXT"),
+        ("AgentId", "INTEGER"), ("Status", "TEXT"), ("StatusCodeItem", "TEXT"),
+        ("StatusCodeList", "TEXT"), ("GroupName", "TEXT"), ("TimeValue", "TEXT"),
+        ("TimePercentage", "REAL"), ("LoggedInTime", "TEXT"),
+    ]),
+    "AgentTimeOnStatus": ("StartTime", [
+        ("StartTime", "DATETIME"), ("EndTime", "DATETIME"), ("Agent", "TEXT"),
+        ("AgentId", "INTEGER"),
+        ("AvailableTime", "TEXT"), ("AvailableTimePercent", "REAL"),
+        ("HandlingTime", "TEXT"), ("HandlingTimePercent", "REAL"),
+        ("WrapUpTime", "TEXT"), ("WrapUpTimePercent", "REAL"),
+        ("WorkingOfflineTime", "TEXT"), ("WorkingOfflineTimePercent", "REAL"),
+        ("OfferingTime", "TEXT"), ("OfferingTimePercent", "REAL"),
+        ("OnBreakTime", "TEXT"), ("OnBreakTimePercent", "REAL"),
+        ("BusyTime", "TEXT"), ("BusyTimePercent", "REAL"),
+        ("LoggedInTime", "TEXT"),
+    ]),
+    "Refused": ("StartTime", [
+        ("StartTime", "DATE"), ("EndTime", "DATE"), ("Agent", "TEXT"),
+        ("AgentId", "INTEGER"), ("Accepted", "INTEGER"), ("Rejected", "INTEGER"),
+        ("Presented", "INTEGER"), ("AcceptedPercent", "REAL"),
+        ("RejectedPercent", "REAL"), ("AverageHandlingTime", "TEXT"),
+        ("AverageWrapUpTime", "TEXT"), ("AverageBusyTime", "TEXT"),
+    ]),
+    "FSSCData": ("Date", [
+        ("rec_id", "TEXT"), ("Date", "DATE"), ("Location", "TEXT"), ("Form", "TEXT"),
+        ("SourceURL", "TEXT"), ("Status", "TEXT"), ("Reason", "TEXT"),
+        ("FirstTouchDate", "DATETIME"), ("FirstTouchUser", "TEXT"),
+        ("TimetoFirstTouchmins", "INTEGER"), ("LastTouchDate", "DATETIME"),
+        ("LastTouchUser", "TEXT"),
+    ]),
+    "TransactionData": ("TimeFinished", [
+        ("TimeFinished", "DATETIME"), ("TransactionID", "TEXT"),
+        ("OriginalTransactionID", "TEXT"), ("MediaType", "TEXT"),
+        ("CreationTime", "DATETIME"), ("Direction", "TEXT"), ("Type", "TEXT"),
+        ("ChannelID", "TEXT"), ("QueueName", "TEXT"), ("Origination", "TEXT"),
+        ("Destination", "TEXT"), ("CustomerName", "TEXT"), ("CaseNumber", "TEXT"),
+        ("OutboundPhoneShortCode", "TEXT"), ("OutboundPhoneCodeText", "TEXT"),
+        ("Participant", "TEXT"), ("OfferActionTime", "DATETIME"),
+        ("HandlingDuration", "TEXT"), ("WrapUpDuration", "TEXT"),
+        ("ProcessingDuration", "TEXT"), ("TimetoAbandon", "TEXT"),
+        ("RecordingFilenames", "TEXT"), ("IVRTreatmentDuration", "TEXT"),
+        ("Hold", "TEXT"), ("HoldDuration", "TEXT"), ("WrapUpCodeListID", "TEXT"),
+        ("WrapUpCodeText", "TEXT"),
+    ]),
+    "Modmed": ("AppointmentCreatedDate", [
+        ("PatientName", "TEXT"), ("PatientDOB", "DATE"),
+        ("PatientPreferredPhone", "TEXT"), ("AppointmentCreatedDate", "DATE"),
+        ("AppointmentCreatedBy", "TEXT"), ("Location", "TEXT"),
+        ("AppointmentType", "TEXT"), ("AppointmentDate", "DATE"),
+        ("AppointmentTime", "TEXT"), ("AppointmentStatus", "TEXT"),
+        ("AppointmentRescheduled", "TEXT"), ("AppointmentCount", "INTEGER"),
+        ("PrimaryProvider", "TEXT"),
+    ]),
+    "Nextech": ("InputDate", [
+        ("InputDate", "DATE"), ("CreatedbyLogin", "TEXT"), ("PatientName", "TEXT"),
+        ("ApptDate", "DATE"), ("StartTime", "TEXT"), ("Purpose", "TEXT"),
+        ("WebSite", "TEXT"), ("Location", "TEXT"), ("user_name", "TEXT"),
+    ]),
+}
+
+# Name of the id / created columns as the real report procedures return them
+_REPORT_KEYS = {
+    "agent_login": ("id", "CreatedAt"),
+    "Agent_Break_Data": ("Id", "CreatedAt"),
+    "AgentTimeOnStatus": ("Id", "CreatedDate"),
+    "Refused": ("Id", "CreatedDate"),
+    "FSSCData": ("Id", "CreatedDate"),
+    "TransactionData": ("Id", "createdDate"),
+    "Modmed": ("Id", "CreatedDate"),
+    "Nextech": ("Id", "CreatedDate"),
+}
+
+_EDITABLE = {"agent_login", "Agent_Break_Data", "AgentTimeOnStatus"}
+
+_MASTER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roles (role_id INTEGER PRIMARY KEY, role_name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS Team (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT);
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password_hash TEXT,
+    role_id INTEGER, team_id INTEGER, is_active INTEGER DEFAULT 1, agent_name TEXT,
+    created_by INTEGER, created_at DATETIME
+);
+CREATE TABLE IF NOT EXISTS Practice (id INTEGER PRIMARY KEY AUTOINCREMENT, PracticeName TEXT, Practice TEXT);
+CREATE TABLE IF NOT EXISTS Groups (id INTEGER PRIMARY KEY AUTOINCREMENT, Groups TEXT);
+CREATE TABLE IF NOT EXISTS PracticeGroup (
+    IntPracticeID INTEGER PRIMARY KEY AUTOINCREMENT, QueueName TEXT, Practice TEXT,
+    Groups TEXT, createdBy INTEGER
+);
+CREATE TABLE IF NOT EXISTS VonageID (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, eight_ID TEXT, Edgemd_ID TEXT,
+    Modmed_ID TEXT, Team_ID INTEGER, createdBy INTEGER, updatedBy INTEGER,
+    IsActive INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS NextechID (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, Nextech_ID TEXT, Team_ID INTEGER,
+    GroupID INTEGER, createdBy INTEGER, updatedBy INTEGER, IsActive INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS RevokedTokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, token_id TEXT, user_id INTEGER,
+    expires_at DATETIME, revoked_at DATETIME, revoked_by INTEGER
+);
+CREATE TABLE IF NOT EXISTS MasterDataVersions (
+    dataset TEXT PRIMARY KEY, version INTEGER NOT NULL, updated_at DATETIME
+);
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, row_index INTEGER, error_type TEXT,
+    error_message TEXT, row_data TEXT, created_at DATETIME
+);
+INSERT OR IGNORE INTO roles (role_id, role_name) VALUES (1, 'Admin'), (2, 'TeamLeader'), (3, 'Agent');
+INSERT OR IGNORE INTO users (user_id, username, password_hash, role_id, team_id, is_active, agent_name)
+    VALUES (1, 'admin1', 'admin123', 1, NULL, 1, 'Admin One');
+"""
+
+
+def _report_schema():
+
+    statements = []
+
+    for table, (date_column, columns) in REPORT_TABLES.items():
+        key, created = _REPORT_KEYS[table]
+        defs = [f"{key} INTEGER PRIMARY KEY AUTOINCREMENT"]
+        defs += [f"[{name}] {kind}" for name, kind in columns]
+        defs += [f"{created} DATETIME", "user_id INTEGER"]
+        if table in _EDITABLE:
+            defs += ["notes TEXT", "updatedby INTEGER", "updated_at DATETIME"]
+
+        statements.append(f"CREATE TABLE IF NOT EXISTS [{table}] ({', '.join(defs)})")
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{date_column} ON [{table}] ([{date_column}])"
+        )
+
+    return ";\n".join(statements) + ";"
+
+
+def _parse_datetime(raw):
+    text = raw.decode()
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+def _parse_date(raw):
+    text = raw.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+sqlite3.register_converter("DATETIME", _parse_datetime)
+sqlite3.register_converter("DATE", _parse_date)
+
+
+def _to_sql(value):
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    return value
+
+
+def _now():
+    return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+
+# -------------------------------------------------------------------
+# Stored procedure emulation
+# -------------------------------------------------------------------
+
+# name -> (parameter names, handler(db, args) -> list of sqlite cursors)
+PROCEDURES = {}
+
+
+def procedure(name, *params):
+    def register(handler):
+        PROCEDURES[name.lower()] = (params, handler)
+        return handler
+    return register
+
+
+def _report_columns(table):
+    key, created = _REPORT_KEYS[table]
+    _, columns = REPORT_TABLES[table]
+    names = [key] + [name for name, _ in columns] + [created]
+    if table in _EDITABLE:
+        names += ["notes", "updatedby", "updated_at"]
+    return names
+
+
+def _register_report_procs(table, reader, writer):
+
+    date_column, columns = REPORT_TABLES[table]
+    column_names = [name for name, _ in columns]
+    _, created = _REPORT_KEYS[table]
+
+    # Output column -> select expression, in output order
+    select = {name: f"t.[{name}]" for name in _report_columns(table)}
+    select["agent_name"] = "u.agent_name AS agent_name"
+    select_list = ", ".join(select.values())
+    where = f"date(t.[{date_column}]) BETWEEN ? AND ?"
+
+    @procedure(reader, "start_date", "end_date", "page", "page_size", "fields")
+    def read(db, args):
+        window = (_to_sql(args["start_date"]), _to_sql(args["end_date"]))
+        page = max(int(args["page"] or 1), 1)
+        page_size = max(int(args["page_size"] or 0), 0)
+
+        # @fields: JSON array of output columns, as in sql/report_fields.sql
+        columns = select_list
+        if args["fields"]:
+            names = json.loads(args["fields"])
+            unknown = [name for name in names if name not in select]
+            if unknown:
+                raise ProgrammingError("42S22", f"Invalid column name '{unknown[0]}'")
+            columns = ", ".join(select[name] for name in names)
+
+        total = db.execute(f"SELECT COUNT(*) AS total_rows FROM [{table}] t WHERE {where}", window)
+        rows = db.execute(
+            f"SELECT {columns} "
+            f"FROM [{table}] t LEFT JOIN users u ON u.user_id = t.user_id "
+            f"WHERE {where} ORDER BY t.[{date_column}], t.rowid LIMIT ? OFFSET ?",
+            window + (page_size, (page - 1) * page_size)
+        )
+        return [total, rows]
+
+    insert_columns = column_names + [created, "user_id"]
+    placeholders = ", ".join("?" for _ in insert_columns)
+    insert_sql = (
+        f"INSERT INTO [{table}] ({', '.join(f'[{c}]' for c in insert_columns)}) "
+        f"VALUES ({placeholders})"
+    )
+
+    @procedure(writer, *column_names, "user_id")
+    def write(db, args):
+        values = [_to_sql(args[name]) for name in column_names]
+        db.execute(insert_sql, values + [_now(), args["user_id"]])
+        return []
+
+
+_register_report_procs("agent_login", "sp_GetAgentLoginByDaterange", "insert_agent")
+_register_report_procs("Agent_Break_Data", "sp_GetAgentBreakDataByDateRange", "sp_InsertAgentBreak_Data")
+_register_report_procs("AgentTimeOnStatus", "sp_GetAgentTimeOnStatusByDateRange", "sp_InsertAgentTimeOnStatus")
+_register_report_procs("Refused", "sp_GetRefusedData", "sp_InsertRefused")
+_register_report_procs("FSSCData", "sp_GetFSSCDataByDateRange", "sp_InsertFSSCData")
+_register_report_procs("TransactionData", "sp_GetTransactionData", "sp_InsertTransactionData")
+_register_report_procs("Modmed", "sp_GetModmedByDateRange", "sp_InsertModmed")
+_register_report_procs("Nextech", "sp_GetNextechByDateRange", "sp_InsertNextech")
+
+
+@procedure("sp_UpdateAgentLoginTime", "id", "Login_Time", "Logout_Time", "Duration", "Notes", "updated_by")
+def _update_login(db, args):
+    db.execute(
+        "UPDATE agent_login SET login_time = ?, logout_time = ?, duration = ?, notes = ?, "
+        "updatedby = ?, updated_at = ? WHERE id = ?",
+        (_to_sql(args["Login_Time"]), _to_sql(args["Logout_Time"]), args["Duration"],
+         args["Notes"], args["updated_by"], _now(), args["id"])
+    )
+    return []
+
+
+@procedure(
+    "sp_UpdateAgentBreakData", "id", "StartTime", "EndTime", "Status", "StatusCodeItem",
+    "StatusCodeList", "TimeValue", "TimePercentage", "LoggedInTime", "Notes", "updated_by"
+)
+def _update_break(db, args):
+    columns = ["StartTime", "EndTime", "Status", "StatusCodeItem", "StatusCodeList",
+               "TimeValue", "TimePercentage", "LoggedInTime"]
+    db.execute(
+        f"UPDATE Agent_Break_Data SET {', '.join(f'[{c}] = ?' for c in columns)}, "
+        "notes = ?, updatedby = ?, updated_at = ? WHERE Id = ?",
+        [_to_sql(args[c]) for c in columns] + [args["Notes"], args["updated_by"], _now(), args["id"]]
+    )
+    return []
+
+
+_TIME_ON_STATUS_COLUMNS = [
+    "StartTime", "EndTime", "AvailableTime", "AvailableTimePercent", "HandlingTime",
+    "HandlingTimePercent", "WrapUpTime", "WrapUpTimePercent", "WorkingOfflineTime",
+    "WorkingOfflineTimePercent", "OfferingTime", "OfferingTimePercent", "OnBreakTime",
+    "OnBreakTimePercent", "BusyTime", "BusyTimePercent", "LoggedInTime",
+]
+
+
+@procedure("sp_UpdateAgentTimeOnStatus", "Id", *_TIME_ON_STATUS_COLUMNS, "Notes", "updated_by")
+def _update_time_on_status(db, args):
+    db.execute(
+        f"UPDATE AgentTimeOnStatus SET {', '.join(f'[{c}] = ?' for c in _TIME_ON_STATUS_COLUMNS)}, "
+        "notes = ?, updatedby = ?, updated_at = ? WHERE Id = ?",
+        [_to_sql(args[c]) for c in _TIME_ON_STATUS_COLUMNS]
+        + [args["Notes"], args["updated_by"], _now(), args["Id"]]
+    )
+    return []
+
+
+@procedure("sp_DeleteReportByDateRange", "table", "date_column", "start_date", "end_date")
+def _delete_report(db, args):
+    table, date_column = args["table"], args["date_column"]
+    if REPORT_TABLES.get(table, (None,))[0] != date_column:
+        raise ProgrammingError("42S02", f"Unknown report table {table}.{date_column}")
+    db.execute(
+        f"DELETE FROM [{table}] WHERE date([{date_column}]) BETWEEN ? AND ?",
+        (_to_sql(args["start_date"]), _to_sql(args["end_date"]))
+    )
+    return []
+
+
+@procedure("logs", "row_index", "error_type", "error_message", "row_data")
+def _log(db, args):
+    db.execute(
+        "INSERT INTO logs (row_index, error_type, error_message, row_data, created_at) VALUES (?, ?, ?, ?, ?)",
+        (args["row_index"], args["error_type"], args["error_message"], args["row_data"], _now())
+    )
+    return []
+
+
+@procedure("sp_LoginUser", "username", "password")
+def _login(db, args):
+    return [db.execute(
+        "SELECT u.user_id, u.username, r.role_name FROM users u JOIN roles r ON r.role_id = u.role_id "
+        "WHERE u.username = ? AND u.password_hash = ? AND u.is_active = 1",
+        (args["username"], args["password"])
+    )]
+
+
+def _utcnow():
+    return datetime.utcnow().isoformat(sep=" ", timespec="microseconds")
+
+
+@procedure("sp_RevokeToken", "token_id", "user_id", "expires_at", "revoked_by")
+def _revoke_token(db, args):
+    db.execute(
+        "INSERT INTO RevokedTokens (token_id, user_id, expires_at, revoked_at, revoked_by) VALUES (?, ?, ?, ?, ?)",
+        (args["token_id"], args["user_id"], _to_sql(args["expires_at"]), _utcnow(), args["revoked_by"])
+    )
+    return []
+
+
+@procedure("sp_GetRevokedTokens", "since")
+def _revoked_tokens(db, args):
+    return [db.execute(
+        "SELECT token_id, user_id, expires_at, revoked_at FROM RevokedTokens "
+        "WHERE expires_at > ? AND (? IS NULL OR revoked_at >= ?) ORDER BY revoked_at",
+        (_utcnow(), _to_sql(args["since"]), _to_sql(args["since"]))
+    )]
+
+
+@procedure("sp_GetMasterDataVersion", "dataset")
+def _master_version(db, args):
+    return [db.execute(
+        "SELECT COALESCE((SELECT version FROM MasterDataVersions WHERE dataset = ?), 0) AS version",
+        (args["dataset"],)
+    )]
+
+
+@procedure("sp_BumpMasterDataVersion", "datasets")
+def _bump_master_version(db, args):
+    for dataset in {name.strip() for name in args["datasets"].split(",") if name.strip()}:
+        db.execute(
+            "INSERT INTO MasterDataVersions (dataset, version, updated_at) VALUES (?, 1, ?) "
+            "ON CONFLICT (dataset) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at",
+            (dataset, _utcnow())
+        )
+    return []
+
+
+def _count_and_select(db, table, columns, order_by):
+    return [
+        db.execute(f"SELECT COUNT(*) AS total_rows FROM {table}"),
+        db.execute(f"SELECT {columns} FROM {table} ORDER BY {order_by}"),
+    ]
+
+
+@procedure("usp_next_tech_id")
+def _nextech_ids(db, args):
+    return _count_and_select(db, "NextechID", "id, name, Nextech_ID, Team_ID, GroupID, IsActive", "id")
+
+
+@procedure("sp_Nextech_Insert", "name", "Nextech_ID", "Team_ID", "GroupID", "createdBy")
+def _nextech_insert(db, args):
+    db.execute(
+        "INSERT INTO NextechID (name, Nextech_ID, Team_ID, GroupID, createdBy) VALUES (?, ?, ?, ?, ?)",
+        (args["name"], args["Nextech_ID"], args["Team_ID"], args["GroupID"], args["createdBy"])
+    )
+    return []
+
+
+@procedure("sp_Nextech_Update", "id", "name", "Nextech_ID", "Team_ID", "GroupID", "updatedBy", "IsActive")
+def _nextech_update(db, args):
+    db.execute(
+        "UPDATE NextechID SET name = ?, Nextech_ID = ?, Team_ID = ?, GroupID = ?, updatedBy = ?, "
+        "IsActive = ? WHERE id = ?",
+        (args["name"], args["Nextech_ID"], args["Team_ID"], args["GroupID"], args["updatedBy"],
+         args["IsActive"], args["id"])
+    )
+    return []
+
+
+@procedure("usp_get_practice")
+def _practices(db, args):
+    return _count_and_select(db, "Practice", "id, PracticeName, Practice", "id")
+
+
+@procedure("sp_practice_create", "PracticeName", "Practice")
+def _practice_create(db, args):
+    db.execute("INSERT INTO Practice (PracticeName, Practice) VALUES (?, ?)",
+               (args["PracticeName"], args["Practice"]))
+    return []
+
+
+@procedure("sp_practice_update", "id", "PracticeName", "Practice")
+def _practice_update(db, args):
+    db.execute("UPDATE Practice SET PracticeName = ?, Practice = ? WHERE id = ?",
+               (args["PracticeName"], args["Practice"], args["id"]))
+    return []
+
+
+@procedure("usp_get_group")
+def _groups(db, args):
+    return [db.execute("SELECT id, Groups FROM Groups ORDER BY id")]
+
+
+@procedure("sp_group_create", "Groups")
+def _group_create(db, args):
+    db.execute("INSERT INTO Groups (Groups) VALUES (?)", (args["Groups"],))
+    return []
+
+
+@procedure("sp_group_update", "id", "Groups")
+def _group_update(db, args):
+    db.execute("UPDATE Groups SET Groups = ? WHERE id = ?", (args["Groups"], args["id"]))
+    return []
+
+
+@procedure("usp_get_practice_group")
+def _practice_groups(db, args):
+    return _count_and_select(db, "PracticeGroup", "IntPracticeID, QueueName, Practice, Groups", "IntPracticeID")
+
+
+@procedure("usp_insert_practice_group", "QueueName", "Practice", "Groups", "createdBy")
+def _practice_group_insert(db, args):
+    db.execute(
+        "INSERT INTO PracticeGroup (QueueName, Practice, Groups, createdBy) VALUES (?, ?, ?, ?)",
+        (args["QueueName"], args["Practice"], args["Groups"], args["createdBy"])
+    )
+    return []
+
+
+@procedure("usp_update_practice_group", "IntPracticeID", "QueueName", "Practice", "Groups")
+def _practice_group_update(db, args):
+    db.execute(
+        "UPDATE PracticeGroup SET QueueName = ?, Practice = ?, Groups = ? WHERE IntPracticeID = ?",
+        (args["QueueName"], args["Practice"], args["Groups"], args["IntPracticeID"])
+    )
+    return []
+
+
+@procedure("sp_GetAllUsers")
+def _users(db, args):
+    return [
+        db.execute("SELECT COUNT(*) AS total_rows FROM users"),
+        db.execute(
+            "SELECT u.user_id, u.username, u.role_id, r.role_name, u.team_id, u.is_active, u.agent_name "
+            "FROM users u LEFT JOIN roles r ON r.role_id = u.role_id ORDER BY u.user_id"
+        ),
+    ]
+
+
+@procedure("sp_CreateUser", "username", "password_hash", "role_id", "team_id", "is_active", "agent_name", "created_by")
+def _user_create(db, args):
+    db.execute(
+        "INSERT INTO users (username, password_hash, role_id, team_id, is_active, agent_name, created_by, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (args["username"], args["password_hash"], args["role_id"], args["team_id"],
+         _to_sql(args["is_active"]), args["agent_name"], args["created_by"], _now())
+    )
+    return []
+
+
+@procedure(
+    "sp_UpdateUser", "user_id", "username", "password_hash", "role_id", "team_id",
+    "is_active", "agent_name", "created_by"
+)
+def _user_update(db, args):
+    db.execute(
+        "UPDATE users SET username = COALESCE(?, username), password_hash = COALESCE(?, password_hash), "
+        "role_id = COALESCE(?, role_id), team_id = COALESCE(?, team_id), "
+        "is_active = COALESCE(?, is_active), agent_name = COALESCE(?, agent_name) WHERE user_id = ?",
+        (args["username"], args["password_hash"], args["role_id"], args["team_id"],
+         _to_sql(args["is_active"]), args["agent_name"], args["user_id"])
+    )
+    return []
+
+
+@procedure("sp_VonageID_GetAll")
+def _vonage_ids(db, args):
+    return _count_and_select(
+        db, "VonageID", "id, name, eight_ID, Edgemd_ID, Modmed_ID, Team_ID, IsActive", "id"
+    )
+
+
+@procedure("sp_VonageID_Insert", "name", "eight_ID", "Edgemd_ID", "Modmed_ID", "Team_ID", "createdBy")
+def _vonage_insert(db, args):
+    db.execute(
+        "INSERT INTO VonageID (name, eight_ID, Edgemd_ID, Modmed_ID, Team_ID, createdBy) VALUES (?, ?, ?, ?, ?, ?)",
+        (args["name"], args["eight_ID"], args["Edgemd_ID"], args["Modmed_ID"], args["Team_ID"], args["createdBy"])
+    )
+    return []
+
+
+@procedure(
+    "sp_VonageID_Update", "id", "name", "eight_ID", "Edgemd_ID", "Modmed_ID", "Team_ID",
+    "updatedBy", "IsActive"
+)
+def _vonage_update(db, args):
+    db.execute(
+        "UPDATE VonageID SET name = ?, eight_ID = ?, Edgemd_ID = ?, Modmed_ID = ?, Team_ID = ?, "
+        "updatedBy = ?, IsActive = ? WHERE id = ?",
+        (args["name"], args["eight_ID"], args["Edgemd_ID"], args["Modmed_ID"], args["Team_ID"],
+         args["updatedBy"], args["IsActive"], args["id"])
+    )
+    return []
+
+
+@procedure("sp_team_get_all")
+def _teams(db, args):
+    return _count_and_select(db, "Team", "id, name", "id")
+
+
+@procedure("sp_team_get_by_id", "id")
+def _team(db, args):
+    return [db.execute("SELECT id, name FROM Team WHERE id = ?", (args["id"],))]
+
+
+@procedure("sp_team_insert", "name")
+def _team_insert(db, args):
+    db.execute("INSERT INTO Team (name) VALUES (?)", (args["name"],))
+    return []
+
+
+@procedure("sp_team_update", "id", "name")
+def _team_update(db, args):
+    db.execute("UPDATE Team SET name = ? WHERE id = ?", (args["name"], args["id"]))
+    return []
+
+
+# -------------------------------------------------------------------
+# DB-API surface
+# -------------------------------------------------------------------
+
+_EXEC_RE = re.compile(r"^\s*EXEC(?:UTE)?\s+\[?(\w+)\]?(.*)$", re.IGNORECASE | re.DOTALL)
+_NAMED_RE = re.compile(r"@(\w+)\s*=\s*\?")
+
+
+class _ResultSet:
+    """One result set, read lazily from a sqlite cursor."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._first = cursor.fetchone()
+        names = [col[0] for col in cursor.description]
+        self.row_type = collections.namedtuple("Row", names, rename=True)
+        self.description = [
+            (name, type(value) if value is not None else str, None, None, None, None, True)
+            for name, value in zip(names, self._first or [None] * len(names))
+        ]
+
+    def fetch(self, size=None):
+
+        rows = []
+        if self._first is not None and size != 0:
+            rows.append(self._first)
+            self._first = None
+            if size is not None:
+                size -= 1
+
+        if size is None:
+            rows.extend(self._cursor.fetchall())
+        elif size > 0:
+            rows.extend(self._cursor.fetchmany(size))
+
+        return [self.row_type._make(row) for row in rows]
+
+
+class SQLiteCursor:
+
+    arraysize = 1
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.fast_executemany = False
+        self.rowcount = -1
+        self._results = []
+        self._current = None
+        self._prepared = None
+
+    @property
+    def description(self):
+        return self._current.description if self._current else None
+
+    def execute(self, sql, *params):
+
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+
+        if params:
+            self._prepare(sql)
+        self.connection._round_trip(SQLITE_LATENCY_MS)
+        self._run(lambda: self._dispatch(sql, params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+
+        self._prepare(sql)
+        self.connection._round_trip(SQLITE_LATENCY_MS)
+
+        def run_all():
+            results = []
+            for params in seq_of_params:
+                results = self._dispatch(sql, tuple(params))
+            return results
+
+        self._run(run_all)
+
+    def _prepare(self, sql):
+        if sql != self._prepared:
+            self.connection._round_trip(SQLITE_PREPARE_LATENCY_MS)
+            self.connection.prepares += 1
+            self._prepared = sql
+
+    def _run(self, statement):
+
+        db = self.connection._db
+        changes = db.total_changes
+
+        try:
+            with self.connection._deadline():
+                results = statement()
+        except sqlite3.OperationalError as e:
+            if str(e) == "interrupted":
+                raise self.connection._interrupt_error() from e
+            raise OperationalError("HY000", str(e)) from e
+        except sqlite3.Error as e:
+            raise ProgrammingError("42000", str(e)) from e
+
+        self._results = [_ResultSet(cursor) for cursor in results if cursor.description]
+        self._current = self._results.pop(0) if self._results else None
+        self.rowcount = db.total_changes - changes if not self._current else -1
+
+    def _dispatch(self, sql, params):
+
+        params = [_to_sql(p) for p in params]
+        match = _EXEC_RE.match(sql)
+
+        if not match:
+            return self._raw(sql, params)
+
+        name, tail = match.groups()
+        entry = PROCEDURES.get(name.lower())
+        if entry is None:
+            raise ProgrammingError("42000", f"Could not find stored procedure '{name}'")
+
+        names, handler = entry
+        named = _NAMED_RE.findall(tail)
+
+        if named:
+            lookup = {n.lower(): n for n in names}
+            args = {lookup.get(n.lower(), n): value for n, value in zip(named, params)}
+        else:
+            args = dict(zip(names, params))
+
+        for n in names:
+            args.setdefault(n, None)
+
+        return handler(self.connection._db, args)
+
+    def _raw(self, sql, params):
+        """Plain SQL; several ;-separated statements give several result sets."""
+
+        db = self.connection._db
+        results = []
+
+        for statement in (part.strip() for part in sql.split(";")):
+            if not statement:
+                continue
+            count = statement.count("?")
+            results.append(db.execute(statement, params[:count]))
+            params = params[count:]
+
+        return results
+
+    def fetchone(self):
+        rows = self._fetch(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size=None):
+        return self._fetch(size or self.arraysize)
+
+    def fetchall(self):
+        return self._fetch(None)
+
+    def _fetch(self, size):
+        if self._current is None:
+            raise ProgrammingError("24000", "No results. Previous SQL was not a query.")
+        self.connection._round_trip(SQLITE_FETCH_LATENCY_MS)
+        return self._current.fetch(size)
+
+    def nextset(self):
+        if not self._results:
+            self._current = None
+            return None
+        self._current = self._results.pop(0)
+        return True
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def cancel(self):
+        self.connection.cancel()
+
+    def close(self):
+        self._results = []
+        self._current = None
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+
+    def __init__(self, path=SQLITE_PATH):
+        self._db = sqlite3.connect(
+            path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+            timeout=30,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_MASTER_SCHEMA + _report_schema())
+        self._db.commit()
+
+        self.timeout = 0
+        self.prepares = 0
+        self._cancel = threading.Event()
+        self._timed_out = False
+
+    def cursor(self):
+        return SQLiteCursor(self)
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._cancel.clear()
+        self._db.rollback()
+
+    def cancel(self):
+        self._cancel.set()
+        self._db.interrupt()
+
+    def close(self):
+        self._db.close()
+
+    def _round_trip(self, latency_ms):
+        # Injected network latency; a cancel interrupts the wait
+        if latency_ms and self._cancel.wait(latency_ms / 1000):
+            raise OperationalError("HY008", "Operation canceled")
+
+    def _interrupt_error(self):
+        if self._timed_out:
+            return OperationalError("HYT00", "Query timeout expired")
+        return OperationalError("HY008", "Operation canceled")
+
+    def _deadline(self):
+        return _Deadline(self)
+
+
+class _Deadline:
+    """Emulates the ODBC query timeout with a sqlite progress handler."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        conn = self.connection
+        conn._timed_out = False
+        if conn._cancel.is_set():
+            raise OperationalError("HY008", "Operation canceled")
+        if conn.timeout:
+            deadline = time.monotonic() + conn.timeout
+
+            def check():
+                if time.monotonic() > deadline:
+                    conn._timed_out = True
+                    return 1
+                return 0
+
+            conn._db.set_progress_handler(check, 10000)
+
+    def __exit__(self, *exc):
+        self.connection._db.set_progress_handler(None, 0)
+
+
+def connect(path=SQLITE_PATH):
+    return SQLiteConnection(path or SQLITE_PATH)
+
+
+# -------------------------------------------------------------------
+# Synthetic data
+# -------------------------------------------------------------------
+
+def seed_report_data(path=SQLITE_PATH, rows=10000, days=30, start=None):
+    """Fill every report table with `rows` synthetic rows spread over `days` days."""
+
+    import random
+
+    start = start or (date.today() - timedelta(days=days - 1))
+    agents = [f"Agent {i:03d}" for i in range(60)]
+    statuses = ["Available", "Busy", "On Break", "Lunch", "Meeting", "Offline"]
+    locations = ["Tampa", "Orlando", "Miami", "Dallas", "Austin"]
+    rnd = random.Random(42)
+
+    def duration():
+        seconds = rnd.randint(0, 3 * 3600)
+        return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def value(name, kind, moment):
+        if kind == "DATETIME":
+            return moment.isoformat(sep=" ")
+        if kind == "DATE":
+            return moment.date().isoformat()
+        if kind == "REAL":
+            return round(rnd.uniform(0, 100), 2)
+        if kind == "INTEGER":
+            return rnd.randint(1, 500)
+        if "Time" in name or "Duration" in name or name in ("duration", "TimetoAbandon"):
+            return duration()
+        if name in ("Agent", "agent", "Participant", "FirstTouchUser", "LastTouchUser", "user_name"):
+            return rnd.choice(agents)
+        if name in ("Status", "AppointmentStatus"):
+            return rnd.choice(statuses)
+        if name == "Location":
+            return rnd.choice(locations)
+        return f"{name}-{rnd.randint(1, 10 ** 6)}"
+
+    conn = connect(path)
+    db = conn._db
+
+    for table, (_, columns) in REPORT_TABLES.items():
+        _, created = _REPORT_KEYS[table]
+        names = [name for name, _ in columns] + [created, "user_id"]
+        sql = (
+            f"INSERT INTO [{table}] ({', '.join(f'[{n}]' for n in names)}) "
+            f"VALUES ({', '.join('?' for _ in names)})"
+        )
+
+        batch = []
+        for i in range(rows):
+            moment = datetime.combine(start, dt_time(8)) + timedelta(
+                days=i % days, seconds=rnd.randint(0, 10 * 3600)
+            )
+            batch.append([value(n, k, moment) for n, k in columns] + [_now(), 1])
+            if len(batch) == 5000:
+                db.executemany(sql, batch)
+                batch = []
+        if batch:
+            db.executemany(sql, batch)
+
+    db.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed the SQLite load-test database")
+    parser.add_argument("--path", default=SQLITE_PATH)
+    parser.add_argument("--rows", type=int, default=10000, help="rows per report table")
+    parser.add_argument("--days", type=int, default=30)
+    options = parser.parse_args()
+
+    seed_report_data(options.path, options.rows, options.days)
+    print(f"Seeded {options.rows} rows per report table into {options.path}")
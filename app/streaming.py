@@ -0,0 +1,237 @@
+import csv
+import io
+import os
+import threading
+
+import anyio
+from starlette.responses import StreamingResponse
+
+from .db import EXPORT, REPORT, lazy_read_connection
+from .executor import run_db, run_db_with_timeout
+from .fetch import DB_FETCH_BATCH_SIZE, column_names
+from .response import ReportFormat, dumps
+from .services import REPORT_PROCEDURES, open_export_cursor, open_report_cursor
+
+# Report pages at least this large are streamed instead of built in memory
+REPORT_STREAM_MIN_PAGE_SIZE = int(os.getenv("REPORT_STREAM_MIN_PAGE_SIZE", "1000"))
+
+
+def should_stream(data):
+    return data.page_size >= REPORT_STREAM_MIN_PAGE_SIZE
+
+
+class ReportStream:
+    """
+    One report query read batch by batch. It owns its connection: the route's
+    connection dependency is released before a streamed body is sent.
+    All methods run on worker threads; the lock keeps close() from racing
+    a batch that is still being fetched.
+    """
+
+    # Pool and worker threads the stream runs on (see db.TRAFFIC_CLASSES)
+    traffic_class = REPORT
+
+    def __init__(self, report, batch_size=DB_FETCH_BATCH_SIZE, fmt=None):
+        self.report = report
+        self.batch_size = batch_size
+        self.fmt = fmt or ReportFormat()
+        self.conn = lazy_read_connection(self.traffic_class)
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._columns = None
+        self._encoder = None
+
+    def open_report(self, data):
+        with self._lock:
+            self._cursor, total_rows = open_report_cursor(self.report, data, self.conn)
+            self._columns = column_names(self._cursor)
+            self._encoder = self.fmt.encoder(self._columns)
+        return total_rows
+
+    @property
+    def columns(self):
+        return self._columns
+
+    def dictionaries(self):
+        return self._encoder.dictionaries() if self._encoder is not None else None
+
+    def next_chunk(self):
+        """Next batch encoded as comma-separated JSON objects, or None at the end."""
+
+        with self._lock:
+            if self._cursor is None:
+                return None
+
+            rows = self._cursor.fetchmany(self.batch_size)
+            if not rows:
+                return None
+
+            return self.encode(rows)
+
+    def encode(self, rows):
+        # dumps() gives "[{...},{...}]"; drop the brackets
+        if self._encoder is not None:
+            return dumps(self._encoder.encode(rows))[1:-1]
+        if self.fmt.compact:
+            return dumps([tuple(row) for row in rows])[1:-1]
+        columns = self._columns
+        return dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+
+    def close(self):
+        with self._lock:
+            if self._cursor is not None:
+                self._cursor.close()
+                self._cursor = None
+            self.conn.release()
+
+
+class ReportExport(ReportStream):
+    """
+    Every row of a report in a date range, from one call of the report's
+    own procedure (see open_export_cursor). Each batch is encoded on its own, so
+    only one fetchmany batch is ever held in memory. Subclasses set the
+    file format: encode() plus an optional header() and trailer().
+    """
+
+    traffic_class = EXPORT
+
+    media_type = "application/octet-stream"
+    extension = "bin"
+
+    def open_export(self, start_date, end_date):
+        with self._lock:
+            self._cursor = open_export_cursor(self.report, start_date, end_date, self.conn)
+            self._columns = column_names(self._cursor)
+
+    def header(self):
+        return b""
+
+    def trailer(self):
+        return b""
+
+
+class CSVExport(ReportExport):
+
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def header(self):
+        return self._write([self._columns])
+
+    def encode(self, rows):
+        return self._write(rows)
+
+    @staticmethod
+    def _write(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\r\n").writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+
+class ReportStreamResponse(StreamingResponse):
+    """StreamingResponse that always gives the stream's connection back."""
+
+    def __init__(self, stream, content, media_type="application/json", **kwargs):
+        super().__init__(content, media_type=media_type, **kwargs)
+        self.stream = stream
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Also runs when the client disconnects mid-stream
+            with anyio.CancelScope(shield=True):
+                await run_db(self.stream.traffic_class, self.stream.close)
+
+
+async def stream_report(report, data, message, timeout, fmt=None):
+    """
+    Streamed equivalent of api_get_response(status="success", ...) for a
+    report page, in the negotiated ReportFormat. The bytes are the same;
+    rows are written as they are fetched, so memory stays flat whatever the
+    page size. Errors before the first row (including timeouts) still
+    produce a normal error response.
+    """
+
+    fmt = fmt or ReportFormat()
+    stream = ReportStream(report, fmt=fmt)
+
+    try:
+        total_rows = await run_db_with_timeout(
+            stream.traffic_class, timeout, stream.conn, stream.open_report, data,
+            procedure=REPORT_PROCEDURES[stream.report],
+        )
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await run_db(stream.traffic_class, stream.close)
+        raise
+
+    head = b'{"status":"success","message":%s,"total_rows":%s,"data":' % (
+        dumps(message),
+        dumps(total_rows),
+    )
+    if fmt.compact:
+        head += b'{"columns":%s,"rows":[' % dumps(stream.columns)
+    else:
+        head += b"["
+
+    async def body():
+        yield head
+        separator = b""
+        while True:
+            chunk = await run_db(stream.traffic_class, stream.next_chunk)
+            if chunk is None:
+                break
+            yield separator + chunk
+            separator = b","
+        if fmt.dictionary:
+            yield b'],"dictionaries":%s}}' % dumps(stream.dictionaries())
+        elif fmt.compact:
+            yield b"]}}"
+        else:
+            yield b"]}"
+
+    return ReportStreamResponse(stream, body(), media_type=fmt.media_type, headers=fmt.headers)
+
+
+async def export_report(stream, data, timeout):
+    """
+    Stream every row of stream.report between data.start_date and
+    data.end_date as a file download in the stream's format. timeout bounds
+    queueing plus the query itself; once rows flow the download runs as
+    long as it needs to. Errors before the first row still produce a
+    normal error response. Exports run on the EXPORT pool and workers, so
+    slow downloads never hold the connections the report pages need.
+    """
+
+    try:
+        await run_db_with_timeout(
+            stream.traffic_class, timeout, stream.conn, stream.open_export, data.start_date, data.end_date,
+            procedure=REPORT_PROCEDURES[stream.report],
+        )
+    except BaseException:
+        with anyio.CancelScope(shield=True):
+            await run_db(stream.traffic_class, stream.close)
+        raise
+
+    async def body():
+        yield stream.header()
+        while True:
+            chunk = await run_db(stream.traffic_class, stream.next_chunk)
+            if chunk is None:
+                break
+            yield chunk
+        yield await run_db(stream.traffic_class, stream.trailer)
+
+    filename = f"{stream.report}_{data.start_date.isoformat()}_{data.end_date.isoformat()}.{stream.extension}"
+
+    return ReportStreamResponse(
+        stream,
+        body(),
+        media_type=stream.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+async def export_report_csv(report, data, timeout):
+    return await export_report(CSVExport(report), data, timeout)
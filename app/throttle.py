@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Login attempts: each key gets a bucket of `burst` tokens refilled at `rate`
+# tokens per second. Per username this limits password guessing, per client
+# IP it limits floods spread over many usernames.
+LOGIN_USER_BURST = float(os.getenv("LOGIN_USER_BURST", "5"))
+LOGIN_USER_RATE = float(os.getenv("LOGIN_USER_RATE", str(1 / 30)))
+
+# A whole clinic often shares one NAT address and logs in at shift start, so
+# the IP bucket is only a coarse backstop against floods; the username bucket
+# does the real limiting.
+LOGIN_IP_BURST = float(os.getenv("LOGIN_IP_BURST", "200"))
+LOGIN_IP_RATE = float(os.getenv("LOGIN_IP_RATE", "5"))
+
+# What the IP bucket is keyed on: "ip" (default) caps all logins from one
+# address; "ip_username" gives each username its own bucket per address, so
+# a shared address never throttles a whole site, but a flood spread over many
+# usernames from one address is then only held back by LOGIN_MAX_QUEUE.
+LOGIN_IP_KEY = os.getenv("LOGIN_IP_KEY", "ip").lower()
+
+if LOGIN_IP_KEY not in ("ip", "ip_username"):
+    raise RuntimeError(f"Unknown LOGIN_IP_KEY {LOGIN_IP_KEY!r}, expected 'ip' or 'ip_username'")
+
+# Logins waiting for an auth worker beyond this are refused straight away
+LOGIN_MAX_QUEUE = int(os.getenv("LOGIN_MAX_QUEUE", "32"))
+
+# Use the first X-Forwarded-For address as the client IP (only behind a
+# trusted reverse proxy, the header is otherwise client-controlled)
+LOGIN_TRUST_FORWARDED = os.getenv("LOGIN_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+
+# Buckets tracked per limiter; least recently used keys are dropped first
+THROTTLE_MAX_KEYS = int(os.getenv("THROTTLE_MAX_KEYS", "100000"))
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets keyed by an arbitrary string, per worker."""
+
+    def __init__(self, burst, rate, max_keys=THROTTLE_MAX_KEYS):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (tokens, last refill), least recently used first
+        self._buckets = OrderedDict()
+
+    def acquire(self, key):
+        """
+        Take one token. Returns 0 when allowed, else the seconds until a
+        token becomes available.
+        """
+
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+            if tokens >= 1:
+                wait = 0.0
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate if self.rate else float("inf")
+
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+_user_limiter = TokenBucketLimiter(LOGIN_USER_BURST, LOGIN_USER_RATE)
+_ip_limiter = TokenBucketLimiter(LOGIN_IP_BURST, LOGIN_IP_RATE)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "allowed": 0,
+    "throttled_username": 0,
+    "throttled_ip": 0,
+    "throttled_queue": 0,
+}
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def client_ip(request):
+
+    if LOGIN_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+
+    return request.client.host if request.client else "unknown"
+
+
+def check_login(username, ip, queued):
+    """
+    Seconds the caller should wait before retrying, or 0 when the attempt
+    may go to the DB. The IP bucket is checked first so a flood can't drain
+    a victim's username bucket from many addresses unnoticed.
+    """
+
+    if queued >= LOGIN_MAX_QUEUE:
+        _count("throttled_queue")
+        return 1.0
+
+    username = str(username).strip().lower()
+
+    wait = _ip_limiter.acquire(f"{ip}|{username}" if LOGIN_IP_KEY == "ip_username" else ip)
+    if wait:
+        _count("throttled_ip")
+        return wait
+
+    wait = _user_limiter.acquire(username)
+    if wait:
+        _count("throttled_username")
+        return wait
+
+    _count("allowed")
+    return 0.0
+
+
+def get_throttle_stats():
+
+    with _stats_lock:
+        stats = dict(_stats)
+
+    stats["tracked_usernames"] = len(_user_limiter)
+    stats["tracked_ips"] = len(_ip_limiter)
+    stats["ip_key"] = LOGIN_IP_KEY
+
+    return stats
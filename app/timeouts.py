@@ -0,0 +1,71 @@
+import json
+import os
+
+# Default server-side timeout (seconds) for any statement; 0 disables it.
+# Bulk inserts from the upload module run without a timeout by default.
+DB_QUERY_TIMEOUT = int(os.getenv("DB_QUERY_TIMEOUT", "0"))
+
+# Default request budget (seconds) for routes listed in ROUTE_TIMEOUTS.
+DB_ROUTE_TIMEOUT = float(os.getenv("DB_ROUTE_TIMEOUT", "60"))
+
+# Per-procedure statement timeouts in seconds. The ODBC driver cancels the
+# statement on the server when one expires. Override or extend with
+# DB_PROCEDURE_TIMEOUTS='{"sp_GetTransactionData": 45}'
+PROCEDURE_TIMEOUTS = {
+    "sp_GetTransactionData": 30,
+    "sp_GetRefusedData": 30,
+    "sp_GetNextechByDateRange": 30,
+    "sp_GetModmedByDateRange": 30,
+    "sp_GetAgentLoginByDaterange": 30,
+    "sp_GetAgentBreakDataByDateRange": 30,
+    "sp_GetAgentTimeOnStatusByDateRange": 30,
+    "sp_GetFSSCDataByDateRange": 30,
+    "sp_LoginUser": 10,
+}
+PROCEDURE_TIMEOUTS.update(json.loads(os.getenv("DB_PROCEDURE_TIMEOUTS", "{}")))
+
+# Statement timeout (seconds) of the unpaged report query behind an export,
+# which sorts the whole date range before the first row comes back
+EXPORT_QUERY_TIMEOUT = int(os.getenv("EXPORT_QUERY_TIMEOUT", "120"))
+
+# Per-route request budgets in seconds, covering queueing plus execution.
+# Override or extend with DB_ROUTE_TIMEOUTS='{"/get-transaction-data": 45}'
+ROUTE_TIMEOUTS = {
+    "/get-transaction-data": 35,
+    "/get-refused-data": 35,
+    "/get-nextech-data": 35,
+    "/get-agent-login": 35,
+    "/get-modmed-data": 35,
+    "/get-break-data": 35,
+    "/get-time-on-status": 35,
+    "/get-submission-data": 35,
+    "/export/{report}/csv": 125,
+    "/export/{report}/{fmt}": 125,
+}
+ROUTE_TIMEOUTS.update(json.loads(os.getenv("DB_ROUTE_TIMEOUTS", "{}")))
+
+# SQLSTATEs raised when the driver cancels a statement
+# (HYT00 query timeout, HYT01 connection timeout, HY008 operation cancelled)
+_TIMEOUT_SQLSTATES = ("HYT00", "HYT01", "HY008")
+
+
+class QueryTimeoutError(Exception):
+    """A statement or route exceeded its time budget and was cancelled."""
+
+    def __init__(self, procedure, timeout):
+        self.procedure = procedure
+        self.timeout = timeout
+        super().__init__(f"{procedure} exceeded its {timeout}s timeout and was cancelled")
+
+
+def procedure_timeout(procedure):
+    return int(PROCEDURE_TIMEOUTS.get(procedure, DB_QUERY_TIMEOUT))
+
+
+def route_timeout(path):
+    return ROUTE_TIMEOUTS.get(path, DB_ROUTE_TIMEOUT)
+
+
+def is_timeout_error(exc):
+    args = getattr(exc, "args", ())
+    return bool(args) and args[0] in _TIMEOUT_SQLSTATES
@@ -0,0 +1,106 @@
+"""
+Versions of the master-data lists, for ETag / If-None-Match.
+
+Each list (practices, groups, teams, ...) has a version number in the DB
+(dbo.MasterDataVersions, see sql/master_data_versions.sql). Its create /
+update / delete services bump it after they commit, and the list routes
+answer 304 Not Modified, without running the list procedure, when the
+client sends the current ETag back.
+
+Versions only grow and never expire, so every worker and host computes the
+same ETag and an ETag from before a change can't match again.
+"""
+
+import logging
+
+from starlette.responses import Response
+
+from .retry import retry_read
+
+logger = logging.getLogger("uvicorn.error")
+
+# Lists that show data from another list (team or practice names, ...)
+# change when it does
+DEPENDENT_DATASETS = {
+    "team": ("user", "nextech", "vonage"),
+    "practice": ("practice_group",),
+    "group": ("practice_group",),
+}
+
+_stats = {
+    "not_modified": 0,
+    "full_responses": 0,
+    "bumps": 0,
+    "bump_failures": 0,
+}
+
+
+@retry_read
+def current_version(conn, dataset):
+
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("EXEC sp_GetMasterDataVersion ?", dataset)
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    finally:
+        cursor.close()
+
+
+def bump_version(cursor, dataset):
+    """
+    Give dataset (and the lists that depend on it) a new version. Called
+    with the cursor of the change, after its commit: reusing the cursor
+    discards its pending results, which a second cursor on the connection
+    would trip over. A failure is logged rather than raised because the
+    change itself already succeeded.
+    """
+
+    datasets = (dataset,) + DEPENDENT_DATASETS.get(dataset, ())
+
+    try:
+        cursor.execute("EXEC sp_BumpMasterDataVersion ?", ",".join(datasets))
+        cursor.commit()
+        _stats["bumps"] += len(datasets)
+    except Exception as e:
+        try:
+            cursor.rollback()
+        except Exception:
+            pass
+        _stats["bump_failures"] += 1
+        logger.warning("Master data version bump failed for %s: %s", dataset, e)
+
+
+def master_etag(conn, dataset):
+    return f'W/"{dataset}-{current_version(conn, dataset)}"'
+
+
+def etag_matches(request, etag):
+    """True when If-None-Match lists etag (weak comparison) or is "*"."""
+
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    if header.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag):
+    _stats["not_modified"] += 1
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+def with_etag(response, etag):
+    _stats["full_responses"] += 1
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def get_version_stats():
+    return dict(_stats)
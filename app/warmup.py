@@ -0,0 +1,84 @@
+import logging
+import os
+import time
+from datetime import date
+
+from .db import REPLICA, REPORT, TRAFFIC_CLASSES, acquire_read_connection, get_pool, replica_configured
+from .services import REPORT_PROCEDURES
+
+# Set DB_WARMUP=true to open every pool's min_size connections and run each
+# report procedure once at startup, before the worker accepts traffic.
+DB_WARMUP = os.getenv("DB_WARMUP", "false").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger("uvicorn.error")
+
+_last_report = None
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        result = func()
+        return {"ms": round((time.perf_counter() - start) * 1000, 1), "result": result}
+    except Exception as e:
+        return {"ms": round((time.perf_counter() - start) * 1000, 1), "error": str(e)}
+
+
+def _prime_procedure(procedure):
+    """Run a report procedure for a one-day, one-row page and drain its result sets."""
+
+    today = date.today()
+    pool, conn = acquire_read_connection()
+
+    try:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"EXEC {procedure} ?, ?, ?, ?", today, today, 1, 1)
+            while True:
+                if cursor.description is not None:
+                    cursor.fetchall()
+                if not cursor.nextset():
+                    break
+        finally:
+            cursor.close()
+    finally:
+        pool.release(conn)
+
+
+def warm_up():
+    """Open pool connections and prime report procedure plans; returns a timing report."""
+
+    global _last_report
+
+    started = time.perf_counter()
+    report = {"pools": {}, "procedures": {}}
+
+    for traffic_class in TRAFFIC_CLASSES:
+        report["pools"][traffic_class] = _timed(get_pool(traffic_class).fill)
+
+    if replica_configured():
+        report["pools"][f"{REPORT}:{REPLICA}"] = _timed(get_pool(REPORT, REPLICA).fill)
+
+    for procedure in REPORT_PROCEDURES.values():
+        report["procedures"][procedure] = _timed(lambda: _prime_procedure(procedure))
+
+    report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    failures = {
+        name: entry["error"]
+        for section in ("pools", "procedures")
+        for name, entry in report[section].items()
+        if "error" in entry
+    }
+    report["failures"] = list(failures)
+
+    logger.info("DB warm-up finished in %.1f ms (%d failures)", report["total_ms"], len(failures))
+    for name, error in failures.items():
+        logger.warning("DB warm-up step %s failed: %s", name, error)
+
+    _last_report = report
+    return report
+
+
+def get_warmup_report():
+    return _last_report
@@ -0,0 +1,108 @@
+"""
+Serialization benchmark for report pages: the old JSONResponse over
+jsonable_encoder against FastJSONResponse, on pages shaped like
+TransactionResponse (the widest report, datetimes, dates and many
+nullable strings):
+
+    python -m benchmarks.json_response --sizes 100 1000 5000
+
+Both bodies are checked to be identical before timing.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import typing
+from datetime import date, datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.response import FastJSONResponse, orjson
+from app.schemas import TransactionResponse
+
+
+def _base_type(annotation):
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    return args[0] if args else annotation
+
+
+def transaction_rows(count, seed=7):
+    """Rows with TransactionResponse's fields and types, ~15% nulls in optional ones."""
+
+    rnd = random.Random(seed)
+    start = datetime(2026, 3, 1, 8)
+    agents = [f"Agent {i:03d}" for i in range(60)]
+    rows = []
+
+    for i in range(count):
+        moment = start + timedelta(seconds=rnd.randint(0, 30 * 86400))
+        row = {}
+        for name, field in TransactionResponse.model_fields.items():
+            kind = _base_type(field.annotation)
+            if not field.is_required() and rnd.random() < 0.15:
+                value = None
+            elif kind is int:
+                value = i + 1
+            elif kind is datetime:
+                value = moment + timedelta(microseconds=rnd.choice([0, 0, 250000]))
+            elif kind is date:
+                value = moment.date()
+            elif name.endswith("Duration") or name in ("TimetoAbandon", "Hold"):
+                seconds = rnd.randint(0, 3600)
+                value = f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+            elif name in ("Participant", "agent_name"):
+                value = rnd.choice(agents)
+            else:
+                value = f"{name}-{rnd.randint(1, 10 ** 6)}"
+            row[name] = value
+        rows.append(row)
+
+    return rows
+
+
+def page(rows):
+    return {"status": "success", "message": "Transaction report fetched successfully", "total_rows": len(rows), "data": rows}
+
+
+def old_render(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_render(content):
+    return FastJSONResponse(content).body
+
+
+def best_of(func, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=7)
+    options = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'json (stdlib)'}")
+    print(f"{'rows':>6} {'bytes':>10} {'old ms':>9} {'fast ms':>9} {'speedup':>8}")
+
+    for size in options.sizes:
+        content = page(transaction_rows(size))
+        body = fast_render(content)
+        assert body == old_render(content), "bodies differ"
+
+        old, _ = best_of(old_render, content, options.repeat)
+        fast, _ = best_of(fast_render, content, options.repeat)
+
+        print(f"{size:>6} {len(body):>10} {old * 1000:>9.2f} {fast * 1000:>9.2f} {old / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Before/after benchmark for the per-connection statement cache
+(DB_STATEMENT_CACHE_SIZE, see app/instrumentation.py).
+
+Runs the same request mix on one pooled-style connection with the cache
+disabled and enabled, against the SQLite stand-in with an injected prepare
+round trip, and reports prepares (round trips), wall time and cache hits:
+
+    python -m benchmarks.statement_cache --requests 500 --prepare-ms 1
+
+Each request reads one page of a report and looks up one team, as the
+dashboard does; the per-request cursor is closed at the end like in the
+services.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--prepare-ms", type=float, default=1.0, help="latency of one SQLPrepare round trip")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latency of one execute round trip")
+    parser.add_argument("--rows", type=int, default=2000, help="rows per report table")
+    parser.add_argument("--cache-size", type=int, default=32, help="statement cache size for the 'after' run")
+    return parser.parse_args()
+
+
+def run(requests, cache_size):
+
+    from app import instrumentation
+    from app.instrumentation import InstrumentedConnection, get_statement_cache_stats
+    from app.schemas import ReportRequest
+    from app.services import db_get_team_by_id, get_report_data
+    from app.sqlite_backend import connect
+
+    instrumentation.DB_STATEMENT_CACHE_SIZE = cache_size
+
+    raw = connect()
+    conn = InstrumentedConnection(raw)
+    today = date.today()
+    before = get_statement_cache_stats()
+
+    started = time.perf_counter()
+    for i in range(requests):
+        data = ReportRequest(start_date=today - timedelta(days=6), end_date=today, page=i % 5 + 1, page_size=50)
+        get_report_data("transaction", data, conn)
+        db_get_team_by_id(1, conn)
+    elapsed = time.perf_counter() - started
+
+    after = get_statement_cache_stats()
+    conn.close()
+
+    return {
+        "cache_size": cache_size,
+        "prepares": raw.prepares,
+        "statements": requests * 2,
+        "seconds": elapsed,
+        "hits": after["hits"] - before["hits"],
+        "misses": after["misses"] - before["misses"],
+    }
+
+
+def main():
+
+    options = parse_args()
+
+    os.environ["DB_BACKEND"] = "sqlite"
+    os.environ["DB_SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="das-bench-"), "bench.sqlite3")
+    os.environ["SQLITE_PREPARE_LATENCY_MS"] = str(options.prepare_ms)
+    os.environ["SQLITE_LATENCY_MS"] = str(options.latency_ms)
+
+    from app.sqlite_backend import seed_report_data
+    seed_report_data(os.environ["DB_SQLITE_PATH"], rows=options.rows, days=7)
+
+    results = [run(options.requests, 0), run(options.requests, options.cache_size)]
+
+    print(f"{'':8} {'cache':>5} {'statements':>10} {'prepares':>8} {'hits':>6} {'seconds':>8} {'ms/req':>7}")
+    for label, result in zip(("before", "after"), results):
+        print(
+            f"{label:8} {result['cache_size']:>5} {result['statements']:>10} {result['prepares']:>8} "
+            f"{result['hits']:>6} {result['seconds']:>8.3f} {result['seconds'] * 1000 / options.requests:>7.3f}"
+        )
+
+    saved = results[0]["prepares"] - results[1]["prepares"]
+    print(
+        f"\nsaved {saved} prepare round trips ({saved / options.requests:.2f} per request), "
+        f"{(results[0]['seconds'] - results[1]['seconds']) * 1000:.0f} ms in total"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ module.exports = {
       autostart: true,
       autorestart: true,
       watch: false,
+      env: {
+        DB_WARMUP: "true",
+      },
     },
   ],
 };
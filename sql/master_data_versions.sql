@@ -0,0 +1,45 @@
+-- Versions of the master-data lists (practice, group, team, ...), used as
+-- ETags by the list endpoints. A version only ever grows and never expires:
+-- every create / update / delete bumps it after its commit, so all workers
+-- and hosts agree on it and an old ETag can never match again.
+
+IF OBJECT_ID('dbo.MasterDataVersions', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.MasterDataVersions (
+        dataset     NVARCHAR(50) NOT NULL PRIMARY KEY,
+        version     BIGINT NOT NULL,
+        updated_at  DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+    );
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_GetMasterDataVersion
+    @dataset NVARCHAR(50)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT ISNULL((SELECT version FROM dbo.MasterDataVersions WHERE dataset = @dataset), 0) AS version;
+END
+GO
+
+-- @datasets is a comma-separated list: a list and the lists showing its data
+CREATE OR ALTER PROCEDURE dbo.sp_BumpMasterDataVersion
+    @datasets NVARCHAR(400)
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    MERGE dbo.MasterDataVersions WITH (HOLDLOCK) AS target
+    USING (
+        SELECT DISTINCT LTRIM(RTRIM(value)) AS dataset
+        FROM STRING_SPLIT(@datasets, ',')
+        WHERE LTRIM(RTRIM(value)) <> ''
+    ) AS source
+    ON target.dataset = source.dataset
+    WHEN MATCHED THEN
+        UPDATE SET version = target.version + 1, updated_at = SYSUTCDATETIME()
+    WHEN NOT MATCHED THEN
+        INSERT (dataset, version) VALUES (source.dataset, 1);
+END
+GO
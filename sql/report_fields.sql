@@ -0,0 +1,76 @@
+-- Column projection for the paged report procedures (ReportRequest.fields).
+-- Each report procedure takes an optional last parameter
+--     @fields NVARCHAR(MAX) = NULL
+-- holding a JSON array of the columns to return, e.g. '["Id","agent_name"]'.
+-- The API only passes names from services.REPORT_FIELDS, already checked,
+-- and calls without @fields exactly as before. The procedure keeps its own
+-- joins, filters and order and only narrows its rows result set, so SQL
+-- Server reads and sends nothing but the requested columns.
+
+-- Bracket-quoted select list of @fields, in the caller's order. NULL when
+-- @fields is empty or names a column missing from @allowed (the procedure's
+-- own comma-separated output columns).
+CREATE OR ALTER FUNCTION dbo.fn_ReportSelectList (
+    @fields  NVARCHAR(MAX),
+    @allowed NVARCHAR(MAX)
+)
+RETURNS NVARCHAR(MAX)
+AS
+BEGIN
+    IF ISJSON(@fields) = 0
+        RETURN NULL;
+
+    IF EXISTS (
+        SELECT 1
+        FROM OPENJSON(@fields) f
+        WHERE f.value NOT IN (SELECT LTRIM(RTRIM(value)) FROM STRING_SPLIT(@allowed, ','))
+    )
+        RETURN NULL;
+
+    RETURN (
+        SELECT STRING_AGG(CAST(QUOTENAME(f.value) AS NVARCHAR(MAX)), ', ')
+               WITHIN GROUP (ORDER BY CAST(f.[key] AS INT))
+        FROM OPENJSON(@fields) f
+    );
+END
+GO
+
+-- Apply to each procedure in services.REPORT_PROCEDURES. The count result
+-- set stays as it is; the rows query moves into a derived table whose
+-- select list is narrowed, with its ORDER BY carried out as row_order:
+--
+-- CREATE OR ALTER PROCEDURE dbo.sp_Get...
+--     @start_date DATE,
+--     @end_date   DATE,
+--     @page       INT,
+--     @page_size  INT,
+--     @fields     NVARCHAR(MAX) = NULL
+-- AS
+-- BEGIN
+--     SET NOCOUNT ON;
+--
+--     <count query, unchanged>
+--
+--     IF @fields IS NULL
+--     BEGIN
+--         <rows query, unchanged>
+--         RETURN;
+--     END
+--
+--     DECLARE @select NVARCHAR(MAX) = dbo.fn_ReportSelectList(@fields, N'<output columns>');
+--     IF @select IS NULL
+--         THROW 50422, 'Unknown report field', 1;
+--
+--     DECLARE @sql NVARCHAR(MAX) =
+--         N'SELECT ' + @select + N'
+--           FROM (
+--               SELECT <rows query select list>, ROW_NUMBER() OVER (ORDER BY <rows query order>) AS row_order
+--               <rows query FROM / JOIN / WHERE>
+--           ) AS r
+--           ORDER BY r.row_order
+--           OFFSET (@page - 1) * @page_size ROWS FETCH NEXT @page_size ROWS ONLY';
+--
+--     EXEC sp_executesql @sql,
+--         N'@start_date DATE, @end_date DATE, @page INT, @page_size INT',
+--         @start_date, @end_date, @page, @page_size;
+-- END
@@ -0,0 +1,49 @@
+-- Token revocation store used by POST /auth/logout and POST /auth/revoke.
+-- token_id is the token's jti (or the SHA-256 of tokens issued without one);
+-- a NULL token_id revokes every token of user_id issued before revoked_at.
+
+IF OBJECT_ID('dbo.RevokedTokens', 'U') IS NULL
+BEGIN
+    CREATE TABLE dbo.RevokedTokens (
+        id          INT IDENTITY(1, 1) PRIMARY KEY,
+        token_id    NVARCHAR(64) NULL,
+        user_id     INT NULL,
+        expires_at  DATETIME2 NOT NULL,
+        revoked_at  DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME(),
+        revoked_by  INT NULL
+    );
+
+    CREATE INDEX IX_RevokedTokens_revoked_at ON dbo.RevokedTokens (revoked_at) INCLUDE (expires_at);
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_RevokeToken
+    @token_id   NVARCHAR(64),
+    @user_id    INT,
+    @expires_at DATETIME2,
+    @revoked_by INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    INSERT INTO dbo.RevokedTokens (token_id, user_id, expires_at, revoked_at, revoked_by)
+    VALUES (@token_id, @user_id, @expires_at, SYSUTCDATETIME(), @revoked_by);
+
+    -- Entries past their expiry can never match a valid token again
+    DELETE FROM dbo.RevokedTokens WHERE expires_at < DATEADD(DAY, -1, SYSUTCDATETIME());
+END
+GO
+
+CREATE OR ALTER PROCEDURE dbo.sp_GetRevokedTokens
+    @since DATETIME2 = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    SELECT token_id, user_id, expires_at, revoked_at
+    FROM dbo.RevokedTokens
+    WHERE expires_at > SYSUTCDATETIME()
+      AND (@since IS NULL OR revoked_at >= @since)
+    ORDER BY revoked_at;
+END
+GO
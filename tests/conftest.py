@@ -0,0 +1,56 @@
+"""
+The tests run the API against the SQLite stand-in (app/sqlite_backend.py),
+so they need neither SQL Server nor Redis. The environment has to be set
+before any app module is imported because settings are read at import time.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="das-tests-")
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("DB_SQLITE_PATH", os.path.join(_DB_DIR, "das.sqlite3"))
+os.environ.setdefault("DB_WARMUP", "false")
+# Every test logs in as the same user; keep the per-user login throttle out of the way
+os.environ.setdefault("LOGIN_USER_BURST", "1000")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.sqlite_backend import seed_report_data  # noqa: E402
+
+# Rows per report table, spread over REPORT_DAYS days ending today
+REPORT_ROWS = 600
+REPORT_DAYS = 6
+
+seed_report_data(os.environ["DB_SQLITE_PATH"], rows=REPORT_ROWS, days=REPORT_DAYS)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def app():
+    from app.main import app
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def login(client, username="admin1", password="admin123"):
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+@pytest.fixture
+async def auth_headers(client):
+    tokens = await login(client)
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
@@ -0,0 +1,147 @@
+"""
+Concurrent requests through the lazy pooled connection dependencies: every
+request works on its own connection, pools stay within their size, and
+master-data requests keep completing while uploads hold their connections.
+"""
+
+import threading
+import time
+
+import anyio
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.db import MASTER, REPORT, UPLOAD, ConnectionPool, PoolTimeoutError, get_pool, pool_limits
+from app.dependencies import get_db, get_upload_db
+from app.executor import run_db
+
+pytestmark = pytest.mark.anyio
+
+
+class ConnectionTracker:
+    """Records which raw connections are in use at the same time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = {}
+        self.shared = []
+        self.seen = set()
+        self.peak = {}
+
+    def hold(self, traffic_class, conn, seconds):
+
+        raw = conn.connection()
+        pool = get_pool(traffic_class)
+
+        with self._lock:
+            if id(raw) in self.active:
+                self.shared.append(id(raw))
+            self.active[id(raw)] = traffic_class
+            self.seen.add(id(raw))
+            self.peak[traffic_class] = max(self.peak.get(traffic_class, 0), pool.stats()["size"])
+
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            time.sleep(seconds)
+        finally:
+            with self._lock:
+                del self.active[id(raw)]
+
+
+def probe_app(tracker):
+
+    app = FastAPI()
+
+    @app.get("/master")
+    async def master(conn=Depends(get_db)):
+        await run_db(MASTER, tracker.hold, MASTER, conn, 0.02)
+        return {"ok": True}
+
+    @app.get("/upload")
+    async def upload(conn=Depends(get_upload_db)):
+        await run_db(UPLOAD, tracker.hold, UPLOAD, conn, 0.5)
+        return {"ok": True}
+
+    return app
+
+
+async def test_each_request_gets_its_own_connection():
+
+    tracker = ConnectionTracker()
+    transport = httpx.ASGITransport(app=probe_app(tracker))
+    statuses = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def call(path):
+            statuses.append((await client.get(path)).status_code)
+
+        async with anyio.create_task_group() as tg:
+            for _ in range(40):
+                tg.start_soon(call, "/master")
+
+    assert statuses == [200] * 40
+    assert tracker.shared == []
+    assert tracker.peak[MASTER] <= get_pool(MASTER).max_size
+    assert get_pool(MASTER).stats()["in_use"] == 0
+
+
+async def test_master_requests_progress_during_uploads():
+
+    tracker = ConnectionTracker()
+    transport = httpx.ASGITransport(app=probe_app(tracker))
+    upload_pool = get_pool(UPLOAD)
+    finished = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+        async def call(path, key):
+            response = await client.get(path)
+            assert response.status_code == 200
+            finished[key] = time.monotonic()
+
+        async with anyio.create_task_group() as tg:
+            # More uploads than the upload pool holds, so some of them queue
+            for i in range(upload_pool.max_size + 2):
+                tg.start_soon(call, "/upload", f"upload-{i}")
+            await anyio.sleep(0.05)
+            for i in range(10):
+                tg.start_soon(call, "/master", f"master-{i}")
+
+    first_upload = min(t for key, t in finished.items() if key.startswith("upload"))
+    last_master = max(t for key, t in finished.items() if key.startswith("master"))
+
+    # Every master request finished before the first upload released its slot
+    assert last_master < first_upload
+    assert tracker.shared == []
+    assert tracker.peak[UPLOAD] <= upload_pool.max_size
+    assert tracker.peak[MASTER] <= get_pool(MASTER).max_size
+
+
+async def test_exhausted_pool_answers_503(client, auth_headers, monkeypatch):
+
+    def exhausted(self, timeout=None):
+        raise PoolTimeoutError(f"Timed out after waiting for a free DB connection (pool max_size={self.max_size})")
+
+    monkeypatch.setattr(ConnectionPool, "acquire", exhausted)
+
+    response = await client.post("/Practice-get", headers=auth_headers)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"].isdigit()
+    assert response.json()["status"] == "failed"
+
+
+def test_pool_limits_fall_back_to_global_sizes(monkeypatch):
+
+    assert pool_limits(REPORT) == (1, 8)
+
+    monkeypatch.setenv("DB_POOL_MIN_SIZE", "2")
+    monkeypatch.setenv("DB_POOL_MAX_SIZE", "6")
+    assert pool_limits(REPORT) == (2, 6)
+
+    monkeypatch.setenv("DB_POOL_REPORT_MAX_SIZE", "12")
+    assert pool_limits(REPORT) == (2, 12)
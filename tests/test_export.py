@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.db import EXPORT, REPORT, get_pool, pooled_connection
+from app.executor import get_executor_stats
+from app.fetch import TUPLE, column_names
+from app.schemas import ReportRequest
+from app.services import REPORT_PROCEDURES, get_report_data, open_export_cursor
+from app.streaming import CSVExport
+
+from conftest import REPORT_DAYS
+
+START = date.today() - timedelta(days=REPORT_DAYS - 1)
+END = date.today()
+
+
+def paged_rows(report, conn, page_size=100):
+    """Every row of the report in [START, END], page by page through the API's reader."""
+
+    columns, rows, page = None, [], 1
+    while True:
+        result, total_rows = get_report_data(
+            report, ReportRequest(start_date=START, end_date=END, page=page, page_size=page_size), conn, TUPLE
+        )
+        columns = result["columns"]
+        rows += result["rows"]
+        if page * page_size >= total_rows:
+            return columns, rows
+        page += 1
+
+
+@pytest.mark.parametrize("report", sorted(REPORT_PROCEDURES))
+def test_export_matches_paged_report(report):
+
+    with pooled_connection() as conn:
+        columns, expected = paged_rows(report, conn)
+        assert expected
+
+        cursor = open_export_cursor(report, START, END, conn)
+        try:
+            assert column_names(cursor) == columns
+            assert [tuple(row) for row in cursor.fetchall()] == expected
+        finally:
+            cursor.close()
+
+
+@pytest.mark.anyio
+async def test_csv_export_download(client, auth_headers):
+
+    with pooled_connection() as conn:
+        columns, rows = paged_rows("transaction", conn)
+
+    response = await client.post(
+        "/export/transaction/csv",
+        json={"start_date": START.isoformat(), "end_date": END.isoformat()},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.csv"')
+    assert response.content == CSVExport._write([columns] + rows)
+
+
+@pytest.mark.anyio
+async def test_arrow_export_download(client, auth_headers):
+
+    pa = pytest.importorskip("pyarrow")
+
+    with pooled_connection() as conn:
+        columns, rows = paged_rows("transaction", conn)
+
+    response = await client.post(
+        "/export/transaction/arrow",
+        json={"start_date": START.isoformat(), "end_date": END.isoformat()},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column_names == columns
+    assert table.num_rows == len(rows)
+
+
+@pytest.mark.anyio
+async def test_export_runs_on_its_own_traffic_class(client, auth_headers):
+
+    before = get_executor_stats()
+
+    response = await client.post(
+        "/export/login/csv",
+        json={"start_date": START.isoformat(), "end_date": END.isoformat()},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    after = get_executor_stats()
+    assert after[EXPORT]["completed"] > before[EXPORT]["completed"]
+    assert after[REPORT]["completed"] == before[REPORT]["completed"]
+    assert get_pool(EXPORT).stats()["size"] >= 1
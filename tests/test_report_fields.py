@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.db import ConnectionPool, pooled_connection
+from app.fetch import column_names
+from app.schemas import ReportRequest
+from app.services import REPORT_FIELDS, execute_report
+from conftest import REPORT_DAYS
+
+pytestmark = pytest.mark.anyio
+
+START = (date.today() - timedelta(days=REPORT_DAYS - 1)).isoformat()
+END = date.today().isoformat()
+
+
+async def report_page(client, auth_headers, **request):
+    return await client.post(
+        "/get-transaction-data",
+        json={"start_date": START, "end_date": END, **request},
+        headers=auth_headers,
+    )
+
+
+@pytest.mark.parametrize("page_size", [100, 1000])
+async def test_fields_project_the_report_rows(client, auth_headers, page_size):
+
+    full = (await report_page(client, auth_headers, page_size=page_size)).json()
+    fields = ["agent_name", "Id"]
+
+    response = await report_page(client, auth_headers, page_size=page_size, fields=fields)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_rows"] == full["total_rows"]
+    assert body["data"] == [{name: row[name] for name in fields} for row in full["data"]]
+    assert [list(row) for row in body["data"]] == [fields] * len(full["data"])
+
+
+@pytest.mark.parametrize("page_size", [100, 1000])
+async def test_unknown_fields_are_rejected_before_any_db_call(client, auth_headers, monkeypatch, page_size):
+
+    def no_db(self, timeout=None):
+        raise AssertionError("a DB connection was requested")
+
+    monkeypatch.setattr(ConnectionPool, "acquire", no_db)
+
+    response = await report_page(client, auth_headers, page_size=page_size, fields=["Id", "NoSuchColumn"])
+
+    assert response.status_code == 422
+    data = response.json()["data"]
+    assert data["unknown_fields"] == ["NoSuchColumn"]
+    assert data["allowed_fields"] == list(REPORT_FIELDS["transaction"])
+
+
+@pytest.mark.parametrize("report", sorted(REPORT_FIELDS))
+def test_procedure_returns_just_the_requested_fields(report):
+
+    request = ReportRequest(start_date=START, end_date=END, page_size=5)
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            execute_report(cursor, report, request)
+            cursor.fetchone()
+            cursor.nextset()
+            # The whitelist is exactly what the procedure returns
+            assert sorted(column_names(cursor)) == sorted(REPORT_FIELDS[report])
+        finally:
+            cursor.close()
+
+        fields = list(REPORT_FIELDS[report][-2:])
+        cursor = conn.cursor()
+        try:
+            execute_report(cursor, report, request.model_copy(update={"fields": fields}))
+            cursor.fetchone()
+            cursor.nextset()
+            assert column_names(cursor) == fields
+        finally:
+            cursor.close()
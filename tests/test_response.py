@@ -0,0 +1,85 @@
+"""
+FastJSONResponse must keep the bytes the old JSONResponse(jsonable_encoder())
+path produced; the documented differences are pinned here too.
+"""
+
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from app.response import FastJSONResponse, orjson
+
+
+def old_body(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+ROW = {
+    "Id": 7,
+    "TimeFinished": datetime(2026, 3, 1, 8, 30, 15),
+    "OfferActionTime": datetime(2026, 3, 1, 8, 30, 15, 250000),
+    "createdDate": date(2026, 3, 1),
+    "AppointmentTime": time(9, 5),
+    "StartTime": time(14, 0, 7, 12),
+    "Hold": timedelta(minutes=2, seconds=3),
+    "Long": timedelta(days=1, microseconds=5),
+    "Score": 87.25,
+    "Ratio": 0.1,
+    "Negative": -0.0,
+    "Big": 123456789012.5,
+    "Small": 0.00025,
+    "Amount": Decimal("12.50"),
+    "Count": Decimal("100"),
+    "Scaled": Decimal("1E+2"),
+    "Rate": Decimal("0.075"),
+    "Active": True,
+    "Participant": None,
+    "CustomerName": "José Peña – 患者 😀",
+    "Notes": 'quote " backslash \\ newline \n tab \t  ',
+}
+
+GOLDEN = (
+    '{"Id":7,"TimeFinished":"2026-03-01T08:30:15","OfferActionTime":"2026-03-01T08:30:15.250000",'
+    '"createdDate":"2026-03-01","AppointmentTime":"09:05:00","StartTime":"14:00:07.000012",'
+    '"Hold":123.0,"Long":86400.000005,"Score":87.25,"Ratio":0.1,"Negative":-0.0,'
+    '"Big":123456789012.5,"Small":0.00025,"Amount":12.5,"Count":100,"Scaled":100,"Rate":0.075,'
+    '"Active":true,"Participant":null,"CustomerName":"José Peña – 患者 😀",'
+    '"Notes":"quote \\" backslash \\\\ newline \\n tab \\t  "}'
+).encode()
+
+
+def test_golden_bytes():
+    content = {"status": "success", "message": None, "total_rows": 1, "data": [ROW]}
+    expected = b'{"status":"success","message":null,"total_rows":1,"data":[' + GOLDEN + b"]}"
+
+    assert old_body(content) == expected
+    assert FastJSONResponse(content).body == expected
+
+
+@pytest.mark.parametrize("value", [1e16, 1.5e16, 1e22, 1e308, 1e-5, 1e-7, Decimal("1E-7"), -2.5e17])
+def test_exponent_floats_keep_their_value(value):
+    old, new = old_body([value]), FastJSONResponse([value]).body
+
+    assert json.loads(new) == json.loads(old)
+    if orjson is None:
+        assert new == old
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson formatting only")
+def test_exponent_floats_use_orjson_form():
+    assert FastJSONResponse([1e16, 1e-5, 1e-7]).body == b"[1e16,0.00001,1e-7]"
+    assert old_body([1e16, 1e-5, 1e-7]) == b"[1e+16,1e-05,1e-07]"
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson formatting only")
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_non_finite_floats_become_null(value):
+    with pytest.raises(ValueError):
+        old_body([value])
+
+    assert FastJSONResponse([value]).body == b"[null]"
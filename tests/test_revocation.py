@@ -0,0 +1,37 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app.jwt_handler
+import app.revocation
+from conftest import login
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def test_login_right_after_revoke_user_is_accepted(client, monkeypatch):
+
+    # Token issue and revocation read the wall clock; pin it so both land
+    # in the same second whatever the machine's speed
+    second = int(time.time())
+    now = [second + 0.1]
+    clock = SimpleNamespace(time=lambda: now[0], monotonic=time.monotonic, perf_counter=time.perf_counter)
+    monkeypatch.setattr(app.jwt_handler, "time", clock)
+    monkeypatch.setattr(app.revocation, "time", clock)
+
+    before = await login(client)
+
+    now[0] = second + 0.5
+    response = await client.post("/auth/revoke", json={"user_id": 1}, headers=bearer(before))
+    assert response.status_code == 200, response.text
+
+    now[0] = second + 0.9
+    after = await login(client)
+
+    assert (await client.get("/db-pool-stats", headers=bearer(after))).status_code == 200
+    assert (await client.get("/db-pool-stats", headers=bearer(before))).status_code == 401
@@ -0,0 +1,66 @@
+import threading
+import time
+from datetime import date, timedelta
+
+import anyio
+import pytest
+
+from app.db import REPORT, UPLOAD, lazy_connection
+from app.executor import get_executor_stats, run_db, run_db_with_timeout
+from app.timeouts import QueryTimeoutError
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_timeout_names_the_running_procedure():
+
+    conn = lazy_connection(REPORT)
+    today = date.today()
+
+    def report_then_stall():
+        cursor = conn.cursor()
+        cursor.execute("EXEC sp_GetTransactionData ?, ?, ?, ?", today - timedelta(days=2), today, 1, 10)
+        cursor.fetchall()
+        time.sleep(0.3)
+
+    try:
+        with pytest.raises(QueryTimeoutError) as error:
+            await run_db_with_timeout(REPORT, 0.1, conn, report_then_stall)
+    finally:
+        conn.release()
+
+    assert error.value.procedure == "sp_GetTransactionData"
+
+
+async def test_timed_out_call_never_starts_once_dequeued():
+
+    conn = lazy_connection(UPLOAD)
+    release = threading.Event()
+    ran = threading.Event()
+
+    def occupy():
+        release.wait(5)
+
+    def query():
+        ran.set()
+
+    async with anyio.create_task_group() as tg:
+        # Fill every UPLOAD worker thread so the next call has to queue
+        for _ in range(get_executor_stats()[UPLOAD]["max_workers"]):
+            tg.start_soon(run_db, UPLOAD, occupy)
+        await anyio.sleep(0.05)
+
+        started = time.monotonic()
+        with pytest.raises(QueryTimeoutError) as error:
+            await run_db_with_timeout(UPLOAD, 0.1, conn, query, procedure="sp_example")
+
+        # Gave up without waiting for a worker thread to free up
+        assert time.monotonic() - started < 1
+        release.set()
+
+    # Let the called-off call reach a worker thread
+    await run_db(UPLOAD, time.sleep, 0.05)
+
+    assert error.value.procedure == "sp_example"
+    assert not ran.is_set()
+    assert not conn.acquired
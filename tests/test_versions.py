@@ -0,0 +1,42 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_practice_list_etag(client, auth_headers):
+
+    first = await client.post("/Practice-get", headers=auth_headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    groups_etag = (await client.post("/Practice-get-groups", headers=auth_headers)).headers["etag"]
+
+    again = await client.post("/Practice-get", headers={**auth_headers, "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+
+    created = await client.post(
+        "/practice-create", json={"PracticeName": "Bay Dental", "Practice": "BAY"}, headers=auth_headers
+    )
+    assert created.status_code == 200
+
+    changed = await client.post("/Practice-get", headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert any(row["Practice"] == "BAY" for row in changed.json()["data"])
+
+    # Lists showing practice names move on too
+    groups = await client.post("/Practice-get-groups", headers={**auth_headers, "If-None-Match": groups_etag})
+    assert groups.status_code == 200
+    assert groups.headers["etag"] != groups_etag
+
+
+async def test_versions_only_grow(client, auth_headers):
+
+    from app.db import pooled_connection
+    from app.versions import bump_version, current_version
+
+    with pooled_connection() as conn:
+        before = current_version(conn, "group")
+        bump_version(conn.cursor(), "group")
+        assert current_version(conn, "group") == before + 1
+        assert current_version(conn, "practice_group") >= 1